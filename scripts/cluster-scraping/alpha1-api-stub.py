@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Local alpha-1 API stub for exercising ROSEWOOD's bulk loader
+Ballarat Tool Library Data Migration - Import Testing
+
+Serves the /api/v1 endpoints the loader talks to (health, categories,
+tools, tools/bulk) from memory, honours Idempotency-Key headers and can
+inject transient failures, so loads can be tested without the real backend:
+
+    python3 alpha1-api-stub.py --port 8787 --fail-rate 0.05
+    python3 rosewood-qa.py --bulk-load --api-base http://127.0.0.1:8787/api/v1
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+from aiohttp import web
+
+# Configuration
+API_PREFIX = "/api/v1"
+DEFAULT_PORT = 8787
+
+# Categories mirroring SEEDED_CATEGORIES in rosewood-qa.py
+SEEDED_CATEGORIES = [
+    {"id": 1, "name": "Hand Tools", "parent": None},
+    {"id": 2, "name": "Power Tools", "parent": None},
+    {"id": 3, "name": "Garden Tools", "parent": None},
+    {"id": 4, "name": "Kitchen Tools", "parent": None},
+    {"id": 5, "name": "Drills", "parent": {"id": 2, "name": "Power Tools"}},
+    {"id": 6, "name": "Saws", "parent": {"id": 2, "name": "Power Tools"}},
+]
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class Alpha1ApiStub:
+    """In-memory stand-in for the alpha-1 tools API"""
+
+    def __init__(self, bulk_enabled: bool = True, fail_rate: float = 0.0):
+        self.bulk_enabled = bulk_enabled
+        self.fail_rate = fail_rate
+        self.tools = {}  # sourceUrl -> tool
+        self.seen_keys = set()
+        self.stats = {"requests": 0, "rows_written": 0, "replayed": 0, "injected_failures": 0}
+
+    def should_fail(self) -> bool:
+        """Randomly inject a transient failure"""
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.stats["injected_failures"] += 1
+            return True
+        return False
+
+    def store(self, tool: dict):
+        """Upsert a tool keyed on sourceUrl"""
+        self.tools[tool.get('sourceUrl') or f"stub-{len(self.tools)}"] = tool
+        self.stats["rows_written"] += 1
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def categories(self, request: web.Request) -> web.Response:
+        return web.json_response({"success": True, "data": {"categories": SEEDED_CATEGORIES}})
+
+    async def list_tools(self, request: web.Request) -> web.Response:
+        return web.json_response({"data": list(self.tools.values()), "total": len(self.tools)})
+
+    async def create_tool(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        if self.should_fail():
+            return web.json_response({"error": "injected failure"}, status=503)
+
+        key = request.headers.get('Idempotency-Key')
+        if key and key in self.seen_keys:
+            self.stats["replayed"] += 1
+            return web.json_response({"replayed": True}, status=200)
+
+        self.store(await request.json())
+        if key:
+            self.seen_keys.add(key)
+        return web.json_response({"created": 1}, status=201)
+
+    async def create_tools_bulk(self, request: web.Request) -> web.Response:
+        if not self.bulk_enabled:
+            raise web.HTTPNotFound()
+
+        self.stats["requests"] += 1
+        if self.should_fail():
+            return web.json_response({"error": "injected failure"}, status=503)
+
+        key = request.headers.get('Idempotency-Key')
+        if key and key in self.seen_keys:
+            self.stats["replayed"] += 1
+            return web.json_response({"replayed": True}, status=200)
+
+        payload = await request.json()
+        for tool in payload.get('tools', []):
+            self.store(tool)
+        if key:
+            self.seen_keys.add(key)
+        return web.json_response({"created": len(payload.get('tools', []))}, status=201)
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get(f"{API_PREFIX}/health", self.health)
+        app.router.add_get(f"{API_PREFIX}/categories", self.categories)
+        app.router.add_get(f"{API_PREFIX}/tools", self.list_tools)
+        app.router.add_post(f"{API_PREFIX}/tools", self.create_tool)
+        app.router.add_post(f"{API_PREFIX}/tools/bulk", self.create_tools_bulk)
+        return app
+
+async def main(args):
+    """Serve the stub until interrupted"""
+    stub = Alpha1ApiStub(bulk_enabled=not args.no_bulk, fail_rate=args.fail_rate)
+    runner = web.AppRunner(stub.build_app())
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+
+    logger.info(f"alpha-1 API stub listening on http://{args.host}:{args.port}{API_PREFIX}")
+
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        logger.info(f"Stub stats: {stub.stats}, {len(stub.tools)} distinct tools stored")
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local alpha-1 API stub for bulk load testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--no-bulk', action='store_true', help="Disable /tools/bulk to exercise per-row loading")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fraction of writes answered with HTTP 503")
+
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -16,6 +16,12 @@ ROSEWOOD_HOST="192.168.1.22"
 SSH_USER="tony"
 SHARED_DIR="/rust/containers/ballarat-scraping"
 
+# Modules imported by every stage script, deployed alongside each one
+SHARED_MODULES="page_archive.py page_stream.py progress_store.py run_ledger.py stage_drain.py stage_loader.py stage_metrics.py stage_profile.py stage_stats.py stage_trace.py tool_records.py"
+
+# Each stage serves Prometheus metrics at http://<host>:$METRICS_PORT/metrics
+METRICS_PORT=9464
+
 # Colors for output
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -61,12 +67,18 @@ deploy_to_host() {
     echo "Copying $script_name..."
     scp "$SCRIPT_DIR/$script_name" "$SSH_USER@$host:$SHARED_DIR/scripts/"
     
+    # Copy shared modules
+    echo "Copying shared modules..."
+    for module in $SHARED_MODULES; do
+        scp "$SCRIPT_DIR/$module" "$SSH_USER@$host:$SHARED_DIR/scripts/"
+    done
+    
     # Make executable
     ssh "$SSH_USER@$host" "chmod +x $SHARED_DIR/scripts/$script_name"
     
     # Install Python dependencies
     echo "Installing Python dependencies..."
-    ssh "$SSH_USER@$host" "cd $SHARED_DIR && python3 -m pip install --user aiohttp requests pillow"
+    ssh "$SSH_USER@$host" "cd $SHARED_DIR && python3 -m pip install --user 'aiohttp>=3.13' requests pillow zstandard msgpack"
     
     echo -e "${GREEN}✓ Deployment to $host_name completed${NC}"
 }
@@ -90,9 +102,10 @@ After=network.target
 Type=simple
 User=$SSH_USER
 WorkingDirectory=$SHARED_DIR
-ExecStart=/usr/bin/python3 $SHARED_DIR/scripts/$script_name
+ExecStart=/usr/bin/python3 $SHARED_DIR/scripts/$script_name --metrics-port $METRICS_PORT
 Restart=on-failure
 RestartSec=30
+TimeoutStopSec=60
 StandardOutput=journal
 StandardError=journal
 
@@ -8,92 +8,216 @@ downloads and optimizes images, and prepares data for database import.
 Uses deepseek-coder-v2 for advanced data validation.
 """
 
+import argparse
 import asyncio
 import aiohttp
 import json
-import sqlite3
 import os
 import time
+from concurrent.futures import Executor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from urllib.parse import urljoin
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 import hashlib
-from PIL import Image
-import requests
+import re
+from html import unescape
+
+from page_archive import PageArchive, replay
+from page_stream import FieldScanner, read_page, record_streamed_page, streamed_pages_summary
+from progress_store import (CLAIM_UNPROCESSED_TOOLS_SQL, LAST_PROCESSING_COMPLETED_SQL,
+                            MARK_PROCESSING_COMPLETED_SQL, MARK_PROCESSING_STARTED_SQL,
+                            RELEASE_FAILED_TOOLS_SQL, RELEASE_UNFINISHED_CLAIMS_SQL, ProgressStore)
+from run_ledger import RunLedger
+from stage_drain import StageDrain
+from stage_metrics import StageMetrics
+from stage_profile import PROFILE_MODES, StageProfiler
+from stage_stats import StreamingStats
+from stage_trace import StageTracer, default_trace_path
+from tool_records import LEGACY_RECORD_FILE_SUFFIX, ImageVariant, ProcessedTool, read_record_file, record_file, write_record_file
 
 # Configuration
 BASE_URL = "https://ballarattoollibrary.myturn.com"
 MAX_CONCURRENT_REQUESTS = 3  # Lower than WALNUT for processing-heavy tasks
 REQUEST_DELAY = 2.0  # Longer delay for detail page processing
 SHARED_DIR = Path("/rust/containers/ballarat-scraping")
-DATABASE_PATH = SHARED_DIR / "scraping_progress.db"
+DATABASE_PATH = SHARED_DIR / "scraping_progress.db"  # Merged view, published at the end of a run
+CHANGESET_DIR = SHARED_DIR / "progress_changesets"
+LOCAL_STATE_DIR = Path.home() / ".local" / "share" / "ballarat-scraping"
+LOCAL_DATABASE_PATH = LOCAL_STATE_DIR / "ironwood_progress.db"
 IMAGES_DIR = SHARED_DIR / "tool_images"
 PROCESSED_DATA_DIR = SHARED_DIR / "processed_data"
 SIGNAL_FILE = SHARED_DIR / "walnut_completed.signal"
+PAGE_ARCHIVE_DIR = SHARED_DIR / "page_archive"
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Detail page extraction, in priority order per field
+DETAIL_FIELD_PATTERNS = {
+    'name': [re.compile(r'<h1[^>]*>([^<]+)</h1>')],
+    'brand': [
+        re.compile(r'<strong>Brand:</strong>\s*([^<\n]+)', re.IGNORECASE),
+        re.compile(r'<strong>Manufacturer:</strong>\s*([^<\n]+)', re.IGNORECASE),
+        re.compile(r'Manufacturer:\s*([^<\n]+)', re.IGNORECASE),
+    ],
+    'model': [
+        re.compile(r'<strong>Model:</strong>\s*([^<\n]+)', re.IGNORECASE),
+        re.compile(r'<strong>Product Code:</strong>\s*([^<\n]+)', re.IGNORECASE),
+        re.compile(r'Model:\s*([^<\n]+)', re.IGNORECASE),
+    ],
+    'description': [
+        re.compile(r'<div[^>]*class="[^"]*description[^"]*"[^>]*>([^<]+)</div>', re.IGNORECASE | re.DOTALL),
+        re.compile(r'<p[^>]*class="[^"]*description[^"]*"[^>]*>([^<]+)</p>', re.IGNORECASE | re.DOTALL),
+    ],
+    'category': [re.compile(r'Inventory\s*>\s*Tools\s*>\s*([^>]+)>')],
+    'specifications': [re.compile(r'<table[^>]*class="[^"]*spec[^"]*"[^>]*>(.*?)</table>', re.IGNORECASE | re.DOTALL)],
+}
+DETAIL_IMAGE_PATTERNS = [
+    re.compile(r'<img[^>]*src="([^"]*amazonaws\.com[^"]*)"', re.IGNORECASE),
+    re.compile(r'src="([^"]*\.(jpg|jpeg|png|gif))"', re.IGNORECASE),
+]
+SPEC_ROW_PATTERN = re.compile(r'<tr[^>]*>.*?<td[^>]*>([^<]+)</td>.*?<td[^>]*>([^<]+)</td>.*?</tr>',
+                              re.IGNORECASE | re.DOTALL)
+DETAIL_STOP_PATTERN = re.compile(r'<footer\b', re.IGNORECASE)  # Nothing extracted lives past the footer
 
 # Image processing settings
 MAX_IMAGE_WIDTH = 800
 MAX_IMAGE_HEIGHT = 600
 IMAGE_QUALITY = 85
 
+# Priority scheduling: each signal adds its weight to a tool's score, and
+# higher scores are processed first (and emitted first by single-node-pipeline.py)
+PRIORITY_CATEGORY_WEIGHTS = {
+    'Power Tools': 3.0,
+    'Garden Tools': 2.0,
+    'Hand Tools': 1.0,
+}
+# WALNUT's listings carry no category, so the category is read from the tool name
+PRIORITY_CATEGORY_KEYWORDS = {
+    'Power Tools': ('drill', 'saw', 'sander', 'grinder', 'router', 'planer', 'nailer', 'blower'),
+    'Garden Tools': ('mower', 'trimmer', 'hedge', 'edger', 'rake', 'spade', 'shovel', 'wheelbarrow'),
+    'Hand Tools': ('hammer', 'spanner', 'wrench', 'screwdriver', 'chisel', 'clamp', 'pliers'),
+}
+PRIORITY_IMAGES_WEIGHT = 1.0  # Images already on disk from an earlier attempt
+PRIORITY_NEW_WEIGHT = 2.0  # Discovered since IRONWOOD last finished a tool
+PRIORITY_RETRY_WEIGHT = -5.0  # Failed before; retried once everything else is done
+MAX_PROCESSING_ATTEMPTS = 3  # Failed tools are retried on later runs up to this many attempts
+
+# Report settings
+REPORT_SAMPLE_SIZE = 3
+FAILED_TOOLS_SAMPLE_SIZE = 50
+IMAGES_PER_TOOL_BUCKETS = [1, 2, 3, 5, 10, 20]
+PROCESSING_SECONDS_BUCKETS = [1, 2, 5, 10, 20, 30, 60, 120]
+
 # Logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+class ToolScheduler:
+    """
+    Orders IRONWOOD's work so the tools that matter most finish first
+    
+    A tool's score is the sum of the PRIORITY_* weights for its signals:
+    category (name keywords), images already on disk, newly discovered, and
+    earlier failures. Equal scores keep discovery order.
+    """
+    
+    def __init__(self, images_dir: Path = IMAGES_DIR, new_since: Optional[str] = None):
+        self.tools_with_images = self.scan_images(images_dir)
+        self.new_since = new_since  # Tools discovered after this are new; None if nothing is processed yet
+        self.claimed_scores: Dict[str, float] = {}
+    
+    @staticmethod
+    def scan_images(images_dir: Path) -> Set[str]:
+        """Tool ids with an optimised image on disk (tool_{id}_{n}_{hash}.jpg), from one directory listing"""
+        tool_ids = set()
+        if images_dir.exists():
+            with os.scandir(images_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith('tool_'):
+                        tool_ids.add(entry.name[len('tool_'):].split('_', 1)[0])
+        return tool_ids
+    
+    @staticmethod
+    def category_of(tool_name: str) -> Optional[str]:
+        """The first PRIORITY_CATEGORY_KEYWORDS category matching the tool's name"""
+        name = (tool_name or '').lower()
+        for candidate, keywords in PRIORITY_CATEGORY_KEYWORDS.items():
+            if any(keyword in name for keyword in keywords):
+                return candidate
+        return None
+    
+    def score(self, tool_id: str, tool_name: str, discovered_at: Optional[str] = None,
+              failures: Optional[int] = None) -> float:
+        """Priority of one tool; discovered_at is None for a tool WALNUT has just found"""
+        score = PRIORITY_CATEGORY_WEIGHTS.get(self.category_of(tool_name), 0.0)
+        if tool_id in self.tools_with_images:
+            score += PRIORITY_IMAGES_WEIGHT
+        if discovered_at is None or self.new_since is None or str(discovered_at) > self.new_since:
+            score += PRIORITY_NEW_WEIGHT
+        if failures:
+            score += PRIORITY_RETRY_WEIGHT
+        return score
+    
+    def priority(self, tool_id: str, tool_name: str) -> float:
+        """Score of a claimed tool, or of one WALNUT has just discovered"""
+        if tool_id in self.claimed_scores:
+            return self.claimed_scores[tool_id]
+        return self.score(tool_id, tool_name)
+    
+    def order(self, rows: Sequence[Tuple]) -> List[Tuple[str, str, str]]:
+        """Claimed rows, highest priority first, as (tool_id, tool_name, tool_url)"""
+        for row in rows:
+            self.claimed_scores[row[0]] = self.score(*row[:2], *row[3:])
+        ranked = sorted(rows, key=lambda row: -self.claimed_scores[row[0]])
+        
+        if rows:
+            retries = sum(1 for row in rows if row[4])
+            with_images = sum(1 for row in rows if row[0] in self.tools_with_images)
+            logger.info(f"Scheduled {len(rows)} tools by priority ({retries} retries last, "
+                        f"{with_images} with images on disk)")
+        return [row[:3] for row in ranked]
+
 class IronwoodProcessor:
     """Data processor for tool details on IRONWOOD"""
     
-    def __init__(self):
+    def __init__(self, trace_path: Optional[Path] = None, progress_store: Optional[ProgressStore] = None):
         self.session: Optional[aiohttp.ClientSession] = None
+        self.progress_store: Optional[ProgressStore] = None
         self.progress_db = None
-        self.processed_tools = []
-        self.failed_processing = []
+        self.stats = StreamingStats(sample_size=REPORT_SAMPLE_SIZE)
+        self.metrics = StageMetrics('ironwood')
+        self.tracer = StageTracer('ironwood', trace_path)
+        self.drain = StageDrain('ironwood')  # Tool claims in the progress store are the checkpoint
+        self.ledger = RunLedger('ironwood')
+        self.scheduler: Optional[ToolScheduler] = None  # Built with each claim
+        
+        # Blocking image downloads and transcodes run on the event loop unless
+        # pools are set (single-node-pipeline.py sets both)
+        self.download_pool: Optional[Executor] = None
+        self.transcode_pool: Optional[Executor] = None
         
         # Ensure directories exist
         IMAGES_DIR.mkdir(parents=True, exist_ok=True)
         PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
         
+        # Every detail page parsed is archived for offline re-extraction (--replay)
+        self.page_archive = PageArchive(PAGE_ARCHIVE_DIR, 'ironwood')
+        
         # Connect to shared database
-        self.connect_to_database()
+        self.connect_to_database(progress_store)
     
-    def connect_to_database(self):
-        """Connect to the shared SQLite database created by WALNUT"""
-        if not DATABASE_PATH.exists():
-            logger.error(f"Database not found at {DATABASE_PATH}")
-            raise FileNotFoundError("WALNUT coordination database not found")
-        
-        self.progress_db = sqlite3.connect(DATABASE_PATH)
-        
-        # Add processing tracking columns
-        cursor = self.progress_db.cursor()
-        try:
-            cursor.execute('''
-                ALTER TABLE discovered_tools 
-                ADD COLUMN processing_started_at TIMESTAMP
-            ''')
-        except sqlite3.OperationalError:
-            pass  # Column might already exist
-        
-        try:
-            cursor.execute('''
-                ALTER TABLE discovered_tools 
-                ADD COLUMN processing_completed_at TIMESTAMP
-            ''')
-        except sqlite3.OperationalError:
-            pass
-        
-        try:
-            cursor.execute('''
-                ALTER TABLE discovered_tools 
-                ADD COLUMN processing_error TEXT
-            ''')
-        except sqlite3.OperationalError:
-            pass
-        
-        self.progress_db.commit()
-        logger.info("Connected to shared database")
+    def connect_to_database(self, progress_store: Optional[ProgressStore] = None):
+        """Open the node-local progress store, or use a pipeline's; WALNUT's discoveries arrive via pull()"""
+        self.progress_store = progress_store or ProgressStore('ironwood', LOCAL_DATABASE_PATH, CHANGESET_DIR)
+        self.progress_db = self.progress_store.conn
+        self.progress_db.on_commit = lambda seconds: self.metrics.observe('db_commit_seconds', seconds)
+        logger.info(f"Local progress store ready at {self.progress_store.local_path}")
     
     async def wait_for_walnut_completion(self) -> bool:
         """Wait for WALNUT to complete coordination"""
@@ -107,29 +231,25 @@ class IronwoodProcessor:
                 logger.info("WALNUT coordination completed - starting processing")
                 return True
             
-            await asyncio.sleep(10)  # Check every 10 seconds
+            if not await self.drain.sleep(10):  # Check every 10 seconds
+                logger.info("Drained while waiting for WALNUT")
+                return False
         
         logger.error("Timeout waiting for WALNUT completion")
         return False
     
     async def create_session(self):
         """Create aiohttp session for tool detail fetching"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
-        
         timeout = aiohttp.ClientTimeout(total=45)
-        self.session = aiohttp.ClientSession(headers=headers, timeout=timeout)
+        self.session = aiohttp.ClientSession(headers=REQUEST_HEADERS, timeout=timeout)
         logger.info("HTTP session created for detail processing")
     
-    async def fetch_tool_details(self, tool_id: str, tool_url: str) -> Tuple[bool, Dict, str]:
+    async def fetch_tool_details(self, tool_id: str, tool_url: str) -> Tuple[bool, Optional[ProcessedTool], str]:
         """
         Fetch detailed information for a single tool
         
         Returns:
-            Tuple of (success, tool_data_dict, error_message)
+            Tuple of (success, tool_record, error_message)
         """
         if not self.session:
             await self.create_session()
@@ -137,127 +257,93 @@ class IronwoodProcessor:
         try:
             logger.info(f"Processing tool {tool_id}")
             
-            async with self.session.get(tool_url) as response:
-                if response.status != 200:
-                    error_msg = f"HTTP {response.status} for tool {tool_id}"
-                    logger.error(error_msg)
-                    return False, {}, error_msg
-                
-                html_content = await response.text()
-                
-                # Parse tool details from HTML
-                tool_data = await self.parse_tool_details(html_content, tool_id, tool_url)
-                
-                # Download and process images
-                if tool_data.get('image_urls'):
-                    tool_data['processed_images'] = await self.process_tool_images(
-                        tool_id, tool_data['image_urls']
-                    )
-                
-                return True, tool_data, ""
+            fetch_started = time.perf_counter()
+            with self.metrics.in_flight(), self.tracer.span('http_fetch', tool_id):
+                async with self.session.get(tool_url) as response:
+                    self.metrics.inc('http_responses_total', code=response.status)
+                    if response.status != 200:
+                        error_msg = f"HTTP {response.status} for tool {tool_id}"
+                        logger.error(error_msg)
+                        return False, None, error_msg
+                    
+                    # Scan fields as chunks arrive and stop reading at the footer
+                    scanner = FieldScanner(DETAIL_FIELD_PATTERNS)
+                    page = await read_page(response, DETAIL_STOP_PATTERN, on_text=scanner.scan)
+            self.metrics.observe('fetch_seconds', time.perf_counter() - fetch_started)
+            
+            record_streamed_page(self.stats, page)
+            with self.tracer.span('archive_write', tool_id):
+                self.page_archive.store(tool_url, page.text, 'tool_detail', tool_id)
+            
+            # Parse tool details from HTML
+            with self.metrics.time('parse_seconds'), self.tracer.span('parse', tool_id):
+                tool_data = self.parse_tool_details(page.text, tool_id, tool_url, scanner)
+            
+            # Download and process images
+            if tool_data.get('image_urls'):
+                tool_data['processed_images'] = await self.process_tool_images(
+                    tool_id, tool_data['image_urls']
+                )
+            
+            return True, tool_data, ""
         
         except Exception as e:
             error_msg = f"Exception processing tool {tool_id}: {str(e)}"
             logger.error(error_msg)
-            return False, {}, error_msg
+            return False, None, error_msg
     
-    async def parse_tool_details(self, html_content: str, tool_id: str, tool_url: str) -> Dict:
+    @staticmethod
+    def parse_tool_details(html_content: str, tool_id: str, tool_url: str,
+                           scanner: Optional[FieldScanner] = None) -> ProcessedTool:
         """
         Parse detailed tool information from HTML
         
+        `scanner` carries field matches already found while the page streamed
+        in; without one the whole of html_content is scanned here. Static so
+        replay workers can run it without a processor, session or database.
+        
         TODO: Integrate with deepseek-coder-v2 for advanced extraction
         """
-        import re
-        from html import unescape
+        if scanner is None:
+            scanner = FieldScanner(DETAIL_FIELD_PATTERNS)
+        scanner.scan(html_content, final=True)
         
-        tool_data = {
-            'id': tool_id,
-            'url': tool_url,
-            'scraped_at': datetime.now().isoformat()
-        }
+        tool_data = ProcessedTool(id=tool_id, url=tool_url, scraped_at=datetime.now().isoformat())
         
         # Extract tool name (improved parsing)
-        name_pattern = r'<h1[^>]*>([^<]+)</h1>'
-        name_match = re.search(name_pattern, html_content)
-        tool_data['name'] = unescape(name_match.group(1).strip()) if name_match else f"Tool {tool_id}"
-        
-        # Extract manufacturer/brand
-        brand_patterns = [
-            r'<strong>Brand:</strong>\s*([^<\n]+)',
-            r'<strong>Manufacturer:</strong>\s*([^<\n]+)',
-            r'Manufacturer:\s*([^<\n]+)',
-        ]
-        for pattern in brand_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match:
-                tool_data['brand'] = unescape(match.group(1).strip())
-                break
-        
-        # Extract model/product code
-        model_patterns = [
-            r'<strong>Model:</strong>\s*([^<\n]+)',
-            r'<strong>Product Code:</strong>\s*([^<\n]+)',
-            r'Model:\s*([^<\n]+)',
-        ]
-        for pattern in model_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match:
-                tool_data['model'] = unescape(match.group(1).strip())
-                break
-        
-        # Extract description
-        desc_patterns = [
-            r'<div[^>]*class="[^"]*description[^"]*"[^>]*>([^<]+)</div>',
-            r'<p[^>]*class="[^"]*description[^"]*"[^>]*>([^<]+)</p>',
-        ]
-        for pattern in desc_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            if match:
-                tool_data['description'] = unescape(match.group(1).strip())
-                break
-        
-        # Extract category from breadcrumbs or navigation
-        category_pattern = r'Inventory\s*>\s*Tools\s*>\s*([^>]+)>'
-        category_match = re.search(category_pattern, html_content)
-        if category_match:
-            tool_data['category'] = unescape(category_match.group(1).strip())
+        name = scanner.group('name')
+        tool_data['name'] = unescape(name.strip()) if name else f"Tool {tool_id}"
         
-        # Extract image URLs (AWS S3 hosted images)
-        image_patterns = [
-            r'<img[^>]*src="([^"]*amazonaws\.com[^"]*)"',
-            r'src="([^"]*\.(jpg|jpeg|png|gif))"',
-        ]
+        # Extract manufacturer/brand, model/product code, description and the
+        # category from breadcrumbs or navigation
+        for field in ('brand', 'model', 'description', 'category'):
+            value = scanner.group(field)
+            if value:
+                tool_data[field] = unescape(value.strip())
         
+        # Extract image URLs (AWS S3 hosted images)
         image_urls = []
-        for pattern in image_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    url = match[0]
-                else:
-                    url = match
+        for pattern in DETAIL_IMAGE_PATTERNS:
+            for match in pattern.finditer(html_content):
+                url = match.group(1)
                 if url not in image_urls:
                     image_urls.append(url)
         
         tool_data['image_urls'] = image_urls
         
         # Extract specifications table if present
-        spec_pattern = r'<table[^>]*class="[^"]*spec[^"]*"[^>]*>(.*?)</table>'
-        spec_match = re.search(spec_pattern, html_content, re.IGNORECASE | re.DOTALL)
-        if spec_match:
+        spec_table = scanner.group('specifications')
+        if spec_table is not None:
             # Parse specification rows
-            row_pattern = r'<tr[^>]*>.*?<td[^>]*>([^<]+)</td>.*?<td[^>]*>([^<]+)</td>.*?</tr>'
-            spec_rows = re.findall(row_pattern, spec_match.group(1), re.IGNORECASE | re.DOTALL)
-            
             specifications = {}
-            for spec_key, spec_value in spec_rows:
+            for spec_key, spec_value in SPEC_ROW_PATTERN.findall(spec_table):
                 specifications[unescape(spec_key.strip())] = unescape(spec_value.strip())
             
             tool_data['specifications'] = specifications
         
         return tool_data
     
-    async def process_tool_images(self, tool_id: str, image_urls: List[str]) -> List[Dict]:
+    async def process_tool_images(self, tool_id: str, image_urls: List[str]) -> List[ImageVariant]:
         """Download and optimize tool images"""
         processed_images = []
         
@@ -271,28 +357,31 @@ class IronwoodProcessor:
                 # Download image
                 logger.info(f"Downloading image {i+1} for tool {tool_id}")
                 
-                response = requests.get(image_url, timeout=30, stream=True)
-                response.raise_for_status()
-                
                 # Save original temporarily
                 temp_path = filepath.with_suffix('.tmp')
-                with open(temp_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                with self.metrics.in_flight(), self.tracer.span('image_download', tool_id, image=i + 1):
+                    status, bytes_in = await self.run_blocking(self.download_pool, download_image, image_url, temp_path)
+                self.metrics.inc('http_responses_total', code=status)
+                if status >= 400:
+                    raise RuntimeError(f"HTTP {status} for image")
+                self.metrics.inc('image_bytes_total', bytes_in, direction='in')
                 
                 # Optimize image
-                optimized_path = await self.optimize_image(temp_path, filepath)
+                with self.metrics.time('transcode_seconds'), self.tracer.span('transcode', tool_id, image=i + 1):
+                    optimized_path = await self.optimize_image(temp_path, filepath)
                 
                 # Clean up temp file
                 temp_path.unlink()
                 
-                processed_images.append({
-                    'original_url': image_url,
-                    'local_path': str(optimized_path),
-                    'filename': filename,
-                    'size_bytes': optimized_path.stat().st_size,
-                    'processed_at': datetime.now().isoformat()
-                })
+                size_bytes = optimized_path.stat().st_size
+                self.metrics.inc('image_bytes_total', size_bytes, direction='out')
+                processed_images.append(ImageVariant(
+                    original_url=image_url,
+                    local_path=str(optimized_path),
+                    filename=filename,
+                    size_bytes=size_bytes,
+                    processed_at=datetime.now().isoformat()
+                ))
                 
             except Exception as e:
                 logger.error(f"Failed to process image {image_url}: {e}")
@@ -302,63 +391,59 @@ class IronwoodProcessor:
     
     async def optimize_image(self, input_path: Path, output_path: Path) -> Path:
         """Optimize image for web use"""
-        try:
-            with Image.open(input_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Resize if too large
-                if img.width > MAX_IMAGE_WIDTH or img.height > MAX_IMAGE_HEIGHT:
-                    img.thumbnail((MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT), Image.Resampling.LANCZOS)
-                
-                # Save optimized version
-                img.save(output_path, 'JPEG', quality=IMAGE_QUALITY, optimize=True)
-            
-            return output_path
-            
-        except Exception as e:
-            logger.error(f"Image optimization failed: {e}")
-            # Just copy the original if optimization fails
-            input_path.rename(output_path)
-            return output_path
+        return await self.run_blocking(self.transcode_pool, optimize_image_file, input_path, output_path)
+    
+    async def run_blocking(self, pool: Optional[Executor], func, *args):
+        """Run a blocking call in pool, or inline when there is none"""
+        if pool is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
     
     async def get_unprocessed_tools(self) -> List[Tuple[str, str, str]]:
-        """Get list of tools that need processing"""
+        """Get list of tools that need processing, highest priority first"""
+        self.progress_store.pull()
+        
+        # Tools a crashed run started but never finished are claimed again
+        released = self.release_unfinished_claims()
+        if released:
+            logger.info(f"Released {released} tools left in flight by an earlier run")
+        
+        retried = self.progress_db.execute(RELEASE_FAILED_TOOLS_SQL, (MAX_PROCESSING_ATTEMPTS,)).rowcount
+        self.progress_db.commit()
+        if retried:
+            logger.info(f"Retrying {retried} failed tools (up to {MAX_PROCESSING_ATTEMPTS} attempts each)")
+        
         cursor = self.progress_db.cursor()
-        cursor.execute('''
-            SELECT tool_id, tool_name, tool_url 
-            FROM discovered_tools 
-            WHERE processed_by_ironwood = FALSE 
-            AND processing_started_at IS NULL
-            ORDER BY id
-        ''')
+        new_since = cursor.execute(LAST_PROCESSING_COMPLETED_SQL).fetchone()[0]
+        cursor.execute(CLAIM_UNPROCESSED_TOOLS_SQL)
         
-        return cursor.fetchall()
+        self.scheduler = ToolScheduler(IMAGES_DIR, new_since)
+        return self.scheduler.order(cursor.fetchall())
+    
+    def release_unfinished_claims(self) -> int:
+        """Clear the claim on every started but unfinished tool so it is processed again"""
+        released = self.progress_db.execute(RELEASE_UNFINISHED_CLAIMS_SQL).rowcount
+        self.progress_db.commit()
+        return released
     
     async def mark_processing_started(self, tool_id: str):
         """Mark tool as processing started"""
-        cursor = self.progress_db.cursor()
-        cursor.execute('''
-            UPDATE discovered_tools 
-            SET processing_started_at = ?, processed_by_ironwood = FALSE
-            WHERE tool_id = ?
-        ''', (datetime.now(), tool_id))
-        self.progress_db.commit()
+        with self.tracer.span('db_update', tool_id):
+            cursor = self.progress_db.cursor()
+            cursor.execute(MARK_PROCESSING_STARTED_SQL, (datetime.now(), tool_id))
+            self.progress_db.commit()
     
     async def mark_processing_completed(self, tool_id: str, success: bool, error_msg: str = ""):
         """Mark tool processing as completed"""
-        cursor = self.progress_db.cursor()
-        cursor.execute('''
-            UPDATE discovered_tools 
-            SET processed_by_ironwood = ?, processing_completed_at = ?, processing_error = ?
-            WHERE tool_id = ?
-        ''', (success, datetime.now(), error_msg, tool_id))
-        self.progress_db.commit()
+        with self.tracer.span('db_update', tool_id):
+            cursor = self.progress_db.cursor()
+            cursor.execute(MARK_PROCESSING_COMPLETED_SQL, (success, datetime.now(), error_msg, int(not success), tool_id))
+            self.progress_db.commit()
     
     async def process_all_tools(self):
         """Main processing function for all discovered tools"""
         logger.info("Starting IRONWOOD processing of tool details")
+        self.ledger.start()
         
         # Get unprocessed tools
         unprocessed_tools = await self.get_unprocessed_tools()
@@ -372,56 +457,105 @@ class IronwoodProcessor:
         
         # Process tools with concurrency control
         semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self.metrics.set('queue_depth', total_tools, queue='tools')
         
         async def process_single_tool(tool_info):
             tool_id, tool_name, tool_url = tool_info
             
             async with semaphore:
-                await self.mark_processing_started(tool_id)
-                
-                try:
-                    await asyncio.sleep(REQUEST_DELAY)  # Rate limiting
-                    
-                    success, tool_data, error_msg = await self.fetch_tool_details(tool_id, tool_url)
-                    
-                    if success:
-                        # Save processed data
-                        data_file = PROCESSED_DATA_DIR / f"tool_{tool_id}.json"
-                        with open(data_file, 'w') as f:
-                            json.dump(tool_data, f, indent=2)
-                        
-                        self.processed_tools.append(tool_data)
-                        await self.mark_processing_completed(tool_id, True)
-                        logger.info(f"Successfully processed tool {tool_id}: {tool_name}")
-                    else:
-                        self.failed_processing.append(tool_id)
-                        await self.mark_processing_completed(tool_id, False, error_msg)
-                        logger.error(f"Failed to process tool {tool_id}: {error_msg}")
-                
-                except Exception as e:
-                    error_msg = f"Unexpected error: {str(e)}"
-                    self.failed_processing.append(tool_id)
-                    await self.mark_processing_completed(tool_id, False, error_msg)
-                    logger.error(f"Exception processing tool {tool_id}: {e}")
+                if self.drain.draining:
+                    return  # Left unclaimed for the next run
+                self.tracer.record('queue_wait', queued_at, time.perf_counter(), tool_id)
+                await self.drain.guard(self.process_tool(tool_id, tool_name, tool_url))
+                self.metrics.dec('queue_depth', queue='tools')
         
-        # Process all tools
+        # Process all tools; they take the semaphore in the scheduler's order
         start_time = time.time()
+        queued_at = time.perf_counter()
         tasks = [process_single_tool(tool_info) for tool_info in unprocessed_tools]
         await asyncio.gather(*tasks, return_exceptions=True)
         
         elapsed_time = time.time() - start_time
         
+        if self.drain.draining:
+            handled = self.finish_drain()
+            await self.generate_processing_report(handled, elapsed_time)
+            return
+        
         # Generate processing report
         await self.generate_processing_report(total_tools, elapsed_time)
         
         # Signal ROSEWOOD for QA
         await self.signal_rosewood_qa()
     
+    def finish_drain(self) -> int:
+        """Release tools cut off mid-processing and ship progress; returns the tools finished"""
+        released = self.release_unfinished_claims()
+        self.progress_store.ship()
+        
+        handled = self.stats.counter('tools_processed') + self.stats.counter('tools_failed')
+        logger.warning(f"IRONWOOD drained: {handled} tools processed in this run and {released} in-flight "
+                       f"tools released; the rest are left for the next run and ROSEWOOD is not signalled")
+        return handled
+    
+    async def process_tool(self, tool_id: str, tool_name: str, tool_url: str) -> Optional[ProcessedTool]:
+        """Fetch, process, save and record one tool; returns its record, or None if it failed"""
+        await self.mark_processing_started(tool_id)
+        tool_started = time.time()
+        
+        try:
+            with self.tracer.span('rate_limit_wait', tool_id):
+                await asyncio.sleep(REQUEST_DELAY)  # Rate limiting
+            
+            success, tool_data, error_msg = await self.fetch_tool_details(tool_id, tool_url)
+            
+            if success:
+                # Save processed data
+                with self.tracer.span('record_write', tool_id):
+                    write_record_file(PROCESSED_DATA_DIR, tool_id, tool_data)
+                
+                self.record_success(tool_data, time.time() - tool_started)
+                await self.mark_processing_completed(tool_id, True)
+                logger.info(f"Successfully processed tool {tool_id}: {tool_name}")
+            else:
+                tool_data = None
+                self.record_failure(tool_id, error_msg)
+                await self.mark_processing_completed(tool_id, False, error_msg)
+                logger.error(f"Failed to process tool {tool_id}: {error_msg}")
+        
+        except Exception as e:
+            tool_data = None
+            error_msg = f"Unexpected error: {str(e)}"
+            self.record_failure(tool_id, error_msg)
+            await self.mark_processing_completed(tool_id, False, error_msg)
+            logger.error(f"Exception processing tool {tool_id}: {e}")
+        
+        self.progress_store.maybe_ship()
+        return tool_data
+    
+    def record_success(self, tool_data: ProcessedTool, elapsed: float):
+        """Fold a processed tool into the streaming report statistics"""
+        self.metrics.inc('tools_total', result='processed')
+        images = tool_data.get('processed_images', [])
+        self.stats.count('tools_processed')
+        self.stats.count('images_processed', len(images))
+        self.stats.count('image_bytes_written', sum(img.get('size_bytes', 0) for img in images))
+        self.stats.observe('images_per_tool', len(images), IMAGES_PER_TOOL_BUCKETS)
+        self.stats.observe('tool_processing_seconds', elapsed, PROCESSING_SECONDS_BUCKETS)
+        self.stats.sample('processed_tools', tool_data.to_dict())
+    
+    def record_failure(self, tool_id: str, error_msg: str):
+        """Fold a failed tool into the streaming report statistics"""
+        self.metrics.inc('tools_total', result='failed')
+        self.stats.count('tools_failed')
+        self.stats.sample('failed_tools', tool_id, FAILED_TOOLS_SAMPLE_SIZE)
+        self.stats.issue('processing_errors', error_msg)
+    
     async def generate_processing_report(self, total_tools: int, elapsed_time: float):
         """Generate comprehensive processing report"""
         
-        successful_count = len(self.processed_tools)
-        failed_count = len(self.failed_processing)
+        successful_count = self.stats.counter('tools_processed')
+        failed_count = self.stats.counter('tools_failed')
         
         report = {
             "ironwood_processing_report": {
@@ -433,7 +567,15 @@ class IronwoodProcessor:
                     "success_rate": (successful_count / total_tools * 100) if total_tools > 0 else 0,
                     "elapsed_time_seconds": elapsed_time
                 },
-                "failed_tools": self.failed_processing,
+                "failed_tools_sample": sorted(self.stats.sampled('failed_tools')),
+                "most_common_errors": self.stats.top('processing_errors'),
+                "image_summary": {
+                    "images_processed": self.stats.counter('images_processed'),
+                    "image_bytes_written": self.stats.counter('image_bytes_written'),
+                    "images_per_tool": self.stats.histogram('images_per_tool').to_dict()
+                },
+                "tool_processing_seconds": self.stats.histogram('tool_processing_seconds').to_dict(),
+                "page_streaming": streamed_pages_summary(self.stats),
                 "output_locations": {
                     "processed_data": str(PROCESSED_DATA_DIR),
                     "optimized_images": str(IMAGES_DIR),
@@ -442,7 +584,7 @@ class IronwoodProcessor:
                 "next_steps": {
                     "rosewood_qa": "Ready for QA validation and testing"
                 },
-                "sample_processed_tools": self.processed_tools[:3]  # First 3 tools
+                "sample_processed_tools": self.stats.sampled('processed_tools')  # Random sample
             }
         }
         
@@ -458,11 +600,15 @@ class IronwoodProcessor:
         """Create signal file for ROSEWOOD QA testing"""
         signal_file = SHARED_DIR / "ironwood_completed.signal"
         
+        # Processing results must be shipped before ROSEWOOD is told to pull them
+        self.progress_store.ship()
+        self.progress_store.publish(DATABASE_PATH)
+        
         signal_data = {
             "processor": "IRONWOOD",
             "completion_time": datetime.now().isoformat(),
-            "tools_processed": len(self.processed_tools),
-            "tools_failed": len(self.failed_processing),
+            "tools_processed": self.stats.counter('tools_processed'),
+            "tools_failed": self.stats.counter('tools_failed'),
             "data_location": str(PROCESSED_DATA_DIR),
             "images_location": str(IMAGES_DIR),
             "next_processor": "ROSEWOOD",
@@ -479,16 +625,163 @@ class IronwoodProcessor:
         if self.session:
             await self.session.close()
         
-        if self.progress_db:
-            self.progress_db.close()
+        if self.progress_store:
+            self.progress_store.close()
+        
+        await self.metrics.stop()
+        
+        self.tracer.close()
+        if self.tracer.enabled:
+            logger.info(f"Span trace written to {self.tracer.path}")
         
         logger.info("IRONWOOD processor cleanup completed")
 
-async def main():
+def download_image(image_url: str, temp_path: Path) -> Tuple[int, int]:
+    """Fetch one image into temp_path, blocking; returns (HTTP status, bytes written)"""
+    import requests  # Imported on first use so runs with no images to fetch start faster
+    
+    with requests.get(image_url, timeout=30, stream=True) as response:
+        if response.status_code >= 400:
+            return response.status_code, 0
+        
+        written = 0
+        with open(temp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                f.write(chunk)
+                written += len(chunk)
+        return response.status_code, written
+
+def optimize_image_file(input_path: Path, output_path: Path) -> Path:
+    """Resize and recompress one image for web use, blocking"""
+    from PIL import Image
+    
+    try:
+        with Image.open(input_path) as img:
+            # Convert to RGB if necessary
+            if img.mode in ('RGBA', 'P'):
+                img = img.convert('RGB')
+            
+            # Resize if too large
+            if img.width > MAX_IMAGE_WIDTH or img.height > MAX_IMAGE_HEIGHT:
+                img.thumbnail((MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT), Image.Resampling.LANCZOS)
+            
+            # Save optimized version
+            img.save(output_path, 'JPEG', quality=IMAGE_QUALITY, optimize=True)
+        
+        return output_path
+        
+    except Exception as e:
+        logger.error(f"Image optimization failed: {e}")
+        # Just copy the original if optimization fails
+        input_path.rename(output_path)
+        return output_path
+
+def replay_tool_page(tool_id: str, tool_url: str, html_content: str,
+                     data_dir: str, output_dir: str) -> Tuple[str, str, int]:
+    """
+    Re-extract one archived detail page (runs in replay worker processes)
+    
+    Images already processed for URLs the page still yields are carried
+    over from the existing record; the rest need a live image pass.
+    Returns (tool_id, 'updated' or 'unchanged', images still missing).
+    """
+    tool_data = IronwoodProcessor.parse_tool_details(html_content, tool_id, tool_url)
+    
+    previous_file = record_file(data_dir, tool_id)
+    if not previous_file.exists():
+        previous_file = previous_file.with_suffix(LEGACY_RECORD_FILE_SUFFIX)
+    previous = None
+    if previous_file.exists():
+        previous = read_record_file(ProcessedTool, previous_file)
+        tool_data['scraped_at'] = previous.get('scraped_at') or tool_data['scraped_at']
+        image_urls = set(tool_data['image_urls'])
+        carried = [img for img in previous.get('processed_images') or [] if img.get('original_url') in image_urls]
+        if carried:
+            tool_data['processed_images'] = carried
+    
+    processed_urls = {img.get('original_url') for img in tool_data.get('processed_images') or []}
+    images_missing = sum(1 for url in tool_data['image_urls'] if url not in processed_urls)
+    
+    output_file = record_file(output_dir, tool_id)
+    if previous is not None and output_file == previous_file and previous == tool_data:
+        return tool_id, 'unchanged', images_missing
+    
+    write_record_file(output_dir, tool_id, tool_data)
+    return tool_id, 'updated', images_missing
+
+def replay_archive(output_dir: Path, workers: Optional[int] = None):
+    """Re-run detail extraction over every archived page, without touching MyTurn"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Replaying archived detail pages from {PAGE_ARCHIVE_DIR} into {output_dir}")
+    
+    start_time = time.time()
+    stats = StreamingStats(sample_size=REPORT_SAMPLE_SIZE)
+    extract = partial(replay_tool_page, data_dir=str(PROCESSED_DATA_DIR), output_dir=str(output_dir))
+    
+    for tool_id, status, images_missing in replay(PAGE_ARCHIVE_DIR, 'tool_detail', extract, workers):
+        stats.count(f'tools_{status}')
+        stats.count('images_missing', images_missing)
+        if images_missing:
+            stats.sample('tools_needing_images', tool_id)
+        if status == 'updated':
+            stats.sample('updated_tools', tool_id)
+    
+    elapsed_time = time.time() - start_time
+    replayed = stats.counter('tools_updated') + stats.counter('tools_unchanged')
+    
+    report = {
+        "ironwood_replay_report": {
+            "timestamp": datetime.now().isoformat(),
+            "archive": str(PAGE_ARCHIVE_DIR),
+            "output": str(output_dir),
+            "tools_replayed": replayed,
+            "tools_updated": stats.counter('tools_updated'),
+            "tools_unchanged": stats.counter('tools_unchanged'),
+            "images_missing": stats.counter('images_missing'),
+            "elapsed_time_seconds": elapsed_time,
+            "updated_tools_sample": sorted(stats.sampled('updated_tools')),
+            "tools_needing_images_sample": sorted(stats.sampled('tools_needing_images'))
+        }
+    }
+    
+    report_path = SHARED_DIR / f"ironwood_replay_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    logger.info(f"Replay report saved to {report_path}")
+    logger.info(f"IRONWOOD REPLAY: {replayed} tools re-extracted in {elapsed_time:.1f}s, "
+                f"{stats.counter('tools_updated')} updated")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="IRONWOOD tool detail processing")
+    parser.add_argument('--replay', action='store_true',
+                        help="Re-extract tool details from the page archive instead of fetching MyTurn "
+                             "(archived pages stop at the footer; later content needs a re-fetch)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Replay worker processes (defaults to one per CPU)")
+    parser.add_argument('--output', type=Path, default=PROCESSED_DATA_DIR,
+                        help="Directory for replayed tool records (defaults to the processed data directory)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve Prometheus metrics on this port at /metrics (off by default)")
+    parser.add_argument('--trace', nargs='?', const=default_trace_path('ironwood'), type=Path, default=None,
+                        help="Write per-tool spans to a Chrome trace file (default under ~/.local/share/ballarat-scraping/traces)")
+    parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES, default=None,
+                        help="Profile the run (sampled stacks by default, or cprofile) and monitor event-loop lag; results go next to the stage report")
+    return parser.parse_args()
+
+async def main(args):
     """Main execution function"""
-    processor = IronwoodProcessor()
+    processor = IronwoodProcessor(trace_path=args.trace)
+    profiler = StageProfiler('ironwood', args.profile, SHARED_DIR)
+    outcome = 'completed'
     
     try:
+        profiler.start()
+        processor.drain.install()
+        if args.metrics_port:
+            await processor.metrics.start(args.metrics_port)
+        
         # Wait for WALNUT to complete
         if not await processor.wait_for_walnut_completion():
             logger.error("WALNUT coordination not completed - exiting")
@@ -498,13 +791,28 @@ async def main():
         await processor.process_all_tools()
         
     except KeyboardInterrupt:
+        outcome = 'interrupted'
         logger.info("Processing interrupted by user")
     except Exception as e:
+        outcome = 'failed'
         logger.error(f"Unexpected error: {e}")
     finally:
+        processor.drain.uninstall()
+        processor.ledger.record(processor.progress_store, processor.metrics, processor.stats,
+                                processor.drain, outcome)
         await processor.cleanup()
+        profiler.stop()
 
 if __name__ == "__main__":
+    args = parse_args()
     print("IRONWOOD Processor - Ballarat Tool Library Tool Detail Processing")
     print("=" * 70)
-    asyncio.run(main())
\ No newline at end of file
+    if args.replay:
+        profiler = StageProfiler('ironwood_replay', args.profile, SHARED_DIR)
+        profiler.start()
+        try:
+            replay_archive(args.output, args.workers)
+        finally:
+            profiler.stop()
+    else:
+        asyncio.run(main(args))
\ No newline at end of file
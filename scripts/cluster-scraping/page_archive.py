@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Content-addressed archive of fetched pages
+Ballarat Tool Library Data Migration - Shared by WALNUT and IRONWOOD
+
+Every page a stage parses is kept so extraction fixes can be re-applied
+offline instead of re-scraping MyTurn at REQUEST_DELAY per page. Each
+distinct page body is compressed once (zstandard, or zlib without it) and
+appended to the node's current segment file; `index.jsonl` maps every
+fetch (url, page kind, key such as the tool ID) to the body's SHA-256 and
+its place in a segment, so re-fetching an unchanged page adds one index
+line and no data.
+
+Stored bodies are what the stages parsed, not the whole response: HTML
+pages are read only up to the footer (see page_stream.py), so an archived
+page is the pre-footer prefix and the trailing scripts and any JSON-LD
+after it are not kept. Replay can re-run extraction over that prefix but
+cannot recover anything later in the page.
+
+Segments are append-only and read back through mmap. replay() hands
+batches of one segment to a process pool, and each worker decompresses
+its pages straight out of the page cache and runs the extraction on them.
+
+Usage:
+    python3 page_archive.py stats --archive /rust/containers/ballarat-scraping/page_archive
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configuration
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+REPLAY_BATCH_SIZE = 100  # Pages per pool task; small enough to spread one segment over every core
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ArchiveEntry:
+    """One fetch of one page, and where its body lives"""
+    url: str
+    kind: str  # 'catalog' or 'tool_detail'
+    key: str  # Catalog page URL or tool ID
+    sha256: str
+    segment: str  # Path relative to the archive root
+    offset: int
+    length: int  # Compressed bytes
+    size: int  # Uncompressed bytes
+    codec: str  # 'zstd' or 'zlib'
+    fetched_at: str
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """Compress a page body with the best codec available"""
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return 'zlib', zlib.compress(data, ZLIB_LEVEL)
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd archive segments")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+class PageArchive:
+    """Append-only page archive written by one node"""
+
+    def __init__(self, root: Path, node: str):
+        self.root = Path(root)
+        self.node_dir = self.root / node
+        self.node_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.node_dir / "index.jsonl"
+
+        # Bodies this node already holds, so unchanged pages are stored once
+        self.bodies: Dict[str, ArchiveEntry] = {}
+        for entry in read_index(self.index_path):
+            self.bodies[entry.sha256] = entry
+
+        segments = sorted(self.node_dir.glob("segment-*.dat"))
+        self.segment_number = int(segments[-1].stem.split('-')[1]) if segments else 0
+        self.segment_path = self.node_dir / f"segment-{self.segment_number:05d}.dat"
+
+    def store(self, url: str, text: str, kind: str, key: str) -> Optional[ArchiveEntry]:
+        """
+        Archive one fetched page, returning its index entry
+
+        Failures are logged and swallowed - losing an archive copy must never
+        fail the fetch it came from.
+        """
+        try:
+            data = text.encode('utf-8')
+            sha256 = hashlib.sha256(data).hexdigest()
+            body = self.bodies.get(sha256)
+
+            if body is None:
+                codec, compressed = compress(data)
+                if self.segment_path.exists() and self.segment_path.stat().st_size + len(compressed) > SEGMENT_MAX_BYTES:
+                    self.segment_number += 1
+                    self.segment_path = self.node_dir / f"segment-{self.segment_number:05d}.dat"
+
+                with open(self.segment_path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(compressed)
+
+                body = ArchiveEntry(url, kind, key, sha256, str(self.segment_path.relative_to(self.root)),
+                                    offset, len(compressed), len(data), codec, "")
+                self.bodies[sha256] = body
+
+            entry = ArchiveEntry(url, kind, key, sha256, body.segment, body.offset, body.length,
+                                 body.size, body.codec, datetime.now().isoformat())
+
+            # The index line goes last; a crash before it leaves only unreferenced bytes
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(asdict(entry), separators=(',', ':')) + '\n')
+            return entry
+
+        except OSError as e:
+            logger.warning(f"Could not archive {url}: {e}")
+            return None
+
+def read_index(index_path: Path) -> Iterator[ArchiveEntry]:
+    """Entries from one node's index, skipping a torn final line"""
+    if not index_path.exists():
+        return
+    with open(index_path) as f:
+        for line in f:
+            try:
+                yield ArchiveEntry(**json.loads(line))
+            except (ValueError, TypeError):
+                logger.warning(f"Skipping unreadable line in {index_path}")
+
+def archive_entries(root: Path) -> Iterator[ArchiveEntry]:
+    """Every fetch recorded by every node"""
+    for index_path in sorted(Path(root).glob("*/index.jsonl")):
+        yield from read_index(index_path)
+
+def latest_entries(root: Path, kind: str) -> List[ArchiveEntry]:
+    """The most recent fetch of each page of one kind"""
+    latest = {}
+    for entry in archive_entries(root):
+        if entry.kind == kind:
+            current = latest.get(entry.key)
+            if current is None or entry.fetched_at >= current.fetched_at:
+                latest[entry.key] = entry
+    return list(latest.values())
+
+def read_page_text(root: Path, entry: ArchiveEntry) -> str:
+    """Decompress a single archived page"""
+    with open(Path(root) / entry.segment, 'rb') as f:
+        f.seek(entry.offset)
+        return decompress(entry.codec, f.read(entry.length)).decode('utf-8')
+
+def _replay_batch(root: str, segment: str, entries: List[ArchiveEntry],
+                  extract: Callable[[str, str, str], Any]) -> List[Any]:
+    """Pool task: map one segment and run extract(key, url, text) over a batch of its pages"""
+    results = []
+    with open(Path(root) / segment, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment_map:
+            for entry in entries:
+                data = segment_map[entry.offset:entry.offset + entry.length]
+                text = decompress(entry.codec, data).decode('utf-8')
+                results.append(extract(entry.key, entry.url, text))
+    return results
+
+def replay(root: Path, kind: str, extract: Callable[[str, str, str], Any],
+           workers: Optional[int] = None) -> Iterator[Any]:
+    """
+    Re-run extract(key, url, text) over the latest archived copy of every page of one kind
+
+    extract must be picklable (a module-level function or a functools.partial
+    of one); results are yielded as batches finish, in no particular order.
+    """
+    by_segment = defaultdict(list)
+    for entry in latest_entries(root, kind):
+        by_segment[entry.segment].append(entry)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = []
+        for segment, entries in by_segment.items():
+            entries.sort(key=lambda e: e.offset)  # Sequential reads within the mapping
+            for start in range(0, len(entries), REPLAY_BATCH_SIZE):
+                batch = entries[start:start + REPLAY_BATCH_SIZE]
+                futures.append(pool.submit(_replay_batch, str(root), segment, batch, extract))
+
+        for future in as_completed(futures):
+            yield from future.result()
+
+def archive_stats(root: Path) -> Dict[str, Any]:
+    """Fetch, page and storage counts for an archive"""
+    fetches = defaultdict(int)
+    pages = defaultdict(set)
+    bodies = {}
+    for entry in archive_entries(root):
+        fetches[entry.kind] += 1
+        pages[entry.kind].add(entry.key)
+        bodies[(entry.segment, entry.offset)] = entry
+
+    return {
+        "fetches": dict(fetches),
+        "distinct_pages": {kind: len(keys) for kind, keys in pages.items()},
+        "stored_bodies": len(bodies),
+        "uncompressed_bytes": sum(entry.size for entry in bodies.values()),
+        "compressed_bytes": sum(entry.length for entry in bodies.values()),
+        "segments": len({entry.segment for entry in bodies.values()})
+    }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Content-addressed archive of fetched pages")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    stats_parser = subparsers.add_parser('stats', help="Summarise what an archive holds")
+    stats_parser.add_argument('--archive', type=Path, required=True, help="Archive root directory")
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(json.dumps(archive_stats(args.archive), indent=2))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Incremental page reading with early termination
+Ballarat Tool Library Data Migration - Shared by WALNUT and IRONWOOD
+
+Pages are decoded chunk by chunk as they arrive instead of buffering the
+whole body with `response.text()`. Field patterns are scanned while later
+chunks are still in flight, and reading stops at the first end-of-content
+marker (the footer, ahead of the trailing scripts), closing the connection
+so the rest of the page is neither downloaded nor decoded.
+
+Bytes saved are measured on the wire: Content-Length minus the raw bytes
+aiohttp had received when the response was closed. Anything the transport
+had already read ahead counts as read, and pages without a Content-Length
+report no saving. Raw byte counts need aiohttp 3.13 or later; older
+versions only count decoded bytes, which cannot be compared with the
+Content-Length of a compressed response, so those pages report no saving.
+"""
+
+import codecs
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Pattern, Sequence
+
+import aiohttp
+
+# Configuration
+STREAM_CHUNK_SIZE = 16 * 1024
+MAX_MATCH_CHARS = 4096  # Longest match expected to straddle a chunk boundary
+STOP_MARKER_OVERLAP = 64
+PAGE_KB_BUCKETS = [8, 16, 32, 64, 128, 256, 512, 1024]
+
+@dataclass
+class StreamedPage:
+    """Text consumed from one response and what reading it cost"""
+    text: str
+    bytes_read: int
+    content_length: Optional[int]
+    stopped_early: bool
+    read_on_wire: bool = True  # False when bytes_read counts decoded bytes of a compressed body
+
+    @property
+    def bytes_saved(self) -> Optional[int]:
+        if self.content_length is None or not self.read_on_wire:
+            return None
+        return max(self.content_length - self.bytes_read, 0)
+
+class FieldScanner:
+    """
+    First match of each pattern for single-valued fields, scanned as text arrives
+
+    Patterns are listed per field in priority order, as the stages already
+    try them; the best-priority match found anywhere wins, like running
+    re.search over the whole page pattern by pattern.
+    """
+
+    def __init__(self, fields: Dict[str, Sequence[Pattern]]):
+        self.fields = fields
+        self.matches = {}
+        self.resume = {}
+
+    def scan(self, text: str, final: bool = False):
+        """
+        Search newly arrived text; final=True rescans unmatched patterns fully
+
+        Before the final scan a match is only kept once it ends MAX_MATCH_CHARS
+        short of the text so far, since an open-ended group such as `[^<\n]+`
+        could still grow into the next chunk; until then the pattern resumes
+        from where that match started.
+        """
+        settled = len(text) - MAX_MATCH_CHARS
+        for name, patterns in self.fields.items():
+            for priority, pattern in enumerate(patterns):
+                key = (name, priority)
+                if key in self.matches:
+                    continue
+
+                start = 0 if final else self.resume.get(key, 0)
+                match = pattern.search(text, start)
+                if match and (final or match.end() <= settled):
+                    self.matches[key] = match
+                elif match:
+                    self.resume[key] = match.start()
+                elif not final:
+                    self.resume[key] = max(start, settled)
+
+    def group(self, name: str, group: int = 1) -> Optional[str]:
+        """Captured text of the best-priority match for a field"""
+        for priority in range(len(self.fields[name])):
+            match = self.matches.get((name, priority))
+            if match:
+                return match.group(group)
+        return None
+
+async def read_page(response: aiohttp.ClientResponse, stop_pattern: Optional[Pattern] = None,
+                    on_text: Optional[Callable[[str], None]] = None,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> StreamedPage:
+    """
+    Decode a response incrementally, stopping at the first stop_pattern match
+
+    on_text is called with the text consumed so far after every chunk. The
+    returned text ends just before the stop marker.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    text = ''
+    marker_from = 0
+    stopped_early = False
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        text += decoder.decode(chunk)
+
+        if stop_pattern is not None:
+            marker = stop_pattern.search(text, marker_from)
+            if marker:
+                text = text[:marker.start()]
+                stopped_early = not response.content.at_eof()
+                break
+            marker_from = max(len(text) - STOP_MARKER_OVERLAP, 0)
+
+        if on_text is not None:
+            on_text(text)
+    else:
+        text += decoder.decode(b'', final=True)
+
+    stream = response.content
+    raw_bytes = getattr(stream, 'total_raw_bytes', None)
+    bytes_read = stream.total_bytes if raw_bytes is None else raw_bytes
+    encoding = response.headers.get('Content-Encoding', 'identity').lower()
+    if stopped_early:
+        response.close()  # Drop the rest of the body rather than draining it
+
+    if on_text is not None:
+        on_text(text)
+
+    return StreamedPage(
+        text=text,
+        bytes_read=bytes_read,
+        content_length=response.content_length,
+        stopped_early=stopped_early,
+        read_on_wire=raw_bytes is not None or encoding == 'identity'
+    )
+
+def record_streamed_page(stats, page: StreamedPage):
+    """Fold one page read into a stage's StreamingStats"""
+    stats.count('pages_streamed')
+    stats.count('page_bytes_read', page.bytes_read)
+    stats.observe('page_kb_read', page.bytes_read / 1024, PAGE_KB_BUCKETS)
+    if page.stopped_early:
+        stats.count('pages_stopped_early')
+    if page.bytes_saved is not None:
+        stats.count('pages_with_length')
+        stats.count('page_bytes_saved', page.bytes_saved)
+        stats.observe('page_kb_saved', page.bytes_saved / 1024, PAGE_KB_BUCKETS)
+
+def streamed_pages_summary(stats) -> Dict[str, Any]:
+    """Report section for the pages a stage has streamed"""
+    return {
+        "pages_streamed": stats.counter('pages_streamed'),
+        "pages_stopped_early": stats.counter('pages_stopped_early'),
+        "bytes_read": stats.counter('page_bytes_read'),
+        "bytes_saved": stats.counter('page_bytes_saved'),
+        "pages_with_content_length": stats.counter('pages_with_length'),
+        "kb_read_per_page": stats.histogram('page_kb_read').to_dict(),
+        "kb_saved_per_page": stats.histogram('page_kb_saved').to_dict()
+    }
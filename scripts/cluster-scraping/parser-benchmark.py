@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Parser and validator microbenchmarks
+Ballarat Tool Library Data Migration - Synthetic MyTurn corpus
+
+Runs the per-page and per-tool hot paths of each stage over a generated
+corpus of MyTurn-shaped pages and reports ops/sec and peak allocation per op:
+
+    WALNUT    extract_tool_links, parse_tools_from_page (into a scratch progress store)
+    IRONWOOD  parse_tool_details
+    ROSEWOOD  validate_tool_data, format_tool_for_import
+
+The corpus is deterministic for a seed: catalog pages of 15 and 250 tools,
+link text buried in nested markup, detail pages with typical, 200-row and
+nested-cell spec tables, 60 images, deeply nested layout and sparse pages
+where every fallback pattern scans the whole document. Stage state (progress
+stores, archives) goes to a temporary directory, never the shared one.
+
+Results can be recorded per git commit and compared with an earlier one;
+--check exits 1 when any benchmark is slower, or allocates more, than the
+baseline by more than --threshold.
+
+Usage:
+    python3 parser-benchmark.py                      # Run and print
+    python3 parser-benchmark.py --record             # Run and append to the history
+    python3 parser-benchmark.py --check --record     # Compare with the last other commit, then record
+    python3 parser-benchmark.py --check --baseline 1a2b3c4
+    python3 parser-benchmark.py --check-splits       # Streamed detail parsing vs. unsplit, every offset
+    python3 parser-benchmark.py --write-corpus /tmp/myturn-corpus
+"""
+
+import argparse
+import asyncio
+import html
+import json
+import logging
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from stage_loader import load_stage
+
+# Configuration
+BENCHMARK_SEED = 1209
+BENCHMARK_ROUNDS = 5  # Best round counts, to keep scheduler noise out
+MIN_ROUND_SECONDS = 0.2  # Each round repeats the corpus until it runs at least this long
+REGRESSION_THRESHOLD = 0.15  # Fractional slowdown or allocation growth that fails --check
+HISTORY_PATH = Path.home() / ".local" / "share" / "ballarat-scraping" / "benchmarks" / "parser_benchmarks.jsonl"
+
+BASE_URL = "https://ballarattoollibrary.myturn.com"
+IMAGE_HOST = "https://myturn-images.s3.amazonaws.com/items"
+
+# Vocabulary for generated tools
+CATEGORIES = ['Power Tools', 'Garden Tools', 'Hand Tools', 'Drills', 'Saws', 'Kitchen Tools', 'Books & Media']
+BRANDS = ['Makita', 'Ryobi', 'Bosch', 'DeWalt', 'Ozito', 'Stanley', 'Black & Decker', 'Hitachi']
+KINDS = ['Drill', 'Circular Saw', 'Hedge Trimmer', 'Orbital Sander', 'Pressure Washer', 'Jigsaw',
+         'Angle Grinder', 'Wheelbarrow', 'Spirit Level', 'Socket Set', 'Stand Mixer', 'Post Hole Digger']
+ADJECTIVES = ['Cordless', 'Electric', 'Heavy Duty', 'Compact', '18V', 'Brushless', 'Petrol', '"Pro"']
+WORDS = ['reliable', 'lightweight', 'battery', 'included', 'suitable', 'for', 'garden', 'timber', 'metal',
+         'projects', 'please', 'return', 'clean', 'charger', 'case', 'blade', 'spare', 'manual', 'safety']
+SPEC_KEYS = ['Weight', 'Power', 'Voltage', 'Blade Diameter', 'Chuck Size', 'No Load Speed', 'Cable Length',
+             'Battery', 'Noise Level', 'Dimensions', 'Warranty', 'Tank Capacity']
+
+logger = logging.getLogger(__name__)
+
+def isolate_paths(module, root: Path):
+    """Re-root every path constant of a stage module under root"""
+    for name, value in list(vars(module).items()):
+        if name.isupper() and isinstance(value, Path) and value.is_absolute():
+            setattr(module, name, root / value.relative_to(value.anchor))
+
+# Corpus generation
+
+def tool_name(rng: random.Random) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(BRANDS)} {rng.choice(KINDS)}"
+
+def page_chrome(rng: random.Random, body: str, scripts: int) -> str:
+    """Wrap a page body in MyTurn-like head, navigation, footer and trailing scripts"""
+    nav = ''.join(f'<li><a href="{BASE_URL}/library/inventory/browse?category={i}">{c}</a></li>'
+                  for i, c in enumerate(CATEGORIES))
+    trailing = ''.join(
+        f'<script>window.__state_{i} = {json.dumps({"k": [rng.random() for _ in range(40)]})};</script>'
+        for i in range(scripts)
+    )
+    return (
+        '<!DOCTYPE html><html><head><title>Ballarat Tool Library</title>'
+        '<link rel="stylesheet" href="/assets/app.css"></head><body>'
+        f'<header><nav><ul>{nav}</ul></nav></header><main>{body}</main>'
+        '<footer><p>Ballarat Tool Library - Powered by MyTurn</p></footer>'
+        f'{trailing}</body></html>'
+    )
+
+def catalog_page(rng: random.Random, first_id: int, tools: int, nesting: int = 0) -> str:
+    """A listing page: each tool linked from its image and its title, as MyTurn does"""
+    cards = []
+    for tool_id in range(first_id, first_id + tools):
+        name = html.escape(tool_name(rng))
+        title = ('<span class="t">' * nesting) + name + ('</span>' * nesting)
+        cards.append(
+            f'<div class="item-card"><a href="/library/inventory/show/{tool_id}">'
+            f'<img src="{IMAGE_HOST}/{tool_id}_0_thumb.jpg" alt=""></a>'
+            f'<div class="item-title"><a class="title" href="/library/inventory/show/{tool_id}">{title}</a></div>'
+            f'<div class="item-status">{rng.choice(["Available", "On loan", "Reserved"])}</div></div>'
+        )
+    pager = f'<div class="pager">Showing {first_id} to {first_id + tools - 1} of 1,209 items</div>'
+    return page_chrome(rng, f'<div class="items">{"".join(cards)}</div>{pager}', scripts=6)
+
+def detail_page(rng: random.Random, tool_id: int, specs: int = 6, images: int = 2, nesting: int = 0,
+                nested_cells: bool = False, sparse: bool = False) -> str:
+    """A tool detail page with optional spec table, image gallery and nested layout"""
+    parts = [f'<h1>{html.escape(tool_name(rng))}</h1>']
+    if not sparse:
+        parts.append(f'<p><strong>Brand:</strong> {html.escape(rng.choice(BRANDS))}\n'
+                     f'<strong>Model:</strong> {rng.choice("ABCDEFGH")}{rng.randint(100, 9999)}\n</p>')
+        description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 120)))
+        parts.append(f'<div class="item-description">{description}</div>')
+    parts.append(f'<div class="breadcrumb">Inventory > Tools > {html.escape(rng.choice(CATEGORIES))} > Item</div>')
+
+    if specs:
+        rows = []
+        for i in range(specs):
+            key = f"{rng.choice(SPEC_KEYS)} {i}"
+            value = f"{rng.randint(1, 2000)} {rng.choice(['kg', 'W', 'V', 'mm', 'rpm', 'dB'])}"
+            if nested_cells:
+                value = f'<b><i>{value}</i></b>'
+            rows.append(f'<tr><td class="k">{key}</td><td class="v">{value}</td></tr>')
+        parts.append(f'<table class="table spec-table">{"".join(rows)}</table>')
+
+    gallery = ''.join(f'<img src="{IMAGE_HOST}/{tool_id}_{i}.jpg" alt="photo {i}">' for i in range(images))
+    parts.append(f'<div class="gallery">{gallery}</div>')
+
+    body = ('<div class="col">' * nesting) + ''.join(parts) + ('</div>' * nesting)
+    return page_chrome(rng, body, scripts=12)
+
+def generate_corpus(seed: int = BENCHMARK_SEED) -> Dict[str, Dict[str, List[Tuple[str, str]]]]:
+    """Named cases of (key, page) pairs: catalog pages keyed by page number, detail pages by tool ID"""
+    rng = random.Random(seed)
+    catalog = {
+        'pager_15': [(str(p), catalog_page(rng, 1000 + p * 15, 15)) for p in range(20)],
+        'limit_250': [(str(p), catalog_page(rng, 20000 + p * 250, 250)) for p in range(4)],
+        'nested_titles': [(str(p), catalog_page(rng, 40000 + p * 15, 15, nesting=60)) for p in range(20)],
+    }
+
+    def details(first_id: int, count: int, **shape):
+        return [(str(tool_id), detail_page(rng, tool_id, **shape)) for tool_id in range(first_id, first_id + count)]
+
+    detail = {
+        'typical': [(str(1000 + i), detail_page(rng, 1000 + i, specs=rng.randint(0, 10), images=rng.randint(0, 3)))
+                    for i in range(40)],
+        'large_spec_table': details(2000, 10, specs=200),
+        'nested_spec_cells': details(3000, 10, specs=40, nested_cells=True),
+        'many_images': details(4000, 10, images=60),
+        'deep_nesting': details(5000, 10, nesting=400),
+        'sparse': details(6000, 20, specs=0, images=0, sparse=True),
+    }
+    return {'catalog': catalog, 'detail': detail}
+
+def write_corpus(corpus: Dict, directory: Path):
+    for kind, cases in corpus.items():
+        for case, pages in cases.items():
+            case_dir = directory / kind / case
+            case_dir.mkdir(parents=True, exist_ok=True)
+            for key, page in pages:
+                (case_dir / f"{key}.html").write_text(page)
+
+# Measurement
+
+def measure_ops(run_pass: Callable[[], int], before_pass: Optional[Callable[[], None]] = None,
+                rounds: int = BENCHMARK_ROUNDS) -> float:
+    """Best ops/sec over rounds; run_pass() does one pass over a case and returns its op count"""
+    def timed_round(passes: int) -> Tuple[int, float]:
+        ops, elapsed = 0, 0.0
+        for _ in range(passes):
+            if before_pass:
+                before_pass()
+            started = time.perf_counter()
+            ops += run_pass()
+            elapsed += time.perf_counter() - started
+        return ops, elapsed
+
+    # Grow the round until it is long enough to time, as timeit.autorange does
+    passes = 1
+    ops, elapsed = timed_round(passes)
+    while elapsed < MIN_ROUND_SECONDS:
+        passes *= 2
+        ops, elapsed = timed_round(passes)
+
+    best = ops / elapsed
+    for _ in range(rounds - 1):
+        ops, elapsed = timed_round(passes)
+        best = max(best, ops / elapsed)
+    return best
+
+def measure_allocations(run_one: Callable[[Any], None], items: List[Any]) -> int:
+    """Mean peak bytes allocated while one op runs"""
+    tracemalloc.start()
+    total = 0
+    for item in items:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run_one(item)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - baseline
+    tracemalloc.stop()
+    return total // len(items)
+
+def run_benchmarks(seed: int = BENCHMARK_SEED, rounds: int = BENCHMARK_ROUNDS) -> Dict[str, Dict[str, Dict]]:
+    """Every function over every case of its corpus: {function: {case: {ops_per_sec, alloc_bytes_per_op}}}"""
+    corpus = generate_corpus(seed)
+    scratch = Path(tempfile.mkdtemp(prefix="parser-benchmark-"))
+    walnut = load_stage('walnut-coordinator.py')
+    ironwood = load_stage('ironwood-processor.py')
+    rosewood = load_stage('rosewood-qa.py')
+    for module in (walnut, ironwood, rosewood):
+        isolate_paths(module, scratch)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    loop = asyncio.new_event_loop()
+    coordinator = walnut.WalnutCoordinator()
+    qa = rosewood.RosewoodQA()
+    results: Dict[str, Dict[str, Dict]] = {}
+
+    def bench(function: str, case: str, items: List[Any], run_one: Callable[[Any], Any],
+              before_pass: Optional[Callable[[], None]] = None):
+        def run_pass():
+            for item in items:
+                run_one(item)
+            return len(items)
+        if before_pass:
+            before_pass()
+        alloc = measure_allocations(run_one, items)
+        ops = measure_ops(run_pass, before_pass, rounds)
+        results.setdefault(function, {})[case] = {"ops_per_sec": round(ops, 1), "alloc_bytes_per_op": alloc}
+        logger.info(f"{function:<24} {case:<18} {ops:>10.1f} ops/s {alloc / 1024:>9.1f} KiB/op")
+
+    def async_one(method):
+        return lambda item: loop.run_until_complete(method(item))
+
+    # WALNUT - listing extraction, then the full page parse including the progress store write
+    def reset_discovery():
+        coordinator.seen_tools = walnut.ToolIdIndex()
+        coordinator.progress_db.execute('DELETE FROM discovered_tools')
+        coordinator.progress_db.commit()
+
+    for case, pages in corpus['catalog'].items():
+        bench('extract_tool_links', case, [page for _, page in pages], coordinator.extract_tool_links)
+        items = [(page, int(key)) for key, page in pages]
+        bench('parse_tools_from_page', case, items,
+              async_one(lambda item: coordinator.parse_tools_from_page(item[0], item[1])), reset_discovery)
+
+    # IRONWOOD - detail extraction; its output feeds the ROSEWOOD benchmarks
+    parsed = []
+    for case, pages in corpus['detail'].items():
+        items = [(page, key, f"{BASE_URL}/library/inventory/show/{key}") for key, page in pages]
+        bench('parse_tool_details', case, items, lambda item: ironwood.IronwoodProcessor.parse_tool_details(*item))
+        parsed.extend(ironwood.IronwoodProcessor.parse_tool_details(*item) for item in items)
+
+    # ROSEWOOD - validation and import formatting over the parsed tools, with
+    # processed images on disk for most (one missing and one empty file per ten)
+    images_dir = scratch / "tool_images"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    for i, tool in enumerate(parsed):
+        processed_images = []
+        for n, url in enumerate(tool.get('image_urls', [])[:3]):
+            image_path = images_dir / f"tool_{tool['id']}_{n + 1}.jpg"
+            if i % 10 != 0:
+                image_path.write_bytes(b'' if i % 10 == 5 else bytes(rng.randint(2_000, 60_000)))
+            processed_images.append({'original_url': url, 'local_path': str(image_path), 'filename': image_path.name,
+                                     'size_bytes': 0, 'processed_at': datetime.now().isoformat()})
+        tool['processed_images'] = processed_images
+
+    bench('validate_tool_data', 'parsed_corpus', parsed, async_one(qa.validate_tool_data))
+    bench('format_tool_for_import', 'parsed_corpus', parsed, async_one(qa.format_tool_for_import))
+
+    loop.close()
+    coordinator.progress_store.conn.close()
+    qa.progress_store.conn.close()
+    shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+# Chunk boundary check
+
+def check_chunk_splits(seed: int = BENCHMARK_SEED) -> List[str]:
+    """
+    Stream one page of each detail case in two chunks, split at every offset
+
+    The text up to the footer (what read_page keeps) is scanned as its first
+    chunk arrives and then parsed in full, as IRONWOOD does; each split must
+    extract exactly what parsing the unsplit text does. Returns the mismatches.
+    """
+    ironwood = load_stage('ironwood-processor.py')
+    parse = ironwood.IronwoodProcessor.parse_tool_details
+    failures = []
+    for case, pages in generate_corpus(seed)['detail'].items():
+        key, page = pages[0]
+        url = f"{BASE_URL}/library/inventory/show/{key}"
+        text = page[:ironwood.DETAIL_STOP_PATTERN.search(page).start()]
+        expected = {**parse(text, key, url), 'scraped_at': None}
+
+        for offset in range(1, len(text)):
+            scanner = ironwood.FieldScanner(ironwood.DETAIL_FIELD_PATTERNS)
+            scanner.scan(text[:offset])
+            parsed = {**parse(text, key, url, scanner), 'scraped_at': None}
+            if parsed != expected:
+                fields = sorted(field for field in expected if parsed.get(field) != expected[field])
+                failures.append(f"{case} tool {key} split at {offset}: {', '.join(fields)}")
+        logger.info(f"Checked {len(text) - 1} splits of {case} tool {key}")
+    return failures
+
+# History and regression checks
+
+def git_commit() -> Tuple[Optional[str], bool]:
+    """Current commit and whether the working tree has changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=SCRIPT_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+def read_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    entries = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping unreadable line in {path}")
+    return entries
+
+def find_baseline(history: List[Dict[str, Any]], commit: Optional[str], dirty: bool,
+                  baseline: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The requested commit's latest entry, else the latest from another commit (or a clean run of this one)"""
+    for entry in reversed(history):
+        if baseline is not None:
+            if entry.get('commit') and entry['commit'].startswith(baseline):
+                return entry
+        elif entry.get('commit') != commit or (dirty and not entry.get('dirty')):
+            return entry
+    return None
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Dict[str, Any]]:
+    """Per-benchmark change against the baseline, flagging regressions beyond threshold"""
+    rows = []
+    for function, cases in results.items():
+        for case, current in cases.items():
+            previous = baseline['results'].get(function, {}).get(case)
+            if previous is None:
+                continue
+            speed = current['ops_per_sec'] / previous['ops_per_sec'] - 1
+            alloc = (current['alloc_bytes_per_op'] / previous['alloc_bytes_per_op'] - 1
+                     if previous['alloc_bytes_per_op'] else 0.0)
+            rows.append({
+                "function": function,
+                "case": case,
+                "ops_change": speed,
+                "alloc_change": alloc,
+                "regressed": speed < -threshold or alloc > threshold
+            })
+    return rows
+
+def print_results(results: Dict):
+    print(f"  {'function':<24} {'case':<18} {'ops/sec':>10} {'KiB/op':>9}")
+    for function, cases in results.items():
+        for case, row in cases.items():
+            print(f"  {function:<24} {case:<18} {row['ops_per_sec']:>10.1f} {row['alloc_bytes_per_op'] / 1024:>9.1f}")
+
+def print_comparison(rows: List[Dict[str, Any]], baseline: Dict, threshold: float):
+    print(f"\nAgainst {baseline.get('commit') or 'unknown commit'} ({baseline['recorded_at']}), "
+          f"threshold {threshold:.0%}:")
+    for row in rows:
+        flag = "  REGRESSION" if row['regressed'] else ""
+        print(f"  {row['function']:<24} {row['case']:<18} ops {row['ops_change']:>+7.1%}  "
+              f"alloc {row['alloc_change']:>+7.1%}{flag}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Parser and validator microbenchmarks")
+    parser.add_argument('--seed', type=int, default=BENCHMARK_SEED, help="Corpus seed")
+    parser.add_argument('--rounds', type=int, default=BENCHMARK_ROUNDS, help="Timed rounds per benchmark (best counts)")
+    parser.add_argument('--history', type=Path, default=HISTORY_PATH, help="JSON lines file of recorded runs")
+    parser.add_argument('--record', action='store_true', help="Append this run to the history")
+    parser.add_argument('--check', action='store_true', help="Compare with a recorded baseline; exit 1 on regression")
+    parser.add_argument('--baseline', default=None, help="Commit to compare with (defaults to the last other commit)")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Fractional slowdown or allocation growth counted as a regression")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    parser.add_argument('--write-corpus', type=Path, default=None, help="Write the synthetic pages here and exit")
+    parser.add_argument('--check-splits', action='store_true',
+                        help="Check detail parsing is unchanged when pages stream in split at any offset; exit 1 if not")
+    args = parser.parse_args()
+
+    if args.check_splits:
+        failures = check_chunk_splits(args.seed)
+        for failure in failures[:20]:
+            logger.error(failure)
+        if failures:
+            logger.error(f"{len(failures)} split(s) changed what was extracted")
+            sys.exit(1)
+        print("Detail parsing is unchanged at every chunk split")
+        sys.exit(0)
+
+    if args.write_corpus:
+        write_corpus(generate_corpus(args.seed), args.write_corpus)
+        print(f"Corpus written to {args.write_corpus}")
+        sys.exit(0)
+
+    commit, dirty = git_commit()
+    results = run_benchmarks(args.seed, args.rounds)
+    entry = {
+        "commit": commit,
+        "dirty": dirty,
+        "recorded_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "seed": args.seed,
+        "results": results
+    }
+
+    regressions = []
+    comparison = None
+    if args.check:
+        baseline = find_baseline(read_history(args.history), commit, dirty, args.baseline)
+        if baseline is None:
+            logger.warning(f"No baseline in {args.history} to check against")
+        else:
+            if baseline.get('machine') != entry['machine']:
+                logger.warning(f"Baseline was recorded on {baseline.get('machine')}; timings may not be comparable")
+            comparison = compare(results, baseline, args.threshold)
+            regressions = [row for row in comparison if row['regressed']]
+
+    if args.json:
+        print(json.dumps({**entry, "comparison": comparison}, indent=2))
+    else:
+        print(f"\nParser benchmarks at {commit or 'unknown commit'}{' (uncommitted changes)' if dirty else ''}:")
+        print_results(results)
+        if comparison is not None:
+            print_comparison(comparison, baseline, args.threshold)
+
+    if args.record:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        logger.info(f"Recorded in {args.history}")
+
+    if regressions:
+        logger.error(f"{len(regressions)} benchmark(s) regressed beyond {args.threshold:.0%}")
+        sys.exit(1)
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+Node-local progress stores with changeset shipping
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+Each stage keeps its progress tables in a SQLite file on local disk, so the
+per-row commits in the hot path never touch NFS. Triggers record every
+column change in a local changelog; the changelog is shipped to the shared
+directory in gzip batches (written to a temp name, then renamed), and each
+node pulls the other nodes' batches to see upstream work. Merging is
+last-writer-wins per column, and values from an insert never override a
+column some node has already set.
+
+The shared scraping_progress.db is now a published snapshot of a merged
+store, replaced atomically. An existing shared database is carried over
+once with `seed`, and the view can be rebuilt from the batches alone.
+Schema changes are versioned MIGRATIONS, and `check-plans` runs EXPLAIN
+QUERY PLAN over every hot query to show none of them scans a table:
+
+    python3 progress_store.py seed --database /rust/containers/ballarat-scraping/scraping_progress.db \\
+        --changesets /rust/containers/ballarat-scraping/progress_changesets
+
+    python3 progress_store.py merge --changesets /rust/containers/ballarat-scraping/progress_changesets \\
+        --output /rust/containers/ballarat-scraping/scraping_progress.db
+
+    python3 progress_store.py check-plans
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Configuration
+SHIP_BATCH_SIZE = 500  # Unshipped changes that trigger a shipment
+SHIP_INTERVAL_SECONDS = 30  # Maximum age of unshipped changes
+CHANGESET_SUFFIX = ".json.gz"
+
+# Tracked tables and the unique key each merges on
+TRACKED_TABLES = {
+    'scraping_progress': 'page_number',
+    'discovered_tools': 'tool_id',
+    'run_ledger': 'run_id',
+}
+
+@dataclass
+class Migration:
+    """One schema version: statements run first, then idempotent column adds"""
+    version: int
+    description: str
+    statements: Sequence[str] = ()
+    columns: Sequence[Tuple[str, str, str]] = ()  # (table, column, type)
+
+# Schema history shared by every stage; PRAGMA user_version records the
+# last applied version. Column adds are skipped when the column exists, so
+# databases from before versioning (user_version 0) upgrade in place.
+MIGRATIONS = [
+    Migration(1, "WALNUT progress tables", statements=[
+        '''
+        CREATE TABLE IF NOT EXISTS scraping_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            page_number INTEGER UNIQUE,
+            items_found INTEGER,
+            status TEXT,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            error_message TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS discovered_tools (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tool_id TEXT UNIQUE,
+            tool_name TEXT,
+            tool_url TEXT,
+            category TEXT,
+            discovered_at TIMESTAMP,
+            processed_by_ironwood BOOLEAN DEFAULT FALSE,
+            qa_by_rosewood BOOLEAN DEFAULT FALSE
+        )
+        ''',
+    ]),
+    Migration(2, "IRONWOOD processing columns", columns=[
+        ('discovered_tools', 'processing_started_at', 'TIMESTAMP'),
+        ('discovered_tools', 'processing_completed_at', 'TIMESTAMP'),
+        ('discovered_tools', 'processing_error', 'TEXT'),
+    ]),
+    Migration(3, "ROSEWOOD QA columns", columns=[
+        ('discovered_tools', 'qa_started_at', 'TIMESTAMP'),
+        ('discovered_tools', 'qa_completed_at', 'TIMESTAMP'),
+        ('discovered_tools', 'qa_validation_score', 'REAL'),
+        ('discovered_tools', 'qa_errors', 'TEXT'),
+    ]),
+    Migration(4, "Changeset sync tables", statements=[
+        '''
+        CREATE TABLE IF NOT EXISTS progress_changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_key NOT NULL,
+            column_name TEXT NOT NULL,
+            value,
+            changed_at REAL NOT NULL,
+            op TEXT NOT NULL,
+            origin TEXT,
+            shipped INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_changelog_cell ON progress_changelog (table_name, row_key, column_name, changed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_changelog_unshipped ON progress_changelog (seq) WHERE shipped = 0',
+        'CREATE TABLE IF NOT EXISTS applied_changesets (name TEXT PRIMARY KEY, applied_at TIMESTAMP)',
+        'CREATE TABLE IF NOT EXISTS sync_state (id INTEGER PRIMARY KEY CHECK (id = 1), applying INTEGER NOT NULL DEFAULT 0)',
+        'INSERT OR IGNORE INTO sync_state (id) VALUES (1)',
+    ]),
+    Migration(5, "Partial covering index for IRONWOOD's work claim", statements=[
+        # Holds only unclaimed rows, in id order, with every column the claim reads
+        '''
+        CREATE INDEX IF NOT EXISTS idx_discovered_tools_unclaimed
+        ON discovered_tools (id, tool_id, tool_name, tool_url, processed_by_ironwood, processing_started_at)
+        WHERE processed_by_ironwood = FALSE AND processing_started_at IS NULL
+        ''',
+    ]),
+    Migration(6, "IRONWOOD failure count for retries", columns=[
+        ('discovered_tools', 'processing_failures', 'INTEGER'),
+    ]),
+    Migration(7, "Claim index covering IRONWOOD's priority signals", statements=[
+        'DROP INDEX IF EXISTS idx_discovered_tools_unclaimed',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_discovered_tools_unclaimed
+        ON discovered_tools (id, tool_id, tool_name, tool_url, discovered_at, processing_failures,
+                             processed_by_ironwood, processing_started_at)
+        WHERE processed_by_ironwood = FALSE AND processing_started_at IS NULL
+        ''',
+    ]),
+    Migration(8, "Run ledger (see run_ledger.py)", statements=[
+        '''
+        CREATE TABLE IF NOT EXISTS run_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT UNIQUE,
+            stage TEXT,
+            node TEXT,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            outcome TEXT,
+            git_commit TEXT,
+            elapsed_seconds REAL,
+            items INTEGER,
+            errors INTEGER,
+            items_per_second REAL,
+            error_rate REAL,
+            latency_p50_seconds REAL,
+            latency_p95_seconds REAL,
+            bytes_in INTEGER,
+            bytes_out INTEGER,
+            bytes_in_per_item REAL,
+            peak_memory_mb REAL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_run_ledger_stage ON run_ledger (stage, node, started_at)',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+# Hot progress queries. Stages run these constants, so the plan check
+# covers exactly the SQL in the hot path. Per-row updates are keyed on the
+# UNIQUE page_number / tool_id columns and use their automatic indexes.
+START_PAGE_SQL = '''
+    INSERT INTO scraping_progress 
+    (page_number, status, started_at) 
+    VALUES (?, 'in_progress', ?)
+    ON CONFLICT(page_number) DO UPDATE SET
+        status = excluded.status, started_at = excluded.started_at,
+        items_found = NULL, completed_at = NULL, error_message = NULL
+'''
+
+COMPLETE_PAGE_SQL = '''
+    UPDATE scraping_progress 
+    SET status='completed', items_found=?, completed_at=?
+    WHERE page_number=?
+'''
+
+FAIL_PAGE_SQL = '''
+    UPDATE scraping_progress 
+    SET status='failed', error_message=?, completed_at=?
+    WHERE page_number=?
+'''
+
+INSERT_DISCOVERED_TOOL_SQL = '''
+    INSERT OR IGNORE INTO discovered_tools 
+    (tool_id, tool_name, tool_url, discovered_at) 
+    VALUES (?, ?, ?, ?)
+'''
+
+# IRONWOOD orders the claimed tools itself, by priority; id order breaks ties
+CLAIM_UNPROCESSED_TOOLS_SQL = '''
+    SELECT tool_id, tool_name, tool_url, discovered_at, processing_failures 
+    FROM discovered_tools 
+    WHERE processed_by_ironwood = FALSE 
+    AND processing_started_at IS NULL
+    ORDER BY id
+'''
+
+MARK_PROCESSING_STARTED_SQL = '''
+    UPDATE discovered_tools 
+    SET processing_started_at = ?, processed_by_ironwood = FALSE
+    WHERE tool_id = ?
+'''
+
+MARK_PROCESSING_COMPLETED_SQL = '''
+    UPDATE discovered_tools 
+    SET processed_by_ironwood = ?, processing_completed_at = ?, processing_error = ?,
+        processing_failures = COALESCE(processing_failures, 0) + ?
+    WHERE tool_id = ?
+'''
+
+RECORD_QA_RESULT_SQL = '''
+    UPDATE discovered_tools 
+    SET qa_by_rosewood = ?, qa_completed_at = ?, 
+        qa_validation_score = ?, qa_errors = ?
+    WHERE tool_id = ?
+'''
+
+# Drain, resume and scheduling queries, run once per run rather than per item
+RELEASE_UNFINISHED_PAGES_SQL = '''
+    UPDATE scraping_progress 
+    SET status='interrupted'
+    WHERE status='in_progress'
+'''
+
+COMPLETED_PAGES_SINCE_SQL = '''
+    SELECT page_number FROM scraping_progress
+    WHERE status='completed' AND started_at >= ?
+'''
+
+RELEASE_UNFINISHED_CLAIMS_SQL = '''
+    UPDATE discovered_tools 
+    SET processing_started_at = NULL
+    WHERE processed_by_ironwood = FALSE 
+    AND processing_started_at IS NOT NULL 
+    AND processing_completed_at IS NULL
+'''
+
+RELEASE_FAILED_TOOLS_SQL = '''
+    UPDATE discovered_tools 
+    SET processing_started_at = NULL, processing_completed_at = NULL
+    WHERE processed_by_ironwood = FALSE 
+    AND processing_completed_at IS NOT NULL 
+    AND COALESCE(processing_failures, 1) < ?
+'''
+
+LAST_PROCESSING_COMPLETED_SQL = 'SELECT MAX(processing_completed_at) FROM discovered_tools'
+DISCOVERED_TOOL_URLS_SQL = 'SELECT tool_url FROM discovered_tools WHERE tool_url IS NOT NULL'
+
+QA_RESULTS_SINCE_SQL = '''
+    SELECT tool_id, qa_by_rosewood, qa_validation_score, qa_errors
+    FROM discovered_tools
+    WHERE qa_completed_at >= ?
+    AND (processing_completed_at IS NULL OR processing_completed_at <= qa_completed_at)
+'''
+
+LATEST_CHANGE_SQL = '''
+    SELECT MAX(changed_at) FROM progress_changelog
+    WHERE table_name = ? AND row_key = ? AND column_name = ?
+'''
+
+UNSHIPPED_CHANGES_SQL = '''
+    SELECT seq, table_name, row_key, column_name, value, changed_at, op
+    FROM progress_changelog WHERE shipped = 0 ORDER BY seq
+'''
+
+COUNT_UNSHIPPED_SQL = 'SELECT COUNT(*) FROM progress_changelog WHERE shipped = 0'
+MARK_SHIPPED_SQL = 'UPDATE progress_changelog SET shipped = 1 WHERE shipped = 0 AND seq <= ?'
+MERGE_ROW_SQL = 'INSERT INTO {table} ({key}) VALUES (?) ON CONFLICT({key}) DO NOTHING'
+MERGE_COLUMN_SQL = 'UPDATE {table} SET "{column}" = ? WHERE {key} = ?'
+
+HOT_QUERIES = {
+    'walnut_start_page': START_PAGE_SQL,
+    'walnut_complete_page': COMPLETE_PAGE_SQL,
+    'walnut_fail_page': FAIL_PAGE_SQL,
+    'walnut_insert_tool': INSERT_DISCOVERED_TOOL_SQL,
+    'ironwood_claim': CLAIM_UNPROCESSED_TOOLS_SQL,
+    'ironwood_mark_started': MARK_PROCESSING_STARTED_SQL,
+    'ironwood_mark_completed': MARK_PROCESSING_COMPLETED_SQL,
+    'rosewood_record_qa': RECORD_QA_RESULT_SQL,
+    'sync_latest_change': LATEST_CHANGE_SQL,
+    'sync_unshipped': UNSHIPPED_CHANGES_SQL,
+    'sync_count_unshipped': COUNT_UNSHIPPED_SQL,
+    'sync_mark_shipped': MARK_SHIPPED_SQL,
+}
+for _table, _key in TRACKED_TABLES.items():
+    HOT_QUERIES[f'sync_merge_row_{_table}'] = MERGE_ROW_SQL.format(table=_table, key=_key)
+    HOT_QUERIES[f'sync_merge_column_{_table}'] = MERGE_COLUMN_SQL.format(table=_table, key=_key, column=_key)
+
+SYNC_TABLES = ('progress_changelog', 'applied_changesets', 'sync_state')
+TRIGGER_PREFIX = 'progress_track_'
+UNIX_NOW_SQL = "((julianday('now') - 2440587.5) * 86400.0)"
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+logger = logging.getLogger(__name__)
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that reports each commit's latency to on_commit, if set"""
+    on_commit: Optional[Callable[[float], None]] = None
+
+    def commit(self):
+        started = time.perf_counter()
+        super().commit()
+        if self.on_commit is not None:
+            self.on_commit(time.perf_counter() - started)
+
+class ProgressStore:
+    """Local SQLite progress store for one node, synced through changeset files"""
+
+    def __init__(self, node: str, local_path: Path, changeset_dir: Path):
+        self.node = node
+        self.local_path = Path(local_path)
+        self.changeset_dir = Path(changeset_dir)
+        self.last_shipped = time.time()
+        self.columns: Dict[str, Set[str]] = {}
+        self.closed = False
+
+        self.local_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.local_path, factory=TimedConnection)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+
+        self.migrate()
+        self.track_changes()
+        for problem in check_query_plans(self.conn):
+            logger.warning(f"Progress query plan: {problem}")
+
+    def migrate(self) -> int:
+        """Apply pending schema migrations; returns the resulting version"""
+        version, = self.conn.execute('PRAGMA user_version').fetchone()
+
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+
+            self.conn.execute('BEGIN')
+            try:
+                for statement in migration.statements:
+                    self.conn.execute(statement)
+                for table, column, column_type in migration.columns:
+                    if column not in self.table_columns(table, refresh=True):
+                        self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+                self.conn.execute(f'PRAGMA user_version = {migration.version}')
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+            version = migration.version
+            logger.info(f"Progress schema migrated to v{version}: {migration.description}")
+
+        self.columns.clear()
+        return version
+
+    def table_columns(self, table: str, refresh: bool = False) -> Set[str]:
+        if refresh or table not in self.columns:
+            self.columns[table] = {row[1] for row in self.conn.execute(f'PRAGMA table_info("{table}")')}
+        return self.columns[table]
+
+    def track_changes(self):
+        """(Re)create change-capture triggers for the current table columns"""
+        for name, in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?", (f"{TRIGGER_PREFIX}%",)
+        ).fetchall():
+            self.conn.execute(f'DROP TRIGGER "{name}"')
+
+        for table, key in TRACKED_TABLES.items():
+            columns = sorted(self.table_columns(table, refresh=True) - {'id', key})
+            guard = "WHEN (SELECT applying FROM sync_state) = 0"
+            insert_cols = "(table_name, row_key, column_name, value, changed_at, op)"
+
+            # Insert-time NULLs are what any new row holds already, so skip them
+            inserted = ''.join(
+                f" UNION ALL SELECT '{table}', NEW.{key}, '{column}', NEW.\"{column}\", {UNIX_NOW_SQL}, 'insert'"
+                f" WHERE NEW.\"{column}\" IS NOT NULL"
+                for column in columns
+            )
+            self.conn.execute(f'''
+                CREATE TRIGGER {TRIGGER_PREFIX}{table}_insert AFTER INSERT ON {table} {guard}
+                BEGIN
+                    INSERT INTO progress_changelog {insert_cols}
+                    SELECT '{table}', NEW.{key}, '{key}', NEW.{key}, {UNIX_NOW_SQL}, 'insert'{inserted};
+                END
+            ''')
+
+            updated = '\n'.join(
+                f"INSERT INTO progress_changelog {insert_cols} SELECT '{table}', NEW.{key}, '{column}', "
+                f"NEW.\"{column}\", {UNIX_NOW_SQL}, 'update' WHERE NEW.\"{column}\" IS NOT OLD.\"{column}\";"
+                for column in columns
+            )
+            if updated:
+                self.conn.execute(f'''
+                    CREATE TRIGGER {TRIGGER_PREFIX}{table}_update AFTER UPDATE ON {table} {guard}
+                    BEGIN
+                        {updated}
+                    END
+                ''')
+
+        self.conn.commit()
+
+    def ensure_column(self, table: str, column: str) -> bool:
+        """Add a column another node's schema has; True when one was added"""
+        if column in self.table_columns(table):
+            return False
+        if not IDENTIFIER.fullmatch(column):
+            raise ValueError(f"Invalid column name in changeset: {column!r}")
+        self.conn.execute(f'ALTER TABLE {table} ADD COLUMN "{column}"')
+        self.columns[table].add(column)
+        return True
+
+    def apply_change(self, origin: str, table: str, row_key, column: str, value, changed_at: float, op: str) -> bool:
+        """Merge one remote column change; False when a newer value wins"""
+        key = TRACKED_TABLES[table]
+        self.conn.execute(MERGE_ROW_SQL.format(table=table, key=key), (row_key,))
+        if column == key:
+            return True
+
+        latest, = self.conn.execute(LATEST_CHANGE_SQL, (table, row_key, column)).fetchone()
+
+        # Insert-time values are defaults; updates win by timestamp. 'now' has
+        # millisecond resolution, so ties go to the later change in seq order
+        if latest is not None and (op == 'insert' or changed_at < latest):
+            return False
+
+        self.conn.execute(MERGE_COLUMN_SQL.format(table=table, key=key, column=column), (value, row_key))
+        self.conn.execute('''
+            INSERT INTO progress_changelog
+            (table_name, row_key, column_name, value, changed_at, op, origin, shipped)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+        ''', (table, row_key, column, value, changed_at, op, origin))
+        return True
+
+    def pending_changesets(self) -> List[Path]:
+        if not self.changeset_dir.exists():
+            return []
+        applied = {name for name, in self.conn.execute('SELECT name FROM applied_changesets')}
+        batches = [path for path in self.changeset_dir.glob(f"*/*{CHANGESET_SUFFIX}")
+                   if f"{path.parent.name}/{path.name}" not in applied]
+        return sorted(batches, key=lambda path: path.name)
+
+    def pull(self) -> int:
+        """Apply changeset batches not yet merged into this store"""
+        applied_changes = 0
+        schema_changed = False
+
+        for path in self.pending_changesets():
+            try:
+                with gzip.open(path, 'rt') as f:
+                    changes = json.load(f)['changes']
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Skipping unreadable changeset {path}: {e}")
+                continue
+
+            origin = path.parent.name
+            with self.conn:
+                self.conn.execute('UPDATE sync_state SET applying = 1')
+                for table, row_key, column, value, changed_at, op in changes:
+                    if table not in TRACKED_TABLES:
+                        continue
+                    schema_changed |= self.ensure_column(table, column)
+                    applied_changes += self.apply_change(origin, table, row_key, column, value, changed_at, op)
+                self.conn.execute('UPDATE sync_state SET applying = 0')
+                self.conn.execute('INSERT INTO applied_changesets (name, applied_at) VALUES (?, ?)',
+                                  (f"{origin}/{path.name}", datetime.now()))
+
+        if schema_changed:
+            self.track_changes()
+        if applied_changes:
+            logger.info(f"Merged {applied_changes} progress changes from other nodes")
+        return applied_changes
+
+    def ship(self) -> int:
+        """Write unshipped local changes to the shared directory as one batch"""
+        rows = self.conn.execute(UNSHIPPED_CHANGES_SQL).fetchall()
+        self.last_shipped = time.time()
+        if not rows:
+            return 0
+
+        first_seq, last_seq = rows[0][0], rows[-1][0]
+        name = f"{int(time.time() * 1000):013d}-{first_seq:09d}-{last_seq:09d}{CHANGESET_SUFFIX}"
+        node_dir = self.changeset_dir / self.node
+        tmp_path = node_dir / f".{name}.tmp"
+
+        try:
+            node_dir.mkdir(parents=True, exist_ok=True)
+            with gzip.open(tmp_path, 'wt') as f:
+                json.dump({"node": self.node, "changes": [row[1:] for row in rows]}, f, separators=(',', ':'))
+            os.replace(tmp_path, node_dir / name)
+        except OSError as e:
+            # Changes stay in the local changelog and go out with the next batch
+            logger.error(f"Failed to ship {len(rows)} progress changes: {e}")
+            return 0
+
+        with self.conn:
+            self.conn.execute(MARK_SHIPPED_SQL, (last_seq,))
+            self.conn.execute('INSERT OR IGNORE INTO applied_changesets (name, applied_at) VALUES (?, ?)',
+                              (f"{self.node}/{name}", datetime.now()))
+        return len(rows)
+
+    def maybe_ship(self) -> int:
+        """Ship once enough changes have built up or the interval has passed"""
+        if time.time() - self.last_shipped >= SHIP_INTERVAL_SECONDS:
+            return self.ship()
+        unshipped, = self.conn.execute(COUNT_UNSHIPPED_SQL).fetchone()
+        return self.ship() if unshipped >= SHIP_BATCH_SIZE else 0
+
+    def publish(self, shared_path: Path) -> bool:
+        """Replace the shared progress database with a snapshot of this store"""
+        shared_path = Path(shared_path)
+        tmp_path = shared_path.with_name(f".{shared_path.name}.tmp")
+
+        try:
+            with tempfile.TemporaryDirectory(dir=self.local_path.parent) as tmp_dir:
+                snapshot = Path(tmp_dir) / shared_path.name
+                self.conn.execute('VACUUM INTO ?', (str(snapshot),))
+
+                view = sqlite3.connect(snapshot)
+                for name, in view.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?", (f"{TRIGGER_PREFIX}%",)
+                ).fetchall():
+                    view.execute(f'DROP TRIGGER "{name}"')
+                for table in SYNC_TABLES:
+                    view.execute(f'DROP TABLE IF EXISTS {table}')
+                view.commit()
+                view.execute('VACUUM')
+                view.close()
+
+                shutil.copyfile(snapshot, tmp_path)
+                os.replace(tmp_path, shared_path)
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Failed to publish progress view to {shared_path}: {e}")
+            return False
+
+        logger.info(f"Published merged progress view to {shared_path}")
+        return True
+
+    def close(self):
+        """Ship anything outstanding and close the local database; later calls do nothing"""
+        if self.closed:
+            return
+        self.ship()
+        self.conn.close()
+        self.closed = True
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """EXPLAIN QUERY PLAN details for a statement, with NULL for every parameter"""
+    params = [None] * sql.count('?')
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+def check_query_plans(conn: sqlite3.Connection) -> List[str]:
+    """Hot queries whose plan scans a whole table or sorts in a temp b-tree"""
+    problems = []
+    for name, sql in HOT_QUERIES.items():
+        for detail in explain(conn, sql):
+            if detail.startswith('SCAN ') and 'INDEX' not in detail:
+                problems.append(f"{name}: {detail}")
+            elif 'TEMP B-TREE' in detail:
+                problems.append(f"{name}: {detail}")
+    return problems
+
+def merge_changesets(changeset_dir: Path, output_path: Path) -> int:
+    """Rebuild a progress database from every shipped changeset batch"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ProgressStore('merge', Path(tmp_dir) / "merge_progress.db", changeset_dir)
+        applied = store.pull()
+        store.publish(output_path)
+        store.conn.close()
+    return applied
+
+def seed_from_database(source_path: Path, changeset_dir: Path) -> int:
+    """Ship the rows of an existing shared progress database as a 'legacy' batch"""
+    source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    shipped = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ProgressStore('legacy', Path(tmp_dir) / "legacy_progress.db", changeset_dir)
+        for table in TRACKED_TABLES:
+            columns = [row[1] for row in source.execute(f'PRAGMA table_info("{table}")') if row[1] != 'id']
+            for column in columns:
+                store.ensure_column(table, column)
+        store.track_changes()
+
+        for table in TRACKED_TABLES:
+            columns = [row[1] for row in source.execute(f'PRAGMA table_info("{table}")') if row[1] != 'id']
+            if not columns:
+                continue
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            placeholders = ', '.join('?' for _ in columns)
+            for row in source.execute(f'SELECT {column_list} FROM {table}'):
+                store.conn.execute(f'INSERT OR IGNORE INTO {table} ({column_list}) VALUES ({placeholders})', row)
+        store.conn.commit()
+
+        shipped = store.ship()
+        store.conn.close()
+
+    source.close()
+    return shipped
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Node-local progress stores and changeset merging")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    merge_parser = subparsers.add_parser('merge', help="Rebuild a progress database from changeset batches")
+    merge_parser.add_argument('--changesets', type=Path, required=True, help="Shared changeset directory")
+    merge_parser.add_argument('--output', type=Path, required=True, help="Progress database to write")
+    seed_parser = subparsers.add_parser('seed', help="Ship an existing shared progress database as changesets")
+    seed_parser.add_argument('--database', type=Path, required=True, help="Existing scraping_progress.db")
+    seed_parser.add_argument('--changesets', type=Path, required=True, help="Shared changeset directory")
+    plans_parser = subparsers.add_parser('check-plans', help="EXPLAIN QUERY PLAN every hot progress query")
+    plans_parser.add_argument('--database', type=Path, default=None,
+                              help="Migrate and check this store instead of a fresh in-memory one")
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        changes = merge_changesets(args.changesets, args.output)
+        print(f"Merged {changes} changes into {args.output}")
+    elif args.command == 'seed':
+        changes = seed_from_database(args.database, args.changesets)
+        print(f"Shipped {changes} changes from {args.database}")
+    elif args.command == 'check-plans':
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ProgressStore('check', args.database or Path(tmp_dir) / "check_progress.db", Path(tmp_dir))
+            for name, sql in HOT_QUERIES.items():
+                print(f"{name}: {' | '.join(explain(store.conn, sql)) or 'no table access'}")
+            problems = check_query_plans(store.conn)
+            store.conn.close()
+
+        for problem in problems:
+            print(f"FAIL {problem}")
+        print(f"{len(HOT_QUERIES) - len({p.split(':')[0] for p in problems})}/{len(HOT_QUERIES)} hot queries avoid table scans")
+        raise SystemExit(1 if problems else 0)
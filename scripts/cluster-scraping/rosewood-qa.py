@@ -8,111 +8,620 @@ performs final quality checks, and prepares import files for alpha-1 system.
 Uses deepseek-r1 for comprehensive validation and testing.
 """
 
+import argparse
 import asyncio
+import aiohttp
+import errno
+import fcntl
+import gzip
 import json
+import shutil
 import sqlite3
 import os
+import random
 import time
+import zlib
 from datetime import datetime
 from pathlib import Path
 import logging
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Set
 import hashlib
-import requests
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
+from difflib import SequenceMatcher
+from html import unescape
+from itertools import chain, islice
+
+try:
+    import zstandard
+except ImportError:  # zstd siblings are optional; gzip is always written
+    zstandard = None
+
+from progress_store import DISCOVERED_TOOL_URLS_SQL, QA_RESULTS_SINCE_SQL, RECORD_QA_RESULT_SQL, ProgressStore
+from run_ledger import RunLedger
+from stage_drain import StageDrain
+from stage_metrics import StageMetrics
+from stage_profile import PROFILE_MODES, StageProfiler
+from stage_stats import StreamingStats
+from stage_trace import StageTracer, default_trace_path
+from tool_records import (
+    LEGACY_RECORD_FILE_SUFFIX, ProcessedTool, ValidationResult, read_record_file, record_file, record_files
+)
 
 # Configuration
 SHARED_DIR = Path("/rust/containers/ballarat-scraping")
-DATABASE_PATH = SHARED_DIR / "scraping_progress.db"
+DATABASE_PATH = SHARED_DIR / "scraping_progress.db"  # Merged view, published at the end of a run
+CHANGESET_DIR = SHARED_DIR / "progress_changesets"
+LOCAL_STATE_DIR = Path.home() / ".local" / "share" / "ballarat-scraping"
+LOCAL_DATABASE_PATH = LOCAL_STATE_DIR / "rosewood_progress.db"
+CHECKPOINT_PATH = LOCAL_STATE_DIR / "rosewood_checkpoint.json"  # Start of an unfinished QA run
 PROCESSED_DATA_DIR = SHARED_DIR / "processed_data"
 IMAGES_DIR = SHARED_DIR / "tool_images"
 QA_RESULTS_DIR = SHARED_DIR / "qa_results"
 IMPORT_READY_DIR = SHARED_DIR / "import_ready"
 SIGNAL_FILE = SHARED_DIR / "ironwood_completed.signal"
+DELTA_DIR = IMPORT_READY_DIR / "delta"
+SEARCH_INDEX_PATH = IMPORT_READY_DIR / "tools_search.db"
+CATALOG_BUNDLE_DIR = IMPORT_READY_DIR / "catalog"
+IMPORT_MANIFEST_PATH = IMPORT_READY_DIR / "import_manifest.json"  # Export state the target database has applied
+PENDING_MANIFEST_PATH = IMPORT_READY_DIR / "import_manifest.pending.json"  # State once the current delta is applied
 
 # Alpha-1 API endpoint for testing
 ALPHA_1_API_BASE = "https://tools.home.deepblack.cloud/api/v1"
+ALPHA_1_API_TOKEN_ENV = "ALPHA_1_API_TOKEN"
+
+# Bulk loader settings
+BULK_LOAD_BATCH_SIZE = 50
+BULK_LOAD_CONCURRENCY = 4  # Batches in flight; also caps pooled connections
+BULK_LOAD_MAX_RETRIES = 3
+BULK_LOAD_RETRY_DELAY = 2.0  # Doubled on every retry
+BULK_LOAD_PROGRESS_PATH = IMPORT_READY_DIR / "bulk_load_progress.ndjson"
+BULK_LOAD_RETRY_STATUSES = {429, 500, 502, 503, 504}
+BULK_LOAD_DONE_STATUSES = {200, 201, 409}  # 409: row already exists
+
+def is_rejection(status: int) -> bool:
+    """The API answered and refused the rows; resending the same rows will not help"""
+    return 400 <= status < 500 and status not in BULK_LOAD_RETRY_STATUSES
 
 # QA validation criteria
 MIN_REQUIRED_FIELDS = {'id', 'name', 'url'}
 RECOMMENDED_FIELDS = {'brand', 'model', 'description', 'category', 'image_urls'}
+SCORED_FIELDS = MIN_REQUIRED_FIELDS | RECOMMENDED_FIELDS
 MAX_NAME_LENGTH = 200
 MAX_DESCRIPTION_LENGTH = 2000
 
+# Report settings
+QA_DB_BATCH_SIZE = 500  # Validation rows written per commit
+INVALID_TOOLS_SAMPLE_SIZE = 10
+
+# Import file output settings
+IMPORT_FORMAT_VERSION = "1.0"
+IMPORT_GZIP_LEVEL = 9
+IMPORT_ZSTD_LEVEL = 19
+IMPORT_WRITE_BUFFER = 64 * 1024  # Flush to compressors every 64KB
+
+# Category table seeded in the alpha-1 backend, used when the API cannot be reached.
+# Keywords widen token matching beyond the category name itself.
+SEEDED_CATEGORIES = [
+    {'id': 1, 'name': 'Hand Tools', 'parentId': None,
+     'keywords': ['hand', 'hammer', 'spanner', 'wrench', 'screwdriver', 'chisel', 'clamp', 'plier', 'file']},
+    {'id': 2, 'name': 'Power Tools', 'parentId': None,
+     'keywords': ['power', 'electric', 'cordless', 'battery', 'grinder', 'sander', 'router', 'nailer']},
+    {'id': 3, 'name': 'Garden Tools', 'parentId': None,
+     'keywords': ['garden', 'gardening', 'lawn', 'mower', 'hedge', 'trimmer', 'outdoor', 'landscaping',
+                  'rake', 'shovel', 'spade', 'wheelbarrow', 'pruner']},
+    {'id': 4, 'name': 'Kitchen Tools', 'parentId': None,
+     'keywords': ['kitchen', 'dining', 'cooking', 'baking', 'food', 'preserving']},
+    {'id': 5, 'name': 'Drills', 'parentId': 2, 'keywords': ['drill', 'driver', 'impact']},
+    {'id': 6, 'name': 'Saws', 'parentId': 2, 'keywords': ['saw', 'jigsaw', 'circular', 'mitre', 'chainsaw']},
+]
+DEFAULT_CATEGORY_ID = 1
+CATEGORY_MATCH_THRESHOLD = 0.6
+# Breadcrumb segments and tokens that carry no category information
+CATEGORY_STOP_SEGMENTS = {'inventory', 'library', 'home', 'all', 'browse', 'tools', 'tool', 'items'}
+CATEGORY_STOP_TOKENS = {'tool', 'and', 'the', 'of', 'for', 'misc', 'other', 'equipment'}
+CATEGORY_TOP_K_CAPACITY = 1000  # Distinct raw categories counted exactly for the mapping file
+
+# Near-duplicate detection (MinHash + LSH)
+NEAR_DUPLICATE_NUM_PERM = 64
+NEAR_DUPLICATE_BANDS = 16  # 16 bands x 4 rows: candidates from ~0.5 Jaccard upward
+NEAR_DUPLICATE_THRESHOLD = 0.7  # Estimated Jaccard needed to call two tools duplicates
+NEAR_DUPLICATE_IMAGE_MAX_DISTANCE = 6  # dHash Hamming distance for "same photo"
+NEAR_DUPLICATE_MAX_BUCKET = 200  # Distinct members compared pairwise; larger buckets are compared against anchors
+NEAR_DUPLICATE_BUCKET_ANCHORS = 8  # Members of an oversized bucket every other member is compared with
+NEAR_DUPLICATE_USE_IMAGES = True
+NEAR_DUPLICATE_HASH_THREADS = 4  # Image dHashes are computed off the event loop
+NEAR_DUPLICATE_SAMPLE_CLUSTERS = 20
+MINHASH_PRIME = (1 << 61) - 1
+# Trailing copy markers such as "#2", "(3)", "Copy 2", "No. 4"
+COPY_SUFFIX_PATTERN = re.compile(r'(\s*[-–]?\s*(#\s*\d+|\(\s*\d+\s*\)|copy\s*\d*|no\.?\s*\d+))+\s*$', re.IGNORECASE)
+
+# Full-text search index settings
+SEARCH_INDEX_PREFIXES = '2 3 4'  # Prefix index lengths for type-ahead queries
+SEARCH_INDEX_TOKENIZER = 'unicode61 remove_diacritics 2'
+SEARCH_RANK_WEIGHTS = (10.0, 5.0, 5.0, 1.0, 0.5)  # bm25 weights: name, brand, model, description, specs
+SEARCH_BENCHMARK_QUERIES = 200
+SEARCH_INDEX_BATCH_SIZE = 500  # Rows inserted per executemany
+
+# Static catalog bundle settings
+CATALOG_PAGE_SIZE = 48  # Most records per shard
+CATALOG_MAX_KEY_LENGTH = 4  # Longest name prefix a shard is keyed on; larger groups are paged
+CATALOG_MIN_PAGE_FILL = 16  # Records on a page before a content-defined break may end it
+CATALOG_PAGE_BREAK_MODULUS = 16  # A record starts a new page when crc32(sourceUrl) % this == 0
+CATALOG_HASH_LENGTH = 12
+CATALOG_KEY_RANGE_END = '\U0010ffff'  # Sorts after any name continuing a prefix
+# Fields the storefront browse view needs; everything else stays in the import files
+CATALOG_BROWSE_FIELDS = ('sourceUrl', 'name', 'brand', 'model', 'categoryId', 'status', 'imageUrl', 'duplicateGroupId')
+
+# Image export settings - tried in order, falling back to a plain copy
+IMAGE_EXPORT_LINK_MODES = ('reflink', 'hardlink')
+FICLONE = 0x40049409  # Linux ioctl for copy-on-write file clones
+
+# Fields that change on every run and must not affect delta content hashes
+VOLATILE_IMPORT_FIELDS = {'importedAt'}
+
+# Columns written by the SQL import scripts, in statement order
+SQL_IMPORT_COLUMNS = [
+    'name', 'description', 'brand', 'model', 'categoryId',
+    'condition', 'status', 'imageUrl', 'instructions', 'sourceUrl'
+]
+
 # Logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def sql_quote(value) -> str:
+    """Render a value as a SQL literal"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def compute_tool_hash(tool: Dict) -> str:
+    """Stable content hash of a formatted tool, ignoring per-run fields"""
+    content = {k: v for k, v in tool.items() if k not in VOLATILE_IMPORT_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def reflink_file(source: Path, target: Path):
+    """Clone a file copy-on-write (btrfs/XFS/ZFS/NFS 4.2); raises OSError when unsupported"""
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    stat = source.stat()
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
 @dataclass
-class ValidationResult:
-    """Result of tool data validation"""
-    tool_id: str
-    is_valid: bool
-    errors: List[str]
-    warnings: List[str]
-    completeness_score: float
-    quality_score: float
+class CategoryMatch:
+    """Resolved backend category for a raw MyTurn category"""
+    category_id: object
+    category_name: str
+    confidence: float
+    method: str
+
+class CategoryResolver:
+    """
+    Maps MyTurn breadcrumb categories onto the backend category table
+    
+    Built once per run. Each distinct raw category is matched token-wise,
+    then fuzzily, against every backend category and cached, so resolving
+    a tool is a dictionary lookup.
+    """
+    
+    def __init__(self, categories: List[Dict]):
+        self.categories = categories
+        self.cache: Dict[str, CategoryMatch] = {}
+        self.default = next(
+            (c for c in categories if c['id'] == DEFAULT_CATEGORY_ID), categories[0]
+        )
+        
+        # Precompute token sets and normalised names for every category
+        self.index = []
+        for category in categories:
+            name_tokens = self.tokenize(category['name'])
+            keyword_tokens = set()
+            for keyword in category.get('keywords', []):
+                keyword_tokens |= self.tokenize(keyword)
+            self.index.append((category, name_tokens, keyword_tokens, ' '.join(sorted(name_tokens))))
+    
+    @staticmethod
+    def tokenize(text: str) -> Set[str]:
+        """Lowercase word tokens with a naive plural strip"""
+        tokens = set()
+        for token in re.findall(r'[a-z0-9]+', text.lower()):
+            if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+                token = token[:-1]
+            if token not in CATEGORY_STOP_TOKENS:
+                tokens.add(token)
+        return tokens
+    
+    @staticmethod
+    def breadcrumb_segments(raw_category: str) -> List[str]:
+        """Split a breadcrumb into meaningful segments, most specific first"""
+        segments = [
+            segment.strip()
+            for segment in re.split(r'[>/|»]', unescape(raw_category))
+        ]
+        segments = [s for s in segments if s and s.lower() not in CATEGORY_STOP_SEGMENTS]
+        return list(reversed(segments))
+    
+    def score(self, segment: str) -> Tuple[Optional[Dict], float, str]:
+        """Best matching category for one breadcrumb segment"""
+        tokens = self.tokenize(segment)
+        normalised = ' '.join(sorted(tokens))
+        best, best_score, best_method = None, 0.0, 'none'
+        if not tokens:
+            return best, best_score, best_method
+        
+        for category, name_tokens, keyword_tokens, category_normalised in self.index:
+            if name_tokens and name_tokens <= tokens:
+                score, method = 1.0 if name_tokens == tokens else 0.9, 'token'
+            else:
+                overlap = len(tokens & (name_tokens | keyword_tokens))
+                score, method = (0.6 + 0.3 * overlap / len(tokens), 'token') if overlap else (0.0, 'none')
+            
+            fuzzy = SequenceMatcher(None, normalised, category_normalised).ratio()
+            if fuzzy > score:
+                score, method = fuzzy, 'fuzzy'
+            
+            # Prefer subcategories over their parents on equal scores
+            if score > best_score or (score == best_score and best is not None
+                                      and category.get('parentId') == best['id']):
+                best, best_score, best_method = category, score, method
+        
+        return best, best_score, best_method
+    
+    def resolve(self, raw_category: Optional[str]) -> CategoryMatch:
+        """Resolve a raw MyTurn category, caching the result"""
+        key = raw_category or ''
+        match = self.cache.get(key)
+        if match is not None:
+            return match
+        
+        best, best_score, best_method = None, 0.0, 'default'
+        for depth, segment in enumerate(self.breadcrumb_segments(key)):
+            category, score, method = self.score(segment)
+            score *= 0.85 ** depth  # Discount broader breadcrumb levels
+            if category is not None and score > best_score:
+                best, best_score, best_method = category, score, method
+        
+        if best is None or best_score < CATEGORY_MATCH_THRESHOLD:
+            match = CategoryMatch(self.default['id'], self.default['name'], 0.0, 'default')
+        else:
+            match = CategoryMatch(best['id'], best['name'], round(best_score, 3), best_method)
+        
+        self.cache[key] = match
+        return match
+
+def build_fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query where every term is a prefix match"""
+    terms = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_tools(conn: sqlite3.Connection, text: str, category_id=None, limit: int = 20) -> List[Tuple]:
+    """Query a tools_search.db index, best matches first"""
+    fts_query = build_fts_query(text)
+    if not fts_query:
+        return []
+    
+    sql = f'''
+        SELECT t.source_url, t.name, t.category_name
+        FROM tools_fts
+        JOIN tools t ON t.rowid = tools_fts.rowid
+        WHERE tools_fts MATCH ?
+        {'AND t.category_id = ?' if category_id is not None else ''}
+        ORDER BY bm25(tools_fts, {', '.join(str(w) for w in SEARCH_RANK_WEIGHTS)})
+        LIMIT ?
+    '''
+    params = [fts_query] + ([category_id] if category_id is not None else []) + [limit]
+    return conn.execute(sql, params).fetchall()
+
+def image_dhash(path: Path) -> Optional[int]:
+    """64-bit difference hash of an image, or None when unavailable"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    
+    try:
+        with Image.open(path) as img:
+            pixels = list(img.convert('L').resize((9, 8)).getdata())
+    except Exception:
+        return None
+    
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index for near-identical tool listings
+    
+    Each tool gets a MinHash signature over name, brand/model and description
+    shingles. Signatures are split into bands and bucketed, so only tools that
+    share a bucket are compared, keeping the work roughly linear in the number
+    of tools. An optional image dHash adds candidates and corroborates matches.
+    """
+    
+    def __init__(self, num_perm: int = NEAR_DUPLICATE_NUM_PERM, bands: int = NEAR_DUPLICATE_BANDS,
+                 seed: int = 1209):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.permutations = [
+            (rng.randrange(1, MINHASH_PRIME), rng.randrange(0, MINHASH_PRIME))
+            for _ in range(num_perm)
+        ]
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self.image_hashes: Dict[str, int] = {}
+        self.buckets: Dict[Tuple, List[str]] = {}
+    
+    @staticmethod
+    def normalise_name(name: str) -> str:
+        """Lowercase a tool name and strip trailing copy numbers"""
+        return COPY_SUFFIX_PATTERN.sub('', unescape(name or '')).strip().lower()
+    
+    def shingles(self, tool_data: Dict) -> Set[int]:
+        """Hashed shingles: name/brand/model character 4-grams plus description word pairs"""
+        title = ' '.join(filter(None, [
+            self.normalise_name(tool_data.get('name', '')),
+            (tool_data.get('brand') or '').lower(),
+            (tool_data.get('model') or '').lower()
+        ]))
+        title = re.sub(r'[^a-z0-9]+', ' ', title).strip()
+        
+        shingles = {zlib.crc32(title[i:i + 4].encode()) for i in range(max(len(title) - 3, 1))}
+        
+        words = re.findall(r'[a-z0-9]+', (tool_data.get('description') or '').lower())[:150]
+        shingles.update(zlib.crc32(f"d:{a} {b}".encode()) for a, b in zip(words, words[1:]))
+        return shingles
+    
+    def signature(self, shingles: Set[int]) -> Tuple[int, ...]:
+        """MinHash signature of a shingle set"""
+        if not shingles:
+            return tuple([MINHASH_PRIME] * self.num_perm)
+        return tuple(
+            min((a * h + b) % MINHASH_PRIME for h in shingles)
+            for a, b in self.permutations
+        )
+    
+    def add(self, tool_id: str, tool_data: Dict, image_hash: Optional[int] = None):
+        """Index one tool"""
+        signature = self.signature(self.shingles(tool_data))
+        self.signatures[tool_id] = signature
+        
+        for band in range(self.bands):
+            key = ('text', band, signature[band * self.rows:(band + 1) * self.rows])
+            self.buckets.setdefault(key, []).append(tool_id)
+        
+        if image_hash is not None:
+            self.add_image_hash(tool_id, image_hash)
+    
+    def add_image_hash(self, tool_id: str, image_hash: int):
+        """Add the image dHash of a tool already indexed by text"""
+        self.image_hashes[tool_id] = image_hash
+        for band in range(4):
+            key = ('image', band, (image_hash >> (band * 16)) & 0xFFFF)
+            self.buckets.setdefault(key, []).append(tool_id)
+    
+    def similarity(self, first: str, second: str) -> float:
+        """Estimated Jaccard similarity from two signatures"""
+        a, b = self.signatures[first], self.signatures[second]
+        return sum(1 for x, y in zip(a, b) if x == y) / self.num_perm
+    
+    def is_duplicate(self, first: str, second: str) -> bool:
+        """Verify a candidate pair"""
+        text_similarity = self.similarity(first, second)
+        if text_similarity >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+        
+        if first in self.image_hashes and second in self.image_hashes:
+            distance = bin(self.image_hashes[first] ^ self.image_hashes[second]).count('1')
+            return distance <= NEAR_DUPLICATE_IMAGE_MAX_DISTANCE and text_similarity >= NEAR_DUPLICATE_THRESHOLD / 2
+        
+        return False
+    
+    def clusters(self) -> Tuple[List[List[str]], int]:
+        """Group duplicates with union-find; returns (clusters, candidate pairs checked)"""
+        parent = {tool_id: tool_id for tool_id in self.signatures}
+        
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+        
+        # Identical signatures are duplicates outright, however many tools share one
+        by_signature: Dict[Tuple[int, ...], str] = {}
+        for tool_id, signature in self.signatures.items():
+            if signature in by_signature:
+                parent[find(tool_id)] = find(by_signature[signature])
+            else:
+                by_signature[signature] = tool_id
+        
+        checked = set()
+        for members in self.buckets.values():
+            # One member per distinct signature and image stands in for its copies
+            distinct = {}
+            for member in members:
+                distinct.setdefault((self.signatures[member], self.image_hashes.get(member)), member)
+            distinct = list(distinct.values())
+            if len(distinct) < 2:
+                continue
+            
+            anchors = distinct if len(distinct) <= NEAR_DUPLICATE_MAX_BUCKET else distinct[:NEAR_DUPLICATE_BUCKET_ANCHORS]
+            for i, first in enumerate(anchors):
+                for second in distinct[i + 1:]:
+                    pair = (first, second) if first < second else (second, first)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    if find(first) != find(second) and self.is_duplicate(first, second):
+                        parent[find(first)] = find(second)
+        
+        groups: Dict[str, List[str]] = {}
+        for tool_id in self.signatures:
+            groups.setdefault(find(tool_id), []).append(tool_id)
+        
+        clusters = sorted(
+            (sorted(members) for members in groups.values() if len(members) > 1),
+            key=lambda members: (-len(members), members[0])
+        )
+        return clusters, len(checked)
+
+class PrecompressedWriter:
+    """
+    Text writer that streams into a file plus .gz/.zst siblings
+
+    Output goes to temporary files that are renamed into place on success,
+    so nginx gzip_static never serves a half-written import file.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._targets = []
+        self._buffer = []
+        self._buffered = 0
+    
+    def __enter__(self):
+        self._open(self.path, lambda raw: raw)
+        # Name the final file and zero the mtime so identical content compresses identically
+        self._open(
+            self.path.with_name(self.path.name + '.gz'),
+            lambda raw: gzip.GzipFile(filename=self.path.name, fileobj=raw, mode='wb',
+                                      compresslevel=IMPORT_GZIP_LEVEL, mtime=0)
+        )
+        if zstandard:
+            self._open(
+                self.path.with_name(self.path.name + '.zst'),
+                lambda raw: zstandard.ZstdCompressor(level=IMPORT_ZSTD_LEVEL).stream_writer(raw, closefd=False)
+            )
+        return self
+    
+    def _open(self, final_path: Path, wrap):
+        tmp_path = final_path.with_name(final_path.name + '.tmp')
+        raw = open(tmp_path, 'wb')
+        self._targets.append((tmp_path, final_path, raw, wrap(raw)))
+    
+    def write(self, text: str):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= IMPORT_WRITE_BUFFER:
+            self.flush()
+    
+    def flush(self):
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer).encode('utf-8')
+        for _, _, _, stream in self._targets:
+            stream.write(data)
+        self._buffer = []
+        self._buffered = 0
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        
+        for tmp_path, final_path, raw, stream in self._targets:
+            if stream is not raw:
+                stream.close()
+            raw.close()
+            if exc_type is None:
+                os.replace(tmp_path, final_path)
+            else:
+                tmp_path.unlink(missing_ok=True)
+        
+        return False
+
+class CatalogScope:
+    """
+    Name-ordered browse records of one catalog scope in a spool database
+
+    Records live in a browse table indexed on (name_key, source_url), so a
+    name prefix is a range scan and only the shard being written is loaded.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection, category: Optional[str] = None):
+        self.conn = conn
+        self.filter = 'category = ? AND ' if category is not None else ''
+        self.params = (category,) if category is not None else ()
+    
+    def _where(self, key: str, exact: bool) -> Tuple[str, Tuple]:
+        if exact:
+            return f"{self.filter}name_key = ?", (*self.params, key)
+        return f"{self.filter}name_key >= ? AND name_key < ?", (*self.params, key, key + CATALOG_KEY_RANGE_END)
+    
+    def count(self, key: str = '') -> int:
+        where, params = self._where(key, False)
+        return self.conn.execute(f"SELECT COUNT(*) FROM browse WHERE {where}", params).fetchone()[0]
+    
+    def prefixes(self, key: str) -> List[str]:
+        """Distinct name prefixes one character longer than key, in order"""
+        where, params = self._where(key, False)
+        return [row[0] for row in self.conn.execute(
+            f"SELECT DISTINCT substr(name_key, 1, ?) FROM browse WHERE {where} ORDER BY 1",
+            (len(key) + 1, *params)
+        )]
+    
+    def records(self, key: str = '', exact: bool = False) -> Iterator[Dict]:
+        """Records whose lower-cased name starts with (or, if exact, equals) key"""
+        where, params = self._where(key, exact)
+        for (record,) in self.conn.execute(
+            f"SELECT record FROM browse WHERE {where} ORDER BY name_key, source_url", params
+        ):
+            yield json.loads(record)
 
 class RosewoodQA:
     """QA validator and tester for processed tool data"""
     
-    def __init__(self):
+    def __init__(self, api_base: str = ALPHA_1_API_BASE, trace_path: Optional[Path] = None,
+                 progress_store: Optional[ProgressStore] = None):
+        self.api_base = api_base.rstrip('/')
+        self.progress_store: Optional[ProgressStore] = None
         self.progress_db = None
-        self.validation_results = []
-        self.processed_tools = []
+        self.stats = StreamingStats()
+        self.metrics = StageMetrics('rosewood')
+        self.tracer = StageTracer('rosewood', trace_path)
+        self.drain = StageDrain('rosewood', CHECKPOINT_PATH)
+        self.ledger = RunLedger('rosewood')
+        self.run_started_at: Optional[str] = None
+        self.resumed_results: Dict[str, ValidationResult] = {}  # Validated by the interrupted run
+        self.valid_ids: Set[str] = set()  # Records themselves stay on disk until import generation
+        self.sample_tool: Optional[ProcessedTool] = None  # First valid tool, for the API format check
+        self.bulk_load_summary = {}
+        self.bulk_endpoint_supported = None
+        self.category_resolver: Optional[CategoryResolver] = None
+        self.duplicate_index = NearDuplicateIndex()  # Valid tools are added as they are validated
+        self.first_image_paths: Dict[str, str] = {}  # Valid tool ID -> first processed image, for dHashes
+        self.duplicate_clusters: List[List[str]] = []
+        self.duplicate_group_of: Dict[str, str] = {}
+        self.duplicate_summary = {}
+        self.search_index_summary = {}
+        self.catalog_bundle_summary = {}
         self.qa_summary = {}
+        self.delta_summary = {}
+        self.image_export_summary = {}
         
         # Ensure directories exist
         QA_RESULTS_DIR.mkdir(parents=True, exist_ok=True)
         IMPORT_READY_DIR.mkdir(parents=True, exist_ok=True)
         
         # Connect to shared database
-        self.connect_to_database()
+        self.connect_to_database(progress_store)
     
-    def connect_to_database(self):
-        """Connect to the shared SQLite database"""
-        if not DATABASE_PATH.exists():
-            logger.error(f"Database not found at {DATABASE_PATH}")
-            raise FileNotFoundError("Shared database not found")
-        
-        self.progress_db = sqlite3.connect(DATABASE_PATH)
-        
-        # Add QA tracking columns
-        cursor = self.progress_db.cursor()
-        try:
-            cursor.execute('''
-                ALTER TABLE discovered_tools 
-                ADD COLUMN qa_started_at TIMESTAMP
-            ''')
-        except sqlite3.OperationalError:
-            pass
-        
-        try:
-            cursor.execute('''
-                ALTER TABLE discovered_tools 
-                ADD COLUMN qa_completed_at TIMESTAMP
-            ''')
-        except sqlite3.OperationalError:
-            pass
-        
-        try:
-            cursor.execute('''
-                ALTER TABLE discovered_tools 
-                ADD COLUMN qa_validation_score REAL
-            ''')
-        except sqlite3.OperationalError:
-            pass
-        
-        try:
-            cursor.execute('''
-                ALTER TABLE discovered_tools 
-                ADD COLUMN qa_errors TEXT
-            ''')
-        except sqlite3.OperationalError:
-            pass
-        
-        self.progress_db.commit()
-        logger.info("Connected to shared database")
+    def connect_to_database(self, progress_store: Optional[ProgressStore] = None):
+        """Open the node-local progress store, or use a pipeline's; upstream progress arrives via pull()"""
+        self.progress_store = progress_store or ProgressStore('rosewood', LOCAL_DATABASE_PATH, CHANGESET_DIR)
+        self.progress_db = self.progress_store.conn
+        self.progress_db.on_commit = lambda seconds: self.metrics.observe('db_commit_seconds', seconds)
+        logger.info(f"Local progress store ready at {self.progress_store.local_path}")
     
     async def wait_for_ironwood_completion(self) -> bool:
         """Wait for IRONWOOD processing to complete"""
@@ -126,32 +635,44 @@ class RosewoodQA:
                 logger.info("IRONWOOD processing completed - starting QA")
                 return True
             
-            await asyncio.sleep(15)  # Check every 15 seconds
+            if not await self.drain.sleep(15):  # Check every 15 seconds
+                logger.info("Drained while waiting for IRONWOOD")
+                return False
         
         logger.error("Timeout waiting for IRONWOOD completion")
         return False
     
-    async def load_processed_tools(self) -> List[Dict]:
-        """Load all processed tool data from IRONWOOD"""
-        tools = []
+    def iter_processed_tools(self, tool_ids: Optional[Set[str]] = None) -> Iterator[ProcessedTool]:
+        """
+        Read IRONWOOD's processed tools from disk one at a time
         
+        Every tool's packed record is read (or its JSON from before the
+        packed handoff); with tool_ids, only those tools' files are opened.
+        """
         if not PROCESSED_DATA_DIR.exists():
             logger.error(f"Processed data directory not found: {PROCESSED_DATA_DIR}")
-            return tools
+            return
         
-        # Load all JSON files
-        for json_file in PROCESSED_DATA_DIR.glob("tool_*.json"):
+        for data_file in record_files(PROCESSED_DATA_DIR):
+            if tool_ids is not None and data_file.stem[len('tool_'):] not in tool_ids:
+                continue
             try:
-                with open(json_file, 'r') as f:
-                    tool_data = json.load(f)
-                    tools.append(tool_data)
+                yield read_record_file(ProcessedTool, data_file)
             except Exception as e:
-                logger.error(f"Failed to load {json_file}: {e}")
-        
-        logger.info(f"Loaded {len(tools)} processed tools for QA")
-        return tools
+                logger.error(f"Failed to load {data_file}: {e}")
+    
+    def load_processed_tool(self, tool_id: str) -> Optional[ProcessedTool]:
+        """One processed tool by ID, or None if it cannot be read"""
+        data_file = record_file(PROCESSED_DATA_DIR, tool_id)
+        if not data_file.exists():
+            data_file = data_file.with_suffix(LEGACY_RECORD_FILE_SUFFIX)
+        try:
+            return read_record_file(ProcessedTool, data_file)
+        except Exception as e:
+            logger.error(f"Failed to load {data_file}: {e}")
+            return None
     
-    async def validate_tool_data(self, tool_data: Dict) -> ValidationResult:
+    async def validate_tool_data(self, tool_data: ProcessedTool) -> ValidationResult:
         """
         Comprehensive validation of individual tool data
         
@@ -162,12 +683,12 @@ class RosewoodQA:
         warnings = []
         
         # Check required fields
-        missing_required = MIN_REQUIRED_FIELDS - set(tool_data.keys())
+        missing_required = tool_data.missing_fields(MIN_REQUIRED_FIELDS)
         if missing_required:
             errors.append(f"Missing required fields: {', '.join(missing_required)}")
         
         # Check recommended fields
-        missing_recommended = RECOMMENDED_FIELDS - set(tool_data.keys())
+        missing_recommended = tool_data.missing_fields(RECOMMENDED_FIELDS)
         if missing_recommended:
             warnings.append(f"Missing recommended fields: {', '.join(missing_recommended)}")
         
@@ -233,10 +754,10 @@ class RosewoodQA:
         
         return warnings
     
-    def calculate_completeness_score(self, tool_data: Dict) -> float:
+    def calculate_completeness_score(self, tool_data: ProcessedTool) -> float:
         """Calculate data completeness score (0-100)"""
-        total_fields = len(MIN_REQUIRED_FIELDS) + len(RECOMMENDED_FIELDS)
-        present_fields = len(set(tool_data.keys()) & (MIN_REQUIRED_FIELDS | RECOMMENDED_FIELDS))
+        total_fields = len(SCORED_FIELDS)
+        present_fields = total_fields - len(tool_data.missing_fields(SCORED_FIELDS))
         
         base_score = (present_fields / total_fields) * 80
         
@@ -271,52 +792,218 @@ class RosewoodQA:
     async def validate_all_tools(self):
         """Run validation on all processed tools"""
         logger.info("Starting comprehensive QA validation")
+        self.ledger.start()
         
-        # Load processed tools
-        self.processed_tools = await self.load_processed_tools()
+        # Merge WALNUT and IRONWOOD progress so QA updates land on known rows
+        self.progress_store.pull()
+        self.begin_run()
         
-        if not self.processed_tools:
+        tools_left = sum(1 for _ in record_files(PROCESSED_DATA_DIR)) if PROCESSED_DATA_DIR.exists() else 0
+        if not tools_left:
             logger.error("No processed tools found for validation")
             return
+        logger.info(f"Validating {tools_left} processed tools")
+        
+        # Stream each tool from disk, folding its result into the report
+        # statistics and writing results to the database in batches; only
+        # the IDs of valid tools are kept
+        pending_rows = []
+        for tool_data in self.iter_processed_tools():
+            if self.drain.draining:
+                break
+            await self.validate_tool(tool_data, pending_rows)
+            tools_left -= 1
+            self.metrics.set('queue_depth', tools_left, queue='validation')
+        
+        if self.drain.draining:
+            await self.finish_drain(pending_rows)
+            return
         
-        # Validate each tool
-        validation_tasks = [
-            self.validate_tool_data(tool_data) 
-            for tool_data in self.processed_tools
-        ]
+        await self.finish_validation(pending_rows)
+    
+    def begin_run(self):
+        """Pick up the QA results of the run in the checkpoint, or checkpoint a new run"""
+        checkpoint = self.drain.load_checkpoint()
+        if checkpoint is None:
+            self.run_started_at = datetime.now().isoformat()
+            self.drain.save_checkpoint({"run_started_at": self.run_started_at})
+            return
         
-        self.validation_results = await asyncio.gather(*validation_tasks)
+        # Results for tools IRONWOOD has not reprocessed since stand as they are
+        self.run_started_at = checkpoint['run_started_at']
+        cursor = self.progress_db.execute(QA_RESULTS_SINCE_SQL, (datetime.fromisoformat(self.run_started_at),))
+        for tool_id, is_valid, quality_score, qa_errors in cursor:
+            issues = json.loads(qa_errors) if qa_errors else {}
+            self.resumed_results[tool_id] = ValidationResult(
+                tool_id=tool_id,
+                is_valid=bool(is_valid),
+                errors=issues.get('errors', []),
+                warnings=issues.get('warnings', []),
+                completeness_score=None,  # Not stored; recomputed from the tool data
+                quality_score=quality_score
+            )
+        logger.info(f"{len(self.resumed_results)} QA results carried over from the interrupted run")
+    
+    async def validate_tool(self, tool_data: ProcessedTool, pending_rows: List[ValidationResult]):
+        """Validate one tool and queue its result row, writing the rows once a batch is full"""
+        result = self.resumed_results.pop(str(tool_data.get('id')), None)
+        if result is not None:
+            result.completeness_score = self.calculate_completeness_score(tool_data)
+            self.record_validation(tool_data, result)
+            self.metrics.inc('tools_total', result='resumed')
+            return
         
-        # Update database with validation results
-        await self.update_qa_database()
+        with self.metrics.time('validate_seconds'), self.tracer.span('qa', tool_data.get('id')):
+            result = await self.validate_tool_data(tool_data)
+        self.record_validation(tool_data, result)
+        self.metrics.inc('tools_total', result='valid' if result.is_valid else 'invalid')
+        pending_rows.append(result)
         
-        logger.info(f"Validated {len(self.validation_results)} tools")
+        if len(pending_rows) >= QA_DB_BATCH_SIZE:
+            await self.update_qa_database(pending_rows)
+            pending_rows.clear()
+    
+    async def finish_drain(self, pending_rows: List[ValidationResult]):
+        """Write the results so far, ship them and checkpoint the run; no import files are generated"""
+        await self.update_qa_database(pending_rows)
+        self.progress_store.ship()
+        self.drain.save_checkpoint({"run_started_at": self.run_started_at})
+        
+        logger.warning(f"ROSEWOOD drained after validating {self.stats.counter('tools_validated')} tools; "
+                       f"the next run resumes with the rest")
     
-    async def update_qa_database(self):
-        """Update database with QA validation results"""
-        cursor = self.progress_db.cursor()
+    async def finish_validation(self, pending_rows: List[ValidationResult]):
+        """Write the last result rows, publish progress and group near-duplicates"""
+        await self.update_qa_database(pending_rows)
+        self.progress_store.ship()
+        self.progress_store.publish(DATABASE_PATH)
         
-        for result in self.validation_results:
-            qa_errors = json.dumps({
-                'errors': result.errors,
-                'warnings': result.warnings
-            })
-            
-            cursor.execute('''
-                UPDATE discovered_tools 
-                SET qa_by_rosewood = ?, qa_completed_at = ?, 
-                    qa_validation_score = ?, qa_errors = ?
-                WHERE tool_id = ?
-            ''', (
-                result.is_valid, 
-                datetime.now(), 
-                result.quality_score,
-                qa_errors,
-                result.tool_id
-            ))
+        # Group near-identical listings
+        await self.detect_near_duplicates()
         
-        self.progress_db.commit()
-        logger.info("Database updated with QA results")
+        logger.info(f"Validated {self.stats.counter('tools_validated')} tools")
+    
+    async def hash_first_images(self, image_paths: Dict[str, str]) -> Dict[str, Optional[int]]:
+        """dHash of each tool's first processed image, computed in a thread pool"""
+        if not NEAR_DUPLICATE_USE_IMAGES:
+            return {}
+        
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(NEAR_DUPLICATE_HASH_THREADS, thread_name_prefix='image-dhash') as pool:
+            jobs = {
+                tool_id: loop.run_in_executor(pool, image_dhash, Path(path))
+                for tool_id, path in image_paths.items()
+            }
+            return dict(zip(jobs, await asyncio.gather(*jobs.values())))
+    
+    async def detect_near_duplicates(self):
+        """
+        Find clusters of near-duplicate tools with MinHash/LSH
+        
+        Only valid tools are exported, so only they were added to the index
+        as they were validated and only their first images are hashed here.
+        """
+        start_time = time.time()
+        index = self.duplicate_index
+        
+        for tool_id, image_hash in (await self.hash_first_images(self.first_image_paths)).items():
+            if image_hash is not None:
+                index.add_image_hash(tool_id, image_hash)
+        
+        self.duplicate_clusters, candidate_pairs = index.clusters()
+        
+        # Names are only needed for the sampled clusters; read those tools back
+        names = {}
+        for members in self.duplicate_clusters[:NEAR_DUPLICATE_SAMPLE_CLUSTERS]:
+            for tool_id in members:
+                tool_data = self.load_processed_tool(tool_id)
+                names[tool_id] = tool_data.get('name', '') if tool_data is not None else ''
+        
+        self.duplicate_group_of = {}
+        for members in self.duplicate_clusters:
+            group_id = f"dup-{members[0]}"
+            for tool_id in members:
+                self.duplicate_group_of[tool_id] = group_id
+        
+        self.duplicate_summary = {
+            "clusters": len(self.duplicate_clusters),
+            "tools_in_clusters": len(self.duplicate_group_of),
+            "largest_cluster": len(self.duplicate_clusters[0]) if self.duplicate_clusters else 0,
+            "candidate_pairs_checked": candidate_pairs,
+            "image_hashes_used": len(index.image_hashes),
+            "elapsed_time_seconds": round(time.time() - start_time, 3),
+            "sample_clusters": [
+                {
+                    "group_id": f"dup-{members[0]}",
+                    "tools": [{"id": tool_id, "name": names.get(tool_id, '')} for tool_id in members]
+                }
+                for members in self.duplicate_clusters[:NEAR_DUPLICATE_SAMPLE_CLUSTERS]
+            ]
+        }
+        
+        logger.info(
+            f"Near-duplicate detection: {len(self.duplicate_clusters)} clusters covering "
+            f"{len(self.duplicate_group_of)} tools ({candidate_pairs} candidate pairs checked)"
+        )
+    
+    def record_validation(self, tool_data: Dict, result: ValidationResult):
+        """Fold one validation result into the streaming report statistics and the duplicate index"""
+        tool_id = str(tool_data.get('id', ''))
+        if result.is_valid and tool_id:
+            self.valid_ids.add(tool_id)
+            self.duplicate_index.add(tool_id, tool_data)
+            if tool_data.get('processed_images'):
+                self.first_image_paths[tool_id] = tool_data['processed_images'][0].get('local_path', '')
+            if self.sample_tool is None:
+                self.sample_tool = tool_data
+        
+        if tool_data.get('category'):
+            self.stats.issue('categories', tool_data['category'], capacity=CATEGORY_TOP_K_CAPACITY)
+        
+        self.stats.count('tools_validated')
+        self.stats.count('valid_tools' if result.is_valid else 'invalid_tools')
+        self.stats.observe('completeness_score', result.completeness_score)
+        self.stats.observe('quality_score', result.quality_score)
+        
+        for error in result.errors:
+            self.stats.issue('errors', error)
+        for warning in result.warnings:
+            self.stats.issue('warnings', warning)
+        
+        if not tool_data.get('processed_images'):
+            self.stats.count('missing_images')
+        if not tool_data.get('description'):
+            self.stats.count('missing_descriptions')
+        
+        if not result.is_valid:
+            self.stats.sample('invalid_tools', {'id': result.tool_id, 'errors': result.errors},
+                              INVALID_TOOLS_SAMPLE_SIZE)
+    
+    async def update_qa_database(self, results: List[ValidationResult]):
+        """Update database with a batch of QA validation results"""
+        if not results:
+            return
+        
+        with self.tracer.span('db_update', None, tools=len(results)):
+            cursor = self.progress_db.cursor()
+            
+            for result in results:
+                qa_errors = json.dumps({
+                    'errors': result.errors,
+                    'warnings': result.warnings
+                })
+                
+                cursor.execute(RECORD_QA_RESULT_SQL, (
+                    result.is_valid, 
+                    datetime.now(), 
+                    result.quality_score,
+                    qa_errors,
+                    result.tool_id
+                ))
+            
+            self.progress_db.commit()
+        self.progress_store.maybe_ship()
+        logger.info(f"Database updated with {len(results)} QA results")
     
     async def test_alpha1_api_compatibility(self) -> Dict:
         """Test compatibility with alpha-1 API endpoints"""
@@ -330,22 +1017,23 @@ class RosewoodQA:
         }
         
         try:
-            # Test health endpoint
-            response = requests.get(f"{ALPHA_1_API_BASE}/health", timeout=10)
-            api_tests['health_check'] = response.status_code == 200
-            
-            # Test categories endpoint
-            response = requests.get(f"{ALPHA_1_API_BASE}/categories", timeout=10)
-            api_tests['categories_endpoint'] = response.status_code in [200, 404]  # 404 is OK if empty
-            
-            # Test tools endpoint
-            response = requests.get(f"{ALPHA_1_API_BASE}/tools", timeout=10)
-            api_tests['tools_endpoint'] = response.status_code in [200, 404]
+            timeout = aiohttp.ClientTimeout(total=10)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                # Test health endpoint
+                async with session.get(f"{self.api_base}/health") as response:
+                    api_tests['health_check'] = response.status == 200
+                
+                # Test categories endpoint
+                async with session.get(f"{self.api_base}/categories") as response:
+                    api_tests['categories_endpoint'] = response.status in [200, 404]  # 404 is OK if empty
+                
+                # Test tools endpoint
+                async with session.get(f"{self.api_base}/tools") as response:
+                    api_tests['tools_endpoint'] = response.status in [200, 404]
             
             # Test sample tool data format (without actually importing)
-            if self.validation_results:
-                sample_tool = self.processed_tools[0]
-                formatted_tool = await self.format_tool_for_import(sample_tool)
+            if self.sample_tool is not None:
+                formatted_tool = await self.format_tool_for_import(self.sample_tool)
                 
                 # Validate against expected schema
                 required_api_fields = {'name', 'description', 'categoryId', 'status'}
@@ -367,7 +1055,7 @@ class RosewoodQA:
             'description': tool_data.get('description', ''),
             'brand': tool_data.get('brand', ''),
             'model': tool_data.get('model', ''),
-            'categoryId': 1,  # Default category - will be mapped properly
+            'categoryId': DEFAULT_CATEGORY_ID,  # Resolved from the MyTurn category below
             'condition': 'GOOD',  # Default condition
             'status': 'AVAILABLE',  # Default status
             'imageUrl': '',  # Will be set from processed images
@@ -378,131 +1066,650 @@ class RosewoodQA:
             'sourceSystem': 'MyTurn'
         }
         
+        # Group copies of the same tool
+        duplicate_group = self.duplicate_group_of.get(str(tool_data.get('id', '')))
+        if duplicate_group:
+            formatted['duplicateGroupId'] = duplicate_group
+        
         # Set primary image if available
         if tool_data.get('processed_images'):
             first_image = tool_data['processed_images'][0]
             formatted['imageUrl'] = f"/tool_images/{first_image['filename']}"
         
         # Map category from MyTurn to our system
-        category_mapping = {
-            'Hand Tools': 1,
-            'Power Tools': 2,
-            'Garden Tools': 3,
-            'Tools': 1  # Default
-        }
-        
-        myturn_category = tool_data.get('category', 'Tools')
-        formatted['categoryId'] = category_mapping.get(myturn_category, 1)
+        if self.category_resolver is None:
+            self.category_resolver = CategoryResolver(SEEDED_CATEGORIES)
+        formatted['categoryId'] = self.category_resolver.resolve(tool_data.get('category')).category_id
         
         return formatted
     
     async def generate_import_files(self):
-        """Generate final import files for alpha-1 system"""
-        logger.info("Generating import-ready files")
-        
-        # Filter valid tools only
-        valid_tools = [
-            tool for i, tool in enumerate(self.processed_tools)
-            if i < len(self.validation_results) and self.validation_results[i].is_valid
-        ]
+        """
+        Generate final import files for alpha-1 system
         
-        logger.info(f"Preparing {len(valid_tools)} valid tools for import")
+        Valid tools are read back from disk one at a time, formatted and
+        handed to every import writer in turn, so neither the processed
+        records nor the formatted rows are held in memory.
+        """
+        logger.info("Generating import-ready files")
         
-        # Format for database import
-        import_tools = []
-        for tool_data in valid_tools:
-            formatted_tool = await self.format_tool_for_import(tool_data)
-            import_tools.append(formatted_tool)
+        total_tools = len(self.valid_ids)
+        logger.info(f"Preparing {total_tools} valid tools for import")
         
-        # Generate SQL import script
-        await self.generate_sql_import(import_tools)
+        # Build the category resolver once for the whole run
+        self.category_resolver = CategoryResolver(await self.load_category_table())
         
-        # Generate JSON import file
-        await self.generate_json_import(import_tools)
+        with ExitStack() as writers:
+            add_sql = writers.enter_context(self.sql_import_writer(total_tools))
+            add_json = writers.enter_context(self.json_import_writer(total_tools))
+            add_ndjson = writers.enter_context(self.ndjson_import_writer(total_tools))
+            add_delta = writers.enter_context(self.delta_import_writer())
+            add_search = writers.enter_context(self.search_index_writer())
+            add_catalog = writers.enter_context(self.catalog_bundle_writer())
+            add_images = writers.enter_context(self.image_export_writer())
+            
+            for tool_data in self.iter_processed_tools(self.valid_ids):
+                formatted_tool = await self.format_tool_for_import(tool_data)
+                add_sql(formatted_tool)
+                add_json(formatted_tool)
+                add_ndjson(formatted_tool)
+                add_delta(formatted_tool)
+                add_search(formatted_tool)
+                add_catalog(formatted_tool)
+                add_images(tool_data)
         
         # Generate category mapping
         await self.generate_category_mapping()
         
-        # Copy optimized images to import directory
-        await self.prepare_image_imports()
+        # Benchmark the full-text search index
+        self.search_index_summary.update(await self.benchmark_search_index())
     
-    async def generate_sql_import(self, tools: List[Dict]):
-        """Generate SQL import script"""
+    @contextmanager
+    def sql_import_writer(self, total_tools: int) -> Iterator[Callable[[Dict], None]]:
+        """Generate SQL import script, one INSERT per tool passed to the yielded function"""
         sql_file = IMPORT_READY_DIR / "tools_import.sql"
+        tmp_path = sql_file.with_name(sql_file.name + '.tmp')
         
-        with open(sql_file, 'w') as f:
-            f.write("-- Ballarat Tool Library - MyTurn Import Script\n")
-            f.write(f"-- Generated: {datetime.now().isoformat()}\n")
-            f.write(f"-- Total tools: {len(tools)}\n\n")
-            
-            f.write("BEGIN TRANSACTION;\n\n")
-            
-            for tool in tools:
-                # Escape single quotes for SQL
-                name = tool['name'].replace("'", "''")
-                description = tool['description'].replace("'", "''")
-                brand = tool.get('brand', '').replace("'", "''")
-                model = tool.get('model', '').replace("'", "''")
+        # Written aside and renamed on success, so a failed run keeps the last good script
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write("-- Ballarat Tool Library - MyTurn Import Script\n")
+                f.write(f"-- Generated: {datetime.now().isoformat()}\n")
+                f.write(f"-- Total tools: {total_tools}\n\n")
                 
-                f.write(f"""
+                f.write("BEGIN TRANSACTION;\n\n")
+                
+                def add(tool: Dict):
+                    # Escape single quotes for SQL
+                    name = tool['name'].replace("'", "''")
+                    description = tool['description'].replace("'", "''")
+                    brand = tool.get('brand', '').replace("'", "''")
+                    model = tool.get('model', '').replace("'", "''")
+                    source_url = tool.get('sourceUrl', '').replace("'", "''")
+                    
+                    f.write(f"""
 INSERT INTO "Tool" (
     "name", "description", "brand", "model", "categoryId", 
     "condition", "status", "imageUrl", "instructions", 
-    "createdAt", "updatedAt"
+    "sourceUrl", "createdAt", "updatedAt"
 ) VALUES (
     '{name}',
     '{description}',
     '{brand}',
     '{model}',
-    {tool['categoryId']},
+    {sql_quote(tool['categoryId'])},
     '{tool['condition']}',
     '{tool['status']}',
     '{tool['imageUrl']}',
     '{description}',
+    '{source_url}',
     datetime('now'),
     datetime('now')
 );
 """)
-            
-            f.write("\nCOMMIT;\n")
+                
+                yield add
+                
+                f.write("\nCOMMIT;\n")
+            os.replace(tmp_path, sql_file)
+        finally:
+            tmp_path.unlink(missing_ok=True)
         
         logger.info(f"SQL import script generated: {sql_file}")
     
-    async def generate_json_import(self, tools: List[Dict]):
-        """Generate JSON import file"""
+    def build_import_metadata(self, total_tools: int, import_format: str) -> Dict:
+        """Metadata header shared by the JSON and NDJSON import files"""
+        return {
+            "source": "MyTurn Ballarat Tool Library",
+            "generated_at": datetime.now().isoformat(),
+            "total_tools": total_tools,
+            "import_format": import_format,
+            "import_format_version": IMPORT_FORMAT_VERSION,
+            "duplicate_groups": len(self.duplicate_clusters)
+        }
+    
+    @contextmanager
+    def json_import_writer(self, total_tools: int) -> Iterator[Callable[[Dict], None]]:
+        """
+        Generate JSON import file
+        
+        Streams the metadata header and then each tool as it is passed to
+        the yielded function, so the document is never built in memory.
+        Writes .gz/.zst siblings alongside.
+        """
         json_file = IMPORT_READY_DIR / "tools_import.json"
+        metadata = self.build_import_metadata(total_tools, "json")
         
-        import_data = {
-            "metadata": {
-                "source": "MyTurn Ballarat Tool Library",
-                "generated_at": datetime.now().isoformat(),
-                "total_tools": len(tools),
-                "import_format_version": "1.0"
-            },
-            "tools": tools
+        with PrecompressedWriter(json_file) as out:
+            out.write('{\n  "metadata": ')
+            out.write(json.dumps(metadata))
+            out.write(',\n  "tools": [')
+            
+            separator = '\n    '
+            
+            def add(tool: Dict):
+                nonlocal separator
+                out.write(separator)
+                out.write(json.dumps(tool, separators=(',', ':')))
+                separator = ',\n    '
+            
+            yield add
+            
+            out.write('\n  ]\n}\n')
+        
+        logger.info(f"JSON import file generated: {json_file}")
+    
+    @contextmanager
+    def ndjson_import_writer(self, total_tools: int) -> Iterator[Callable[[Dict], None]]:
+        """
+        Generate NDJSON import file for line-by-line ingestion
+        
+        The first line holds {"metadata": {...}}; every following line is one tool.
+        """
+        ndjson_file = IMPORT_READY_DIR / "tools_import.ndjson"
+        metadata = self.build_import_metadata(total_tools, "ndjson")
+        
+        with PrecompressedWriter(ndjson_file) as out:
+            out.write(json.dumps({"metadata": metadata}))
+            out.write('\n')
+            
+            def add(tool: Dict):
+                out.write(json.dumps(tool, separators=(',', ':')))
+                out.write('\n')
+            
+            yield add
+        
+        logger.info(f"NDJSON import file generated: {ndjson_file}")
+    
+    @staticmethod
+    def read_ndjson_import() -> Iterator[Dict]:
+        """Tools from the NDJSON import file, one at a time"""
+        with open(IMPORT_READY_DIR / "tools_import.ndjson", 'r') as f:
+            next(f, None)  # Metadata line
+            for line in f:
+                yield json.loads(line)
+    
+    def load_import_manifest(self) -> Dict:
+        """Load the manifest of the last applied export: generated_at and sourceUrl -> content hash"""
+        if not IMPORT_MANIFEST_PATH.exists():
+            return {}
+        
+        try:
+            with open(IMPORT_MANIFEST_PATH, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load import manifest, treating export as full: {e}")
+            return {}
+    
+    def save_pending_manifest(self, tool_hashes: Dict[str, str], base_generated_at: Optional[str]):
+        """
+        Atomically replace the pending manifest
+        
+        It becomes the import manifest only once the delta built against
+        base_generated_at is applied (--mark-delta-applied), so regenerating
+        before then still diffs against what the database actually holds.
+        """
+        manifest = {
+            "generated_at": datetime.now().isoformat(),
+            "base_generated_at": base_generated_at,
+            "total_tools": len(tool_hashes),
+            "tools": tool_hashes
         }
         
-        with open(json_file, 'w') as f:
-            json.dump(import_data, f, indent=2)
+        tmp_path = PENDING_MANIFEST_PATH.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, PENDING_MANIFEST_PATH)
+    
+    @staticmethod
+    def mark_delta_applied() -> bool:
+        """Promote the pending manifest once its delta has been applied to the database"""
+        if not PENDING_MANIFEST_PATH.exists():
+            logger.error(f"No pending delta manifest at {PENDING_MANIFEST_PATH}")
+            return False
+        
+        os.replace(PENDING_MANIFEST_PATH, IMPORT_MANIFEST_PATH)
+        logger.info(f"Delta marked applied; {IMPORT_MANIFEST_PATH} is the new delta base")
+        return True
+    
+    @contextmanager
+    def delta_import_writer(self) -> Iterator[Callable[[Dict], None]]:
+        """
+        Generate a delta package of changes since the previous export
         
-        logger.info(f"JSON import file generated: {json_file}")
+        Tools are keyed on sourceUrl and diffed against the last applied
+        manifest. Added and changed tools become upserts; tools no longer in
+        discovered_tools become soft-deletes (isActive = FALSE). Tools still
+        listed but failing validation this run are left as they are. Without
+        a previous manifest every tool is emitted as an upsert.
+        
+        Upserts are spooled to disk as tools arrive, since the delta files
+        open with counts only known once every tool has been seen.
+        """
+        DELTA_DIR.mkdir(parents=True, exist_ok=True)
+        
+        base_manifest = self.load_import_manifest()
+        previous_hashes = base_manifest.get('tools', {})
+        current_hashes = {}
+        added = changed = 0
+        spool_path = DELTA_DIR / "upserts.ndjson.tmp"
+        
+        try:
+            with open(spool_path, 'w') as spool:
+                def add(tool: Dict):
+                    nonlocal added, changed
+                    source_url = tool.get('sourceUrl')
+                    if not source_url:
+                        return
+                    
+                    tool_hash = compute_tool_hash(tool)
+                    current_hashes[source_url] = tool_hash
+                    
+                    previous_hash = previous_hashes.get(source_url)
+                    if previous_hash is None:
+                        added += 1
+                    elif previous_hash != tool_hash:
+                        changed += 1
+                    else:
+                        return
+                    spool.write(json.dumps(tool, separators=(',', ':')))
+                    spool.write('\n')
+                
+                yield add
+            
+            # Only tools gone from the catalog are soft-deleted; with nothing
+            # discovered locally there is no evidence either way, so none are
+            discovered_urls = {row[0] for row in self.progress_db.execute(DISCOVERED_TOOL_URLS_SQL)}
+            if previous_hashes and not discovered_urls:
+                logger.warning("No discovered tools in the progress store; skipping soft-deletes")
+            missing = set(previous_hashes) - set(current_hashes)
+            removed = sorted(url for url in missing if discovered_urls and url not in discovered_urls)
+            held = missing - set(removed)
+            unchanged = len(current_hashes) - added - changed
+            
+            # Held tools keep their applied hash, so they diff correctly once valid again
+            pending_hashes = current_hashes
+            for source_url in held:
+                pending_hashes[source_url] = previous_hashes[source_url]
+            
+            summary = {
+                "previous_manifest_found": bool(previous_hashes),
+                "base_manifest_generated_at": base_manifest.get('generated_at'),
+                "added": added,
+                "changed": changed,
+                "removed": len(removed),
+                "held_invalid": len(held),
+                "unchanged": unchanged
+            }
+            
+            self.generate_delta_sql(self.read_delta_spool(spool_path), removed, summary)
+            self.generate_delta_ndjson(self.read_delta_spool(spool_path), removed, summary)
+        finally:
+            spool_path.unlink(missing_ok=True)
+        
+        self.save_pending_manifest(pending_hashes, summary['base_manifest_generated_at'])
+        self.delta_summary = summary
+        
+        logger.info(
+            f"Delta import generated: {added} added, {changed} changed, "
+            f"{len(removed)} removed, {len(held)} held back as invalid, {summary['unchanged']} unchanged"
+        )
+        logger.info("Run with --mark-delta-applied once the delta is in the database")
+    
+    @staticmethod
+    def read_delta_spool(spool_path: Path) -> Iterator[Dict]:
+        """Upserted tools spooled by delta_import_writer, in arrival order"""
+        with open(spool_path, 'r') as f:
+            for line in f:
+                yield json.loads(line)
+    
+    def generate_delta_sql(self, upserts: Iterable[Dict], removed: List[str], summary: Dict):
+        """Generate SQL upserts keyed on sourceUrl plus soft-deletes"""
+        sql_file = DELTA_DIR / "tools_delta.sql"
+        column_list = ', '.join(f'"{column}"' for column in SQL_IMPORT_COLUMNS)
+        update_list = ',\n    '.join(
+            f'"{column}" = excluded."{column}"'
+            for column in SQL_IMPORT_COLUMNS if column != 'sourceUrl'
+        )
+        
+        tmp_path = sql_file.with_name(sql_file.name + '.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write("-- Ballarat Tool Library - MyTurn Delta Import Script\n")
+                f.write(f"-- Generated: {datetime.now().isoformat()}\n")
+                f.write(f"-- Upserts: {summary['added'] + summary['changed']} ({summary['added']} added, {summary['changed']} changed)\n")
+                f.write(f"-- Soft-deletes: {len(removed)}\n")
+                f.write(f"-- Base manifest: {summary['base_manifest_generated_at'] or 'none (full export)'}\n")
+                f.write("-- Requires a unique \"sourceUrl\" column on \"Tool\"\n\n")
+                
+                f.write("BEGIN TRANSACTION;\n\n")
+                
+                for tool in upserts:
+                    values = ', '.join(sql_quote(tool.get(column, '')) for column in SQL_IMPORT_COLUMNS)
+                    f.write(f"""
+INSERT INTO "Tool" (
+    {column_list}, "isActive", "createdAt", "updatedAt"
+) VALUES (
+    {values}, TRUE, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+)
+ON CONFLICT ("sourceUrl") DO UPDATE SET
+    {update_list},
+    "isActive" = TRUE,
+    "updatedAt" = CURRENT_TIMESTAMP;
+""")
+                
+                for source_url in removed:
+                    f.write(f"""
+UPDATE "Tool" SET "isActive" = FALSE, "updatedAt" = CURRENT_TIMESTAMP
+WHERE "sourceUrl" = {sql_quote(source_url)} AND "isActive" = TRUE;
+""")
+                
+                f.write("\nCOMMIT;\n")
+            os.replace(tmp_path, sql_file)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        
+        logger.info(f"Delta SQL script generated: {sql_file}")
+    
+    def generate_delta_ndjson(self, upserts: Iterable[Dict], removed: List[str], summary: Dict):
+        """Generate NDJSON delta: metadata line, then one upsert/delete operation per line"""
+        ndjson_file = DELTA_DIR / "tools_delta.ndjson"
+        metadata = self.build_import_metadata(summary['added'] + summary['changed'] + len(removed), "ndjson-delta")
+        metadata["delta_summary"] = summary
+        
+        with PrecompressedWriter(ndjson_file) as out:
+            out.write(json.dumps({"metadata": metadata}))
+            out.write('\n')
+            
+            for tool in upserts:
+                out.write(json.dumps({"op": "upsert", "key": tool['sourceUrl'], "tool": tool}, separators=(',', ':')))
+                out.write('\n')
+            
+            for source_url in removed:
+                out.write(json.dumps({"op": "delete", "key": source_url}, separators=(',', ':')))
+                out.write('\n')
+        
+        logger.info(f"Delta NDJSON generated: {ndjson_file}")
+    
+    def load_bulk_progress(self) -> Dict[str, str]:
+        """Load sourceUrl -> content hash of rows already accepted by the API"""
+        loaded = {}
+        if not BULK_LOAD_PROGRESS_PATH.exists():
+            return loaded
+        
+        with open(BULK_LOAD_PROGRESS_PATH, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn final line from an interrupted run
+                if entry.get('api_base') == self.api_base:
+                    loaded[entry['key']] = entry['hash']
+        
+        return loaded
+    
+    def record_bulk_progress(self, loaded_rows: List[Tuple[str, str]]):
+        """Append accepted rows to the progress log so a restart can resume"""
+        if not loaded_rows:
+            return
+        
+        with open(BULK_LOAD_PROGRESS_PATH, 'a') as f:
+            for key, tool_hash in loaded_rows:
+                f.write(json.dumps({'api_base': self.api_base, 'key': key, 'hash': tool_hash}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+    
+    async def post_with_retry(self, session: aiohttp.ClientSession, path: str,
+                              payload: Dict, idempotency_key: str) -> int:
+        """POST JSON with an idempotency key, retrying transient failures"""
+        delay = BULK_LOAD_RETRY_DELAY
+        status = 0
+        request_started = time.perf_counter()
+        
+        for attempt in range(BULK_LOAD_MAX_RETRIES + 1):
+            try:
+                with self.metrics.in_flight():
+                    async with session.post(
+                        f"{self.api_base}{path}",
+                        json=payload,
+                        headers={'Idempotency-Key': idempotency_key}
+                    ) as response:
+                        status = response.status
+                        await response.read()  # Drain so the connection returns to the pool
+                self.metrics.inc('http_responses_total', code=status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"POST {path} attempt {attempt + 1} failed: {e}")
+                status = 0
+            
+            if status and status not in BULK_LOAD_RETRY_STATUSES:
+                self.metrics.observe('api_request_seconds', time.perf_counter() - request_started)
+                return status
+            
+            if attempt < BULK_LOAD_MAX_RETRIES:
+                await asyncio.sleep(delay)
+                delay *= 2
+        
+        self.metrics.observe('api_request_seconds', time.perf_counter() - request_started)
+        return status
+    
+    async def send_batch(self, session: aiohttp.ClientSession,
+                         batch: List[Tuple[Dict, str]]) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        Send one batch of tools, returning the (sourceUrl, hash) rows accepted
+        and how many rows the API rejected
+        
+        Uses POST /tools/bulk when the API offers it and falls back to
+        one POST /tools per row (still pooled and keep-alive) when it does not.
+        Only an answer from the endpoint settles which: 404/405 means no bulk
+        endpoint, 2xx/409 means it exists, and a timeout or 5xx leaves it open.
+        """
+        if self.bulk_endpoint_supported is not False:
+            batch_key = hashlib.sha256(''.join(h for _, h in batch).encode()).hexdigest()
+            status = await self.post_with_retry(
+                session, '/tools/bulk', {'tools': [tool for tool, _ in batch]}, batch_key
+            )
+            
+            if status in (404, 405) and self.bulk_endpoint_supported is None:
+                logger.info("Bulk endpoint not available - loading rows individually")
+                self.bulk_endpoint_supported = False
+            else:
+                if 200 <= status < 300 or status == 409:
+                    self.bulk_endpoint_supported = True
+                if status in BULK_LOAD_DONE_STATUSES:
+                    return [(tool['sourceUrl'], tool_hash) for tool, tool_hash in batch], 0
+                logger.error(f"Bulk batch of {len(batch)} rows failed with HTTP {status}")
+                return [], len(batch) if is_rejection(status) else 0
+        
+        statuses = await asyncio.gather(*[
+            self.post_with_retry(session, '/tools', tool, tool_hash)
+            for tool, tool_hash in batch
+        ])
+        
+        loaded = []
+        rejected = 0
+        for (tool, tool_hash), status in zip(batch, statuses):
+            if status in BULK_LOAD_DONE_STATUSES:
+                loaded.append((tool['sourceUrl'], tool_hash))
+            else:
+                rejected += is_rejection(status)
+                logger.error(f"Failed to load {tool['sourceUrl']}: HTTP {status}")
+        
+        return loaded, rejected
+    
+    async def bulk_load_tools(self, tools: Iterable[Dict], api_token: Optional[str] = None) -> Dict:
+        """
+        Push import-ready tools to the alpha-1 API in batches
+        
+        Tools are batched as they are read, so the import file is streamed
+        rather than loaded. Rows already accepted with the same content hash
+        are skipped, so an interrupted load resumes where it stopped.
+        Content hashes double as idempotency keys, making retried or
+        replayed batches safe.
+        """
+        logger.info(f"Bulk loading tools into {self.api_base}")
+        
+        already_loaded = self.load_bulk_progress()
+        rows_total = pending_count = batch_count = 0
+        
+        def pending_batches() -> Iterator[List[Tuple[Dict, str]]]:
+            nonlocal rows_total, pending_count, batch_count
+            batch = []
+            for tool in tools:
+                rows_total += 1
+                if not tool.get('sourceUrl'):
+                    continue
+                tool_hash = compute_tool_hash(tool)
+                if already_loaded.get(tool['sourceUrl']) == tool_hash:
+                    continue
+                pending_count += 1
+                batch.append((tool, tool_hash))
+                if len(batch) >= BULK_LOAD_BATCH_SIZE:
+                    batch_count += 1
+                    yield batch
+                    batch = []
+            if batch:
+                batch_count += 1
+                yield batch
+        
+        headers = {'Content-Type': 'application/json'}
+        api_token = api_token or os.environ.get(ALPHA_1_API_TOKEN_ENV)
+        if api_token:
+            headers['Authorization'] = f"Bearer {api_token}"
+        
+        connector = aiohttp.TCPConnector(limit=BULK_LOAD_CONCURRENCY * 4, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=60)
+        loaded_count = rejected_count = unsent_count = 0
+        
+        start_time = time.time()
+        async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as session:
+            
+            async def load_batch(batch):
+                nonlocal loaded_count, rejected_count, unsent_count
+                if self.drain.draining:
+                    unsent_count += len(batch)
+                    return  # Not sent; the resumed load picks it up
+                result = await self.drain.guard(self.send_batch(session, batch))
+                if result is None:
+                    unsent_count += len(batch)
+                    return  # Cut off by the drain; idempotency keys make the resend safe
+                loaded, rejected = result
+                self.record_bulk_progress(loaded)
+                loaded_count += len(loaded)
+                rejected_count += rejected
+            
+            async def load_worker(batches):
+                for batch in batches:
+                    await load_batch(batch)
+            
+            # The first batch settles whether /tools/bulk exists before fanning out
+            batches = pending_batches()
+            first_batch = next(batches, None)
+            if first_batch is not None:
+                await load_batch(first_batch)
+            await asyncio.gather(*[load_worker(batches) for _ in range(BULK_LOAD_CONCURRENCY)])
+        
+        elapsed_time = time.time() - start_time
+        skipped = rows_total - pending_count
+        
+        summary = {
+            "api_base": self.api_base,
+            "mode": {True: "bulk", False: "single"}.get(self.bulk_endpoint_supported, "none"),
+            "rows_total": rows_total,
+            "rows_loaded": loaded_count,
+            "rows_skipped": skipped,
+            "rows_rejected": rejected_count,
+            "rows_failed": pending_count - loaded_count - rejected_count - unsent_count,
+            "rows_unsent": unsent_count,
+            "batches": batch_count,
+            "elapsed_time_seconds": round(elapsed_time, 3),
+            "rows_per_second": round(loaded_count / elapsed_time, 2) if elapsed_time > 0 else 0
+        }
+        
+        logger.info(
+            f"Bulk load complete: {loaded_count}/{pending_count} rows in {elapsed_time:.1f}s "
+            f"({summary['rows_per_second']} rows/sec, {skipped} already loaded, {rejected_count} rejected, "
+            f"{summary['rows_failed']} failed, {unsent_count} unsent)"
+        )
+        return summary
+    
+    async def load_category_table(self) -> List[Dict]:
+        """Fetch the backend category table, falling back to the seeded categories"""
+        try:
+            timeout = aiohttp.ClientTimeout(total=10)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(f"{self.api_base}/categories") as response:
+                    if response.status == 200:
+                        payload = await response.json()
+                        data = payload.get('data', {})
+                        rows = data.get('categories', []) if isinstance(data, dict) else data
+                        
+                        seeded_keywords = {c['name']: c['keywords'] for c in SEEDED_CATEGORIES}
+                        categories = [
+                            {
+                                'id': row['id'],
+                                'name': row['name'],
+                                'parentId': row.get('parentId') or (row.get('parent') or {}).get('id'),
+                                'keywords': seeded_keywords.get(row['name'], [])
+                            }
+                            for row in rows if row.get('id') is not None and row.get('name')
+                        ]
+                        if categories:
+                            logger.info(f"Loaded {len(categories)} categories from {self.api_base}")
+                            return categories
+        except Exception as e:
+            logger.warning(f"Could not load categories from API, using seeded table: {e}")
+        
+        return SEEDED_CATEGORIES
     
     async def generate_category_mapping(self):
-        """Generate category mapping file"""
-        categories = set()
-        for tool in self.processed_tools:
-            if tool.get('category'):
-                categories.add(tool['category'])
+        """Generate category mapping file with match confidence per raw category"""
+        if self.category_resolver is None:
+            self.category_resolver = CategoryResolver(await self.load_category_table())
+        
+        tool_counts = self.stats.top('categories', CATEGORY_TOP_K_CAPACITY)
+        
+        resolved_mapping = {}
+        for raw_category, count in tool_counts.items():
+            match = self.category_resolver.resolve(raw_category)
+            resolved_mapping[raw_category] = {
+                "id": match.category_id,
+                "name": match.category_name,
+                "confidence": match.confidence,
+                "method": match.method,
+                "tool_count": count
+            }
         
         category_mapping = {
-            "categories_found": list(categories),
-            "recommended_mapping": {
-                "Hand Tools": {"id": 1, "name": "Hand Tools"},
-                "Power Tools": {"id": 2, "name": "Power Tools"}, 
-                "Garden Tools": {"id": 3, "name": "Garden Tools"},
-                "Kitchen Tools": {"id": 4, "name": "Kitchen Tools"},
-                "Default": {"id": 1, "name": "Hand Tools"}
-            }
+            "categories_found": list(tool_counts),
+            "category_table": [
+                {"id": c['id'], "name": c['name'], "parentId": c.get('parentId')}
+                for c in self.category_resolver.categories
+            ],
+            "resolved_mapping": resolved_mapping,
+            "unmatched_categories": [
+                raw for raw, info in resolved_mapping.items() if info['method'] == 'default'
+            ],
+            "default": {"id": self.category_resolver.default['id'], "name": self.category_resolver.default['name']}
         }
         
         mapping_file = IMPORT_READY_DIR / "category_mapping.json"
@@ -511,32 +1718,469 @@ INSERT INTO "Tool" (
         
         logger.info(f"Category mapping generated: {mapping_file}")
     
-    async def prepare_image_imports(self):
-        """Prepare optimized images for import"""
+    @contextmanager
+    def search_index_writer(self) -> Iterator[Callable[[Dict], None]]:
+        """
+        Build a ready-to-ship SQLite FTS5 index of the import-ready tools
+        
+        tools_search.db holds a tools table (display fields and category),
+        a tools_fts full-text table over name, brand, model, description and
+        specifications with prefix indexes, and a category_facets table.
+        Rows are inserted in batches as tools are passed to the yielded function.
+        """
+        tmp_path = SEARCH_INDEX_PATH.with_name(SEARCH_INDEX_PATH.name + '.tmp')
+        tmp_path.unlink(missing_ok=True)
+        
+        category_names = {c['id']: c['name'] for c in self.category_resolver.categories} if self.category_resolver else {}
+        
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(f'''
+                PRAGMA journal_mode = OFF;
+                PRAGMA synchronous = OFF;
+                
+                CREATE TABLE tools (
+                    rowid INTEGER PRIMARY KEY,
+                    source_url TEXT UNIQUE,
+                    name TEXT,
+                    brand TEXT,
+                    model TEXT,
+                    category_id TEXT,
+                    category_name TEXT,
+                    image_url TEXT,
+                    duplicate_group_id TEXT
+                );
+                
+                CREATE VIRTUAL TABLE tools_fts USING fts5(
+                    name, brand, model, description, specifications,
+                    tokenize = '{SEARCH_INDEX_TOKENIZER}',
+                    prefix = '{SEARCH_INDEX_PREFIXES}'
+                );
+                
+                CREATE TABLE category_facets (
+                    category_id TEXT PRIMARY KEY,
+                    category_name TEXT,
+                    tool_count INTEGER
+                );
+                
+                CREATE TABLE index_metadata (key TEXT PRIMARY KEY, value TEXT);
+            ''')
+            
+            rows = []
+            fts_rows = []
+            total_rows = 0
+            
+            def flush():
+                conn.executemany('INSERT INTO tools VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                conn.executemany(
+                    'INSERT INTO tools_fts (rowid, name, brand, model, description, specifications) VALUES (?, ?, ?, ?, ?, ?)',
+                    fts_rows
+                )
+                rows.clear()
+                fts_rows.clear()
+            
+            def add(tool: Dict):
+                nonlocal total_rows
+                total_rows += 1
+                specifications = tool.get('specifications') or {}
+                spec_text = ' '.join(f"{key} {value}" for key, value in specifications.items())
+                category_id = tool.get('categoryId')
+                
+                rows.append((
+                    total_rows, tool.get('sourceUrl') or None, tool.get('name', ''), tool.get('brand', ''),
+                    tool.get('model', ''), str(category_id), category_names.get(category_id, ''),
+                    tool.get('imageUrl', ''), tool.get('duplicateGroupId')
+                ))
+                fts_rows.append((
+                    total_rows, tool.get('name', ''), tool.get('brand', ''), tool.get('model', ''),
+                    tool.get('description', ''), spec_text
+                ))
+                if len(rows) >= SEARCH_INDEX_BATCH_SIZE:
+                    flush()
+            
+            yield add
+            
+            flush()
+            conn.execute('''
+                INSERT INTO category_facets
+                SELECT category_id, category_name, COUNT(*) FROM tools GROUP BY category_id, category_name
+            ''')
+            conn.execute('CREATE INDEX idx_tools_category ON tools (category_id)')
+            conn.executemany('INSERT INTO index_metadata VALUES (?, ?)', [
+                ('generated_at', datetime.now().isoformat()),
+                ('total_tools', str(total_rows)),
+                ('import_format_version', IMPORT_FORMAT_VERSION)
+            ])
+            
+            conn.execute("INSERT INTO tools_fts (tools_fts) VALUES ('optimize')")
+            conn.commit()
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        
+        os.replace(tmp_path, SEARCH_INDEX_PATH)
+        
+        self.search_index_summary = {
+            "path": str(SEARCH_INDEX_PATH),
+            "tools_indexed": total_rows,
+            "size_bytes": SEARCH_INDEX_PATH.stat().st_size
+        }
+        logger.info(f"Search index generated: {SEARCH_INDEX_PATH} ({total_rows} tools)")
+    
+    async def benchmark_search_index(self) -> Dict:
+        """
+        Compare FTS5 lookups against the LIKE scan the index replaces
+        
+        Queries are drawn from the indexed tools themselves: whole words and
+        3-letter prefixes of the names and brands of randomly chosen tools.
+        """
+        rng = random.Random(42)
+        conn = sqlite3.connect(f"file:{SEARCH_INDEX_PATH}?mode=ro", uri=True)
+        try:
+            total_rows = conn.execute('SELECT COUNT(*) FROM tools').fetchone()[0]
+            queries = []
+            # Tools with no word of 3+ letters give no query, so allow a few misses
+            for _ in range(SEARCH_BENCHMARK_QUERIES * 4 if total_rows else 0):
+                name, brand = conn.execute('SELECT name, brand FROM tools WHERE rowid = ?',
+                                           (rng.randint(1, total_rows),)).fetchone()
+                words = re.findall(r'\w{3,}', f"{name} {brand}".lower())
+                if words:
+                    word = rng.choice(words)
+                    queries.append(word[:3] if rng.random() < 0.5 else word)
+                if len(queries) >= SEARCH_BENCHMARK_QUERIES:
+                    break
+            if not queries:
+                return {}
+            
+            def run(query_fn) -> Tuple[float, int]:
+                latencies = []
+                hits = 0
+                for query in queries:
+                    started = time.perf_counter()
+                    hits += len(query_fn(query))
+                    latencies.append(time.perf_counter() - started)
+                latencies.sort()
+                return latencies, hits
+            
+            fts_latencies, fts_hits = run(lambda q: search_tools(conn, q))
+            
+            scan_sql = '''
+                SELECT t.source_url, t.name, t.category_name
+                FROM tools t JOIN tools_fts f ON f.rowid = t.rowid
+                WHERE f.name LIKE ? OR f.brand LIKE ? OR f.model LIKE ?
+                   OR f.description LIKE ? OR f.specifications LIKE ?
+                ORDER BY t.name
+                LIMIT 20
+            '''
+            scan_latencies, scan_hits = run(
+                lambda q: conn.execute(scan_sql, [f"%{q}%"] * 5).fetchall()
+            )
+        finally:
+            conn.close()
+        
+        def describe(latencies: List[float], hits: int) -> Dict:
+            total = sum(latencies)
+            return {
+                "queries_per_second": round(len(latencies) / total, 1) if total > 0 else 0,
+                "median_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+                "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+                "total_hits": hits
+            }
+        
+        benchmark = {
+            "queries": len(queries),
+            "fts5": describe(fts_latencies, fts_hits),
+            "like_scan": describe(scan_latencies, scan_hits)
+        }
+        logger.info(
+            f"Search benchmark: FTS5 median {benchmark['fts5']['median_ms']}ms vs "
+            f"LIKE scan median {benchmark['like_scan']['median_ms']}ms over {len(queries)} queries"
+        )
+        return {"benchmark": benchmark}
+    
+    @staticmethod
+    def catalog_buckets(scope: CatalogScope, key: str = '') -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Split a scope's name-sorted records into (key, records) shards of at most a page
+        
+        A scope that fits one page is a single shard keyed ''; otherwise
+        records are grouped by name prefix, lengthening the prefix only for
+        groups still over a page. Groups the longest prefix cannot split are
+        paged (catalog_pages). Which shard a tool lands in depends on its
+        own name, so adding or renaming one tool leaves other shards alone.
+        """
+        if scope.count(key) <= CATALOG_PAGE_SIZE:
+            yield key, list(scope.records(key))
+            return
+        if len(key) >= CATALOG_MAX_KEY_LENGTH:
+            yield from RosewoodQA.catalog_pages(scope.records(key))
+            return
+        
+        for prefix in scope.prefixes(key):
+            if prefix == key:
+                yield from RosewoodQA.catalog_pages(scope.records(key, exact=True), key)  # Names no longer than the prefix itself
+            else:
+                yield from RosewoodQA.catalog_buckets(scope, prefix)
+    
+    @staticmethod
+    def catalog_pages(records: Iterable[Dict], key: Optional[str] = None) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Page name-sorted records sharing one prefix, at most CATALOG_PAGE_SIZE each
+        
+        Each page is keyed on its first record's lower-cased name and
+        sourceUrl, tab-separated, so keys stay in name order. Pages end at
+        records whose sourceUrl hash marks a break (or when full), so adding
+        or removing a tool moves the page boundaries around it only up to
+        the next break. A group that fits one page keeps the given key.
+        """
+        records = iter(records)
+        if key is not None:
+            head = list(islice(records, CATALOG_PAGE_SIZE + 1))
+            if len(head) <= CATALOG_PAGE_SIZE:
+                yield key, head
+                return
+            records = chain(head, records)
+        
+        page = []
+        for record in records:
+            if len(page) >= CATALOG_PAGE_SIZE or (
+                len(page) >= CATALOG_MIN_PAGE_FILL
+                and zlib.crc32(record.get('sourceUrl', '').encode('utf-8')) % CATALOG_PAGE_BREAK_MODULUS == 0
+            ):
+                yield f"{page[0].get('name', '').lower()}\t{page[0].get('sourceUrl', '')}", page
+                page = []
+            page.append(record)
+        if page:
+            yield f"{page[0].get('name', '').lower()}\t{page[0].get('sourceUrl', '')}", page
+    
+    def write_catalog_shard(self, scope: str, key: str, payload: Dict, summary: Dict) -> str:
+        """Write one content-addressed shard unless an identical one exists; returns its filename"""
+        content = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:CATALOG_HASH_LENGTH]
+        slug = ''.join(c if c.isascii() and c.isalnum() else f"_{ord(c):x}" for c in key[:CATALOG_MAX_KEY_LENGTH])
+        if len(key) > CATALOG_MAX_KEY_LENGTH:
+            slug += '-p' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]  # Paged: name prefix plus page key hash
+        filename = f"{scope}-k{slug}.{digest}.json"
+        
+        if (CATALOG_BUNDLE_DIR / filename).exists():
+            summary['shards_reused'] += 1
+        else:
+            with PrecompressedWriter(CATALOG_BUNDLE_DIR / filename) as out:
+                out.write(content)
+            summary['shards_written'] += 1
+        
+        return filename
+    
+    @contextmanager
+    def catalog_bundle_writer(self) -> Iterator[Callable[[Dict], None]]:
+        """
+        Build static, sharded catalog JSON for the storefront
+        
+        Produces name-prefix shards for the whole catalog and for each
+        category, named by content hash so they can be cached forever, plus a
+        small index.json listing each scope's shards in name order with their
+        keys and sizes. No shard holds more than page_size records. Shards
+        whose content did not change keep their filename and are not
+        rewritten.
+        
+        Browse records are spooled to a temporary SQLite table as tools
+        arrive and sharded from there once every tool has been seen.
+        """
+        CATALOG_BUNDLE_DIR.mkdir(parents=True, exist_ok=True)
+        spool_path = CATALOG_BUNDLE_DIR / "browse.db.tmp"
+        spool_path.unlink(missing_ok=True)
+        
+        conn = sqlite3.connect(spool_path)
+        try:
+            conn.executescript('''
+                PRAGMA journal_mode = OFF;
+                PRAGMA synchronous = OFF;
+                
+                CREATE TABLE browse (name_key TEXT, source_url TEXT, category TEXT, record TEXT);
+            ''')
+            
+            def add(tool: Dict):
+                record = {field: tool[field] for field in CATALOG_BROWSE_FIELDS if tool.get(field) is not None}
+                conn.execute('INSERT INTO browse VALUES (?, ?, ?, ?)', (
+                    record.get('name', '').lower(), record.get('sourceUrl', ''),
+                    json.dumps(record.get('categoryId')), json.dumps(record, separators=(',', ':'))
+                ))
+            
+            yield add
+            
+            conn.execute('CREATE INDEX idx_browse_name ON browse (name_key, source_url)')
+            conn.execute('CREATE INDEX idx_browse_category ON browse (category, name_key, source_url)')
+            self.catalog_bundle_summary = self.write_catalog_bundles(conn)
+        finally:
+            conn.close()
+            spool_path.unlink(missing_ok=True)
+    
+    def write_catalog_bundles(self, conn: sqlite3.Connection) -> Dict:
+        """Write every scope's shards and index.json from the browse spool"""
+        index_path = CATALOG_BUNDLE_DIR / "index.json"
+        
+        previous_files = set()
+        if index_path.exists():
+            try:
+                with open(index_path, 'r') as f:
+                    for scope_info in json.load(f).get('scopes', {}).values():
+                        previous_files.update(scope_info.get('pages', []))
+            except Exception as e:
+                logger.warning(f"Could not read previous catalog index: {e}")
+        
+        scopes = {'all': (CatalogScope(conn), None)}
+        for (category,) in conn.execute('SELECT category FROM browse GROUP BY category ORDER BY MIN(name_key), category'):
+            scopes[f"category-{json.loads(category)}"] = (CatalogScope(conn, category), json.loads(category))
+        
+        category_names = {c['id']: c['name'] for c in self.category_resolver.categories} if self.category_resolver else {}
+        summary = {'shards_written': 0, 'shards_reused': 0, 'shards_removed': 0}
+        index = {
+            "generated_at": datetime.now().isoformat(),
+            "page_size": CATALOG_PAGE_SIZE,
+            "total_tools": scopes['all'][0].count(),
+            "scopes": {}
+        }
+        
+        for scope, (records, category_id) in scopes.items():
+            pages = []
+            page_keys = []
+            page_sizes = []
+            for key, bucket in self.catalog_buckets(records):
+                payload = {"scope": scope, "key": key, "tools": bucket}
+                pages.append(self.write_catalog_shard(scope, key, payload, summary))
+                page_keys.append(key)
+                page_sizes.append(len(bucket))
+            
+            scope_info = {
+                "total_tools": sum(page_sizes),
+                "total_pages": len(pages),
+                "pages": pages,
+                "page_keys": page_keys,
+                "page_sizes": page_sizes
+            }
+            if scope != 'all':
+                scope_info["category_id"] = category_id
+                scope_info["category_name"] = category_names.get(category_id, '')
+            index["scopes"][scope] = scope_info
+        
+        with PrecompressedWriter(index_path) as out:
+            out.write(json.dumps(index, indent=2))
+        
+        # Keep the previous generation for clients holding an older index
+        current_files = {name for info in index["scopes"].values() for name in info["pages"]}
+        keep = current_files | previous_files
+        for shard in CATALOG_BUNDLE_DIR.glob("*-*.*.json"):
+            if shard.name not in keep:
+                for path in (shard, shard.with_name(shard.name + '.gz'), shard.with_name(shard.name + '.zst')):
+                    path.unlink(missing_ok=True)
+                summary['shards_removed'] += 1
+        
+        summary['scopes'] = len(index["scopes"])
+        summary['shards_total'] = len(current_files)
+        logger.info(
+            f"Catalog bundles generated in {CATALOG_BUNDLE_DIR}: {summary['shards_total']} shards "
+            f"({summary['shards_written']} written, {summary['shards_reused']} unchanged, "
+            f"{summary['shards_removed']} removed)"
+        )
+        return summary
+    
+    def export_image(self, source: Path, target: Path, same_filesystem: bool) -> str:
+        """
+        Export one image, returning how it was done
+        
+        Unchanged targets (same inode, or same size and mtime) are skipped.
+        On the same filesystem a reflink or hardlink avoids duplicating data;
+        otherwise, or when linking fails, the file is copied.
+        """
+        source_stat = source.stat()
+        if target.exists():
+            target_stat = target.stat()
+            if (target_stat.st_ino == source_stat.st_ino and target_stat.st_dev == source_stat.st_dev) or (
+                target_stat.st_size == source_stat.st_size
+                and target_stat.st_mtime_ns == source_stat.st_mtime_ns
+            ):
+                return 'unchanged'
+        
+        tmp_path = target.with_name(target.name + '.tmp')
+        tmp_path.unlink(missing_ok=True)
+        
+        if same_filesystem:
+            for mode in IMAGE_EXPORT_LINK_MODES:
+                try:
+                    if mode == 'reflink':
+                        reflink_file(source, tmp_path)
+                    else:
+                        os.link(source, tmp_path)
+                    os.replace(tmp_path, target)
+                    return mode
+                except OSError as e:
+                    tmp_path.unlink(missing_ok=True)
+                    if e.errno not in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY,
+                                       errno.EINVAL, errno.EMLINK, errno.ENOSYS):
+                        raise
+        
+        shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, target)
+        return 'copied'
+    
+    @contextmanager
+    def image_export_writer(self) -> Iterator[Callable[[Dict], None]]:
+        """
+        Incrementally export the images referenced by the tools passed in
+        
+        Only new or changed images are written; images no longer referenced
+        by any valid tool are removed from the export directory once every
+        tool has been seen.
+        """
         import_images_dir = IMPORT_READY_DIR / "tool_images"
         import_images_dir.mkdir(exist_ok=True)
         
-        # Copy all optimized images
-        if IMAGES_DIR.exists():
-            import os
-            import shutil
-            
-            for image_file in IMAGES_DIR.glob("*.jpg"):
-                dest_file = import_images_dir / image_file.name
-                shutil.copy2(image_file, dest_file)
+        referenced = set()
+        summary = {'reflink': 0, 'hardlink': 0, 'copied': 0, 'unchanged': 0, 'missing': 0, 'removed': 0}
+        
+        same_filesystem = IMAGES_DIR.exists() and IMAGES_DIR.stat().st_dev == import_images_dir.stat().st_dev
         
-        logger.info(f"Images prepared for import: {import_images_dir}")
+        def add(tool: Dict):
+            for img_info in tool.get('processed_images', []):
+                filename = img_info.get('filename')
+                if not filename or filename in referenced:
+                    continue
+                referenced.add(filename)
+                
+                source = IMAGES_DIR / filename
+                if not source.exists():
+                    summary['missing'] += 1
+                    continue
+                
+                try:
+                    summary[self.export_image(source, import_images_dir / filename, same_filesystem)] += 1
+                except OSError as e:
+                    logger.error(f"Failed to export image {filename}: {e}")
+                    summary['missing'] += 1
+        
+        yield add
+        
+        # Drop images no valid tool references any more
+        for stale_file in import_images_dir.glob("*.jpg"):
+            if stale_file.name not in referenced:
+                stale_file.unlink()
+                summary['removed'] += 1
+        
+        logger.info(f"Images prepared for import: {import_images_dir} ({summary})")
+        self.image_export_summary = summary
     
     async def generate_qa_report(self):
         """Generate comprehensive QA report"""
         
         # Calculate summary statistics
-        total_tools = len(self.validation_results)
-        valid_tools = sum(1 for r in self.validation_results if r.is_valid)
+        total_tools = self.stats.counter('tools_validated')
+        valid_tools = self.stats.counter('valid_tools')
         invalid_tools = total_tools - valid_tools
         
-        avg_completeness = sum(r.completeness_score for r in self.validation_results) / total_tools if total_tools > 0 else 0
-        avg_quality = sum(r.quality_score for r in self.validation_results) / total_tools if total_tools > 0 else 0
+        completeness = self.stats.histogram('completeness_score')
+        quality = self.stats.histogram('quality_score')
+        avg_completeness = completeness.mean
+        avg_quality = quality.mean
         
         # Test API compatibility
         api_tests = await self.test_alpha1_api_compatibility()
@@ -554,16 +2198,29 @@ INSERT INTO "Tool" (
                 },
                 "api_compatibility": api_tests,
                 "data_quality_breakdown": {
-                    "high_quality": sum(1 for r in self.validation_results if r.quality_score >= 80),
-                    "medium_quality": sum(1 for r in self.validation_results if 60 <= r.quality_score < 80),
-                    "low_quality": sum(1 for r in self.validation_results if r.quality_score < 60)
+                    "high_quality": quality.count_at_least(80),
+                    "medium_quality": quality.count_at_least(60) - quality.count_at_least(80),
+                    "low_quality": quality.count_below(60)
+                },
+                "score_histograms": {
+                    "completeness": completeness.to_dict(),
+                    "quality": quality.to_dict()
                 },
+                "invalid_tools_sample": self.stats.sampled('invalid_tools'),
                 "common_issues": self.analyze_common_issues(),
+                "near_duplicates": self.duplicate_summary,
                 "import_readiness": {
                     "tools_ready_for_import": valid_tools,
                     "sql_script_generated": True,
                     "json_import_generated": True,
+                    "ndjson_import_generated": True,
+                    "zstd_siblings_generated": zstandard is not None,
+                    "delta_import": self.delta_summary,
+                    "bulk_load": self.bulk_load_summary,
+                    "search_index": self.search_index_summary,
+                    "catalog_bundles": self.catalog_bundle_summary,
                     "images_optimized": True,
+                    "image_export": self.image_export_summary,
                     "category_mapping_generated": True
                 },
                 "recommendations": self.generate_recommendations()
@@ -582,34 +2239,25 @@ INSERT INTO "Tool" (
     
     def analyze_common_issues(self) -> Dict:
         """Analyze common validation issues"""
-        all_errors = []
-        all_warnings = []
-        
-        for result in self.validation_results:
-            all_errors.extend(result.errors)
-            all_warnings.extend(result.warnings)
-        
-        from collections import Counter
-        
         return {
-            "most_common_errors": dict(Counter(all_errors).most_common(5)),
-            "most_common_warnings": dict(Counter(all_warnings).most_common(5))
+            "most_common_errors": self.stats.top('errors', 5),
+            "most_common_warnings": self.stats.top('warnings', 5)
         }
     
     def generate_recommendations(self) -> List[str]:
         """Generate improvement recommendations"""
         recommendations = []
         
-        if self.validation_results:
-            low_quality_count = sum(1 for r in self.validation_results if r.quality_score < 60)
+        if self.stats.counter('tools_validated'):
+            low_quality_count = self.stats.histogram('quality_score').count_below(60)
             if low_quality_count > 0:
                 recommendations.append(f"Consider manual review of {low_quality_count} low-quality tool records")
             
-            missing_images = sum(1 for tool in self.processed_tools if not tool.get('processed_images'))
+            missing_images = self.stats.counter('missing_images')
             if missing_images > 0:
                 recommendations.append(f"Add images for {missing_images} tools without visual content")
             
-            missing_descriptions = sum(1 for tool in self.processed_tools if not tool.get('description'))
+            missing_descriptions = self.stats.counter('missing_descriptions')
             if missing_descriptions > 0:
                 recommendations.append(f"Enhance descriptions for {missing_descriptions} tools")
         
@@ -623,16 +2271,52 @@ INSERT INTO "Tool" (
     
     async def cleanup(self):
         """Clean up resources"""
-        if self.progress_db:
-            self.progress_db.close()
+        if self.progress_store:
+            self.progress_store.close()
+        
+        await self.metrics.stop()
+        
+        self.tracer.close()
+        if self.tracer.enabled:
+            logger.info(f"Span trace written to {self.tracer.path}")
         
         logger.info("ROSEWOOD QA cleanup completed")
 
-async def main():
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="ROSEWOOD QA validation and import preparation")
+    parser.add_argument('--mark-delta-applied', action='store_true',
+                        help="Record that the last generated delta has been applied, making it the next delta's base, and exit")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="Push import-ready tools to the alpha-1 API after generating import files")
+    parser.add_argument('--api-base', default=ALPHA_1_API_BASE,
+                        help="alpha-1 API base URL (point at alpha1-api-stub.py for local testing)")
+    parser.add_argument('--api-token', default=None,
+                        help=f"Bearer token for the API (defaults to ${ALPHA_1_API_TOKEN_ENV})")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve Prometheus metrics on this port at /metrics (off by default)")
+    parser.add_argument('--trace', nargs='?', const=default_trace_path('rosewood'), type=Path, default=None,
+                        help="Write per-tool spans to a Chrome trace file (default under ~/.local/share/ballarat-scraping/traces)")
+    parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES, default=None,
+                        help="Profile the run (sampled stacks by default, or cprofile) and monitor event-loop lag; results go next to the stage report")
+    return parser.parse_args()
+
+async def main(args):
     """Main execution function"""
-    qa_processor = RosewoodQA()
+    if args.mark_delta_applied:
+        # A refresh script must not assume the delta base advanced when it did not
+        raise SystemExit(0 if RosewoodQA.mark_delta_applied() else 1)
+    
+    qa_processor = RosewoodQA(api_base=args.api_base, trace_path=args.trace)
+    profiler = StageProfiler('rosewood', args.profile, QA_RESULTS_DIR)
+    outcome = 'completed'
     
     try:
+        profiler.start()
+        qa_processor.drain.install()
+        if args.metrics_port:
+            await qa_processor.metrics.start(args.metrics_port)
+        
         # Wait for IRONWOOD to complete
         if not await qa_processor.wait_for_ironwood_completion():
             logger.error("IRONWOOD processing not completed - exiting")
@@ -640,23 +2324,43 @@ async def main():
         
         # Run comprehensive QA validation
         await qa_processor.validate_all_tools()
+        if qa_processor.drain.draining:
+            return
         
         # Generate import files
         await qa_processor.generate_import_files()
         
+        # Push tools to the alpha-1 API
+        if args.bulk_load:
+            qa_processor.bulk_load_summary = await qa_processor.bulk_load_tools(
+                qa_processor.read_ndjson_import(), args.api_token
+            )
+        
         # Generate final QA report
         await qa_processor.generate_qa_report()
         
+        # A load cut short by a drain resumes from its progress log next run
+        if qa_processor.drain.draining:
+            qa_processor.drain.save_checkpoint({"run_started_at": qa_processor.run_started_at})
+            return
+        qa_processor.drain.clear_checkpoint()
+        
         logger.info("ROSEWOOD QA process completed successfully")
         
     except KeyboardInterrupt:
+        outcome = 'interrupted'
         logger.info("QA processing interrupted by user")
     except Exception as e:
+        outcome = 'failed'
         logger.error(f"Unexpected error: {e}")
     finally:
+        qa_processor.drain.uninstall()
+        qa_processor.ledger.record(qa_processor.progress_store, qa_processor.metrics, qa_processor.stats,
+                                   qa_processor.drain, outcome)
         await qa_processor.cleanup()
+        profiler.stop()
 
 if __name__ == "__main__":
     print("ROSEWOOD QA - Ballarat Tool Library Final Validation and Import Prep")
     print("=" * 75)
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Run ledger: per-run performance history and regression checks
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+Each stage run appends one row to the run_ledger table in its progress
+store as it exits, whether it completed, drained or failed. A row holds
+items handled per second, p50/p95 latency from the stage's StageMetrics
+histograms, error rate, bytes transferred and peak memory. The table ships
+through progress_changesets/ like the progress tables, so the merged
+scraping_progress.db holds the history of every stage on every node.
+
+Peak memory is the peak resident memory of the whole process. When several
+stages share one process (single-node-pipeline.py) it cannot be told apart
+per stage, so their rows leave it empty and the pipeline logs the process
+peak once instead.
+
+What a stage's items, errors and latency are:
+
+    walnut    listing pages, failed fetches, page fetch time
+    ironwood  tools, failed tools, detail page fetch time
+    rosewood  tools validated, invalid tools, validation time
+
+A completed run is compared with the median of the BASELINE_RUNS completed
+runs of the same stage on the same node before it. A metric is flagged when
+it is worse by more than its relative tolerance and by more than its
+smallest meaningful change (REGRESSION_CHECKS). Stages log flagged metrics
+as they exit, and `compare` lists them for the latest runs (exit 1 if any):
+
+    python3 run_ledger.py history --database /rust/containers/ballarat-scraping/scraping_progress.db
+    python3 run_ledger.py compare --database /rust/containers/ballarat-scraping/scraping_progress.db --stage ironwood
+"""
+
+import argparse
+import logging
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not on Windows; peak memory is then left empty
+
+from stage_metrics import LATENCY_BUCKETS
+
+# Configuration
+SCRIPT_DIR = Path(__file__).resolve().parent
+SHARED_DATABASE_PATH = Path("/rust/containers/ballarat-scraping/scraping_progress.db")
+BASELINE_RUNS = 5  # Completed runs in the rolling baseline
+MIN_BASELINE_RUNS = 3  # Fewer earlier runs than this and there is nothing to compare with
+
+# stage: (item counter, results counted as errors, results not counted as items, latency histogram)
+STAGE_MEASURES = {
+    'walnut': ('pages_total', ('failed',), (), 'fetch_seconds'),
+    'ironwood': ('tools_total', ('failed',), (), 'fetch_seconds'),
+    'rosewood': ('tools_total', ('invalid',), ('resumed',), 'validate_seconds'),
+}
+
+# column: (worse when, relative tolerance, smallest change that counts)
+REGRESSION_CHECKS = {
+    'items_per_second': ('lower', 0.25, 0.0),
+    'latency_p50_seconds': ('higher', 0.25, 0.05),
+    'latency_p95_seconds': ('higher', 0.25, 0.1),
+    'error_rate': ('higher', 0.5, 0.02),
+    'bytes_in_per_item': ('higher', 0.25, 1024),
+    'peak_memory_mb': ('higher', 0.25, 20),
+}
+
+LEDGER_COLUMNS = ('run_id', 'stage', 'node', 'started_at', 'finished_at', 'outcome', 'git_commit',
+                  'elapsed_seconds', 'items', 'errors', 'items_per_second', 'error_rate',
+                  'latency_p50_seconds', 'latency_p95_seconds', 'bytes_in', 'bytes_out',
+                  'bytes_in_per_item', 'peak_memory_mb')
+
+RECORD_RUN_SQL = f'''
+    INSERT INTO run_ledger ({', '.join(LEDGER_COLUMNS)})
+    VALUES ({', '.join('?' for _ in LEDGER_COLUMNS)})
+'''
+
+LEDGER_RUNS_SQL = f'''
+    SELECT {', '.join(LEDGER_COLUMNS)} FROM run_ledger
+    WHERE (? IS NULL OR stage = ?) AND (? IS NULL OR node = ?)
+    ORDER BY stage, node, started_at
+'''
+
+logger = logging.getLogger(__name__)
+
+def git_commit() -> Optional[str]:
+    """Commit the stage scripts were run from, if they are a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process so far"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+
+def histogram_quantile(states: List[list], q: float) -> Optional[float]:
+    """
+    Quantile of StageMetrics histogram series merged together
+
+    Buckets are cumulative (Prometheus style). The value is interpolated
+    within its bucket, and anything past the last bound reports that bound.
+    """
+    counts = [sum(state[i] for state in states) for i in range(len(LATENCY_BUCKETS))]
+    total = sum(state[-2] for state in states)
+    if not total:
+        return None
+
+    rank = q * total
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in zip(LATENCY_BUCKETS, counts):
+        if count >= rank:
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return LATENCY_BUCKETS[-1]
+
+def regressions(run: Dict[str, Any], baseline: List[Dict[str, Any]]) -> List[str]:
+    """Metrics where run is worse than the median of the baseline runs"""
+    flagged = []
+    for column, (worse_when, tolerance, floor) in REGRESSION_CHECKS.items():
+        values = [earlier[column] for earlier in baseline if earlier[column] is not None]
+        if run[column] is None or len(values) < MIN_BASELINE_RUNS:
+            continue
+
+        expected = statistics.median(values)
+        change = run[column] - expected if worse_when == 'higher' else expected - run[column]
+        if change > tolerance * expected and change > floor:
+            flagged.append(f"{column} {run[column]:.3g} vs baseline {expected:.3g}")
+    return flagged
+
+def load_runs(conn: sqlite3.Connection, stage: Optional[str] = None,
+              node: Optional[str] = None) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+    """Ledger rows grouped by (stage, node), oldest first"""
+    runs = {}
+    for row in conn.execute(LEDGER_RUNS_SQL, (stage, stage, node, node)):
+        run = dict(zip(LEDGER_COLUMNS, row))
+        runs.setdefault((run['stage'], run['node']), []).append(run)
+    return runs
+
+def baseline_for(history: List[Dict[str, Any]], index: int, baseline_runs: int = BASELINE_RUNS) -> List[Dict[str, Any]]:
+    """The completed runs before history[index] that make up its baseline"""
+    return [run for run in history[:index] if run['outcome'] == 'completed'][-baseline_runs:]
+
+class RunLedger:
+    """Times one stage run and appends it to the run ledger"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.shares_process = False  # Set when other stages run in this process
+        self.started_at: Optional[datetime] = None
+        self.started: Optional[float] = None
+
+    def start(self):
+        """The stage has started work (waiting for an upstream signal is not timed)"""
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+
+    def measure(self, metrics, stats) -> Dict[str, Any]:
+        """This run's ledger values from the stage's metrics registry and report statistics"""
+        item_metric, error_results, skipped_results, latency_metric = STAGE_MEASURES[self.stage]
+        items = errors = 0
+        for labels, value in metrics.values[item_metric].items():
+            result = dict(labels).get('result')
+            if result in skipped_results:
+                continue
+            items += int(value)
+            if result in error_results:
+                errors += int(value)
+
+        latencies = list(metrics.histograms.get(latency_metric, {}).values())
+        image_bytes = metrics.values['image_bytes_total']
+        bytes_in = stats.counter('page_bytes_read') + int(image_bytes.get((('direction', 'in'),), 0))
+        elapsed = time.perf_counter() - self.started
+
+        return {
+            "elapsed_seconds": elapsed,
+            "items": items,
+            "errors": errors,
+            "items_per_second": items / elapsed if items and elapsed > 0 else None,
+            "error_rate": errors / items if items else None,
+            "latency_p50_seconds": histogram_quantile(latencies, 0.5),
+            "latency_p95_seconds": histogram_quantile(latencies, 0.95),
+            "bytes_in": bytes_in,
+            "bytes_out": int(image_bytes.get((('direction', 'out'),), 0)),
+            "bytes_in_per_item": bytes_in / items if items else None,
+            "peak_memory_mb": None if self.shares_process else peak_memory_mb()
+        }
+
+    def record(self, progress_store, metrics, stats, drain=None, outcome: str = 'completed') -> Optional[Dict[str, Any]]:
+        """Append this run to the ledger and log any regression against the baseline"""
+        if self.started is None:
+            return None  # Never got past waiting for the stage before
+        if outcome == 'completed' and drain is not None and drain.draining:
+            outcome = 'drained'
+
+        run = {
+            "run_id": f"{self.stage}-{progress_store.node}-{self.started_at.isoformat()}",
+            "stage": self.stage,
+            "node": progress_store.node,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "outcome": outcome,
+            "git_commit": git_commit(),
+            **self.measure(metrics, stats)
+        }
+        try:
+            progress_store.conn.execute(RECORD_RUN_SQL, [run[column] for column in LEDGER_COLUMNS])
+            progress_store.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Run ledger: could not record the {self.stage} run: {e}")
+            return None
+
+        rate = f"{run['items_per_second']:.2f}/s" if run['items_per_second'] is not None else "n/a"
+        logger.info(f"Run ledger: {self.stage} {outcome}, {run['items']} items at {rate}, "
+                    f"{run['errors']} errors, {run['bytes_in'] / 1e6:.1f} MB in")
+
+        if outcome == 'completed':
+            history = load_runs(progress_store.conn, self.stage, progress_store.node)[(self.stage, progress_store.node)]
+            for problem in regressions(run, baseline_for(history, len(history) - 1)):
+                logger.warning(f"Run ledger: {self.stage} slower or noisier than its baseline - {problem}")
+        return run
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.3g}"
+    return str(value)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Per-run performance history and regression checks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('history', "List recorded runs, oldest first"),
+                            ('compare', "Flag runs slower or noisier than their rolling baseline")):
+        command_parser = subparsers.add_parser(name, help=help_text)
+        command_parser.add_argument('--database', type=Path, default=SHARED_DATABASE_PATH,
+                                    help="Merged scraping_progress.db, or one node's local progress store")
+        command_parser.add_argument('--stage', choices=sorted(STAGE_MEASURES), default=None)
+        command_parser.add_argument('--node', default=None, help="Only runs recorded by this node (e.g. pipeline)")
+    subparsers.choices['history'].add_argument('--limit', type=int, default=20, help="Latest runs per stage and node")
+    subparsers.choices['compare'].add_argument('--baseline-runs', type=int, default=BASELINE_RUNS)
+    subparsers.choices['compare'].add_argument('--all', action='store_true',
+                                               help="Check every completed run, not just the latest per stage and node")
+    args = parser.parse_args()
+    if not args.database.exists():
+        parser.error(f"{args.database} does not exist")
+
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'run_ledger'").fetchone():
+        print(f"No run ledger in {args.database}; stages record runs from this version on")
+        raise SystemExit(0)
+    runs = load_runs(conn, args.stage, args.node)
+    conn.close()
+
+    if args.command == 'history':
+        columns = ('started_at', 'outcome', 'git_commit', 'items', 'items_per_second', 'error_rate',
+                   'latency_p50_seconds', 'latency_p95_seconds', 'bytes_in', 'peak_memory_mb')
+        for (stage, node), history in sorted(runs.items()):
+            print(f"\n{stage} on {node}: {len(history)} runs")
+            print('  ' + ' | '.join(columns))
+            for run in history[-args.limit:]:
+                print('  ' + ' | '.join(format_value(run[column]) for column in columns))
+        raise SystemExit(0)
+
+    flagged_runs = 0
+    for (stage, node), history in sorted(runs.items()):
+        completed = [i for i, run in enumerate(history) if run['outcome'] == 'completed']
+        for index in (completed if args.all else completed[-1:]):
+            baseline = baseline_for(history, index, args.baseline_runs)
+            problems = regressions(history[index], baseline)
+            if len(baseline) < MIN_BASELINE_RUNS:
+                verdict = f"no baseline yet ({len(baseline)} earlier completed runs)"
+            else:
+                verdict = 'REGRESSED' if problems else 'ok'
+            print(f"{stage} on {node}, run started {history[index]['started_at']}: {verdict}")
+            for problem in problems:
+                print(f"    {problem}")
+            flagged_runs += bool(problems)
+
+    print(f"{flagged_runs} runs slower or noisier than their baseline")
+    raise SystemExit(1 if flagged_runs else 0)
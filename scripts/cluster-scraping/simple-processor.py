@@ -1,129 +1,391 @@
 #!/usr/bin/env python3
 """
-Simplified Tool Processor - Run on WALNUT
-Processes tool details from discovered tools
+Simplified Tool Processor - Sampling and capacity planning
+Ballarat Tool Library Data Migration - Run before a full IRONWOOD run
+
+Fetches a stratified sample of the discovered tools concurrently, under the
+same rate limit IRONWOOD uses (MAX_CONCURRENT_REQUESTS slots, REQUEST_DELAY
+before each page). Each sampled tool then goes through IRONWOOD's own code:
+streamed page read, parse_tool_details, page archive compression, image
+download, transcode and packed record write. The cost of each phase is measured:
+wall time for network phases, and CPU time for parse, archive and transcode.
+The tool also records page, image and output sizes.
+
+Strata are the category IRONWOOD's scheduler reads from the tool name
+(PRIORITY_CATEGORY_KEYWORDS; WALNUT's listings carry no category), crossed
+with old, middle and new listings by tool ID. Each stratum gets a share of the sample proportional to
+its size, and at least one tool. Per-tool costs are weighted back by stratum
+size to project a full-catalog run for every --concurrency/--delay setting:
+
+    ironwood              IRONWOOD standalone: downloads and transcodes run
+                          inline on the event loop
+    single_node_pipeline  single-node-pipeline.py: downloads and transcodes
+                          run in thread pools
+
+Each projection gives runtime, request rate, inbound bandwidth and the
+bottleneck: the rate limit, the event loop or the CPU. Disk use does not
+depend on the settings, so it is projected once. The sample's own run time
+is compared with the model's prediction for the sample, as a check on the
+model.
+
+Sampled pages and images go to a temporary directory. Only the
+capacity_plan_{timestamp}.json report is written to the shared directory.
+
+Usage:
+    python3 simple-processor.py
+    python3 simple-processor.py --sample-size 80 --concurrency 3 5 8 --delay 1 2
 """
 
+import argparse
 import asyncio
 import aiohttp
 import json
+import os
+import random
 import sqlite3
+import sys
+import tempfile
 import time
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 import logging
-import re
-from html import unescape
+from typing import Any, Dict, List, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from page_archive import compress
+from page_stream import FieldScanner, read_page
+from stage_loader import load_stage
+from tool_records import write_record_file
+
+ironwood = load_stage('ironwood-processor.py')
 
 # Configuration
-BASE_URL = "https://ballarattoollibrary.myturn.com"
 SHARED_DIR = Path("/rust/containers/ballarat-scraping")
 DATABASE_PATH = SHARED_DIR / "scraping_progress.db"
-PROCESSED_DATA_DIR = SHARED_DIR / "processed_data"
-REQUEST_DELAY = 2.0
-MAX_TOOLS_TO_PROCESS = 50  # Process first 50 tools as example
+SAMPLE_SIZE = 50
+POSITION_BANDS = ('older', 'middle', 'newer')  # Listings by tool ID, oldest first
+UNCATEGORISED = 'uncategorised'
+TRANSCODE_THREADS = os.cpu_count() or 2  # As single-node-pipeline.py sizes its pool
 
-# Ensure directories exist
-PROCESSED_DATA_DIR.mkdir(exist_ok=True)
+PHASES = ('fetch', 'parse', 'archive', 'image_download', 'transcode', 'record_write')
+SIZES = ('page_bytes', 'archive_bytes', 'image_bytes_in', 'image_bytes_out', 'record_bytes', 'images')
 
 # Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-async def fetch_tool_details(session, tool_id, tool_url):
-    """Fetch and parse individual tool details"""
+def load_discovered_tools(database_path: Path) -> List[Tuple[str, str, str]]:
+    """Every discovered tool as (tool_id, tool_name, tool_url), oldest listing first"""
+    db = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        rows = db.execute('''
+            SELECT tool_id, tool_name, tool_url
+            FROM discovered_tools
+            ORDER BY CAST(tool_id AS INTEGER), tool_id
+        ''').fetchall()
+    finally:
+        db.close()
+    return rows
+
+def stratify(tools: List[Tuple[str, str, str]]) -> Dict[str, List[Tuple[str, str, str]]]:
+    """Group tools by their name-keyword category crossed with their position band in the listing"""
+    strata = defaultdict(list)
+    for position, (tool_id, tool_name, tool_url) in enumerate(tools):
+        band = POSITION_BANDS[position * len(POSITION_BANDS) // len(tools)]
+        category = ironwood.ToolScheduler.category_of(tool_name) or UNCATEGORISED
+        strata[f"{category} / {band}"].append((tool_id, tool_name, tool_url))
+    return dict(strata)
+
+def allocate(strata: Dict[str, List[Any]], sample_size: int) -> Dict[str, int]:
+    """Proportional allocation (largest remainder), with at least one tool per stratum"""
+    population = sum(len(members) for members in strata.values())
+    largest_first = sorted(strata, key=lambda name: len(strata[name]), reverse=True)
+
+    # With more strata than sample slots, the largest strata get one each
+    allocation = {name: 0 for name in strata}
+    for name in largest_first[:sample_size]:
+        allocation[name] = 1
+
+    spare = sample_size - sum(allocation.values())
+    if spare > 0:
+        quotas = {name: len(strata[name]) * spare / population for name in strata}
+        for name in strata:
+            allocation[name] += int(quotas[name])
+        by_remainder = sorted(strata, key=lambda name: quotas[name] - int(quotas[name]), reverse=True)
+        for name in by_remainder[:sample_size - sum(allocation.values())]:
+            allocation[name] += 1
+
+    return {name: min(count, len(strata[name])) for name, count in allocation.items()}
+
+def stratified_sample(strata: Dict[str, List[Tuple[str, str, str]]], sample_size: int,
+                      seed: int) -> List[Tuple[str, Tuple[str, str, str]]]:
+    """A seeded random sample of each stratum, as (stratum, tool_info) pairs"""
+    rng = random.Random(seed)
+    sample = []
+    for name, count in allocate(strata, sample_size).items():
+        sample.extend((name, tool_info) for tool_info in rng.sample(strata[name], count))
+    return sample
+
+def timed_call(func, *args):
+    """Run func, returning (result, wall seconds, CPU seconds of the calling thread)"""
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
+    result = func(*args)
+    return result, time.perf_counter() - wall_started, time.thread_time() - cpu_started
+
+async def measure_tool(session: aiohttp.ClientSession, stratum: str, tool_info: Tuple[str, str, str],
+                       work_dir: Path) -> Dict[str, Any]:
+    """Run one tool through IRONWOOD's fetch, parse, archive, image and write steps, timing each"""
+    tool_id, tool_name, tool_url = tool_info
+    loop = asyncio.get_running_loop()
+    measurement = {"tool_id": tool_id, "stratum": stratum, "ok": False, "error": None}
+    measurement.update({phase: 0.0 for phase in PHASES})
+    measurement.update({size: 0 for size in SIZES})
+
+    fetch_started = time.perf_counter()
     try:
-        await asyncio.sleep(REQUEST_DELAY)
-        
         async with session.get(tool_url) as response:
             if response.status != 200:
-                return None, f"HTTP {response.status}"
-            
-            html = await response.text()
-            
-            # Extract tool information
-            tool_data = {
-                'id': tool_id,
-                'url': tool_url,
-                'scraped_at': datetime.now().isoformat()
-            }
-            
-            # Extract name
-            name_match = re.search(r'<h1[^>]*>([^<]+)</h1>', html)
-            if name_match:
-                tool_data['name'] = unescape(name_match.group(1).strip())
-            
-            # Extract description
-            desc_match = re.search(r'<div[^>]*class="[^"]*description[^"]*"[^>]*>([^<]+)</div>', html, re.IGNORECASE | re.DOTALL)
-            if desc_match:
-                tool_data['description'] = unescape(desc_match.group(1).strip())
-            
-            # Extract brand
-            brand_match = re.search(r'<strong>Brand:</strong>\s*([^<\n]+)', html, re.IGNORECASE)
-            if brand_match:
-                tool_data['brand'] = unescape(brand_match.group(1).strip())
-            
-            # Extract images
-            image_urls = re.findall(r'<img[^>]*src="([^"]*amazonaws\.com[^"]*)"', html, re.IGNORECASE)
-            tool_data['image_urls'] = list(set(image_urls))
-            
-            return tool_data, None
-            
+                raise RuntimeError(f"HTTP {response.status}")
+            scanner = FieldScanner(ironwood.DETAIL_FIELD_PATTERNS)
+            page = await read_page(response, ironwood.DETAIL_STOP_PATTERN, on_text=scanner.scan)
+        measurement['fetch'] = time.perf_counter() - fetch_started
+        measurement['page_bytes'] = page.bytes_read
+
+        tool_data, _, measurement['parse'] = timed_call(
+            ironwood.IronwoodProcessor.parse_tool_details, page.text, tool_id, tool_url, scanner
+        )
+        (_, archived), _, measurement['archive'] = timed_call(compress, page.text.encode('utf-8'))
+        measurement['archive_bytes'] = len(archived)
+
+        for i, image_url in enumerate(tool_data.get('image_urls', [])):
+            temp_path = work_dir / f"tool_{tool_id}_{i + 1}.tmp"
+            output_path = temp_path.with_suffix('.jpg')
+            (status, bytes_in), download_seconds, _ = await loop.run_in_executor(
+                None, timed_call, ironwood.download_image, image_url, temp_path
+            )
+            measurement['image_download'] += download_seconds
+            if status >= 400:
+                logger.warning(f"HTTP {status} for image {i + 1} of tool {tool_id}")
+                continue
+
+            # Transcodes run in threads so they do not stall the other fetches;
+            # their CPU time is what a full run pays
+            _, _, transcode_cpu = await loop.run_in_executor(
+                None, timed_call, ironwood.optimize_image_file, temp_path, output_path
+            )
+            measurement['transcode'] += transcode_cpu
+            measurement['images'] += 1
+            measurement['image_bytes_in'] += bytes_in
+            measurement['image_bytes_out'] += output_path.stat().st_size
+            temp_path.unlink(missing_ok=True)
+
+        write_started = time.perf_counter()
+        data_file = write_record_file(work_dir, tool_id, tool_data)
+        measurement['record_write'] = time.perf_counter() - write_started
+        measurement['record_bytes'] = data_file.stat().st_size
+
+        measurement['ok'] = True
+        logger.info(f"✓ Sampled {tool_id} ({stratum}): {measurement['images']} images, "
+                    f"{measurement['page_bytes'] / 1024:.0f} KB page")
+
     except Exception as e:
-        return None, str(e)
-
-async def main():
-    """Main processing function"""
-    logger.info("Starting simplified tool processing")
-    
-    # Connect to database
-    db = sqlite3.connect(DATABASE_PATH)
-    cursor = db.cursor()
-    
-    # Get tools to process
-    cursor.execute(f'''
-        SELECT tool_id, tool_name, tool_url 
-        FROM discovered_tools 
-        LIMIT {MAX_TOOLS_TO_PROCESS}
-    ''')
-    tools = cursor.fetchall()
-    
-    logger.info(f"Processing {len(tools)} tools")
-    
-    # Create session
-    async with aiohttp.ClientSession() as session:
-        processed_count = 0
-        
-        for tool_id, tool_name, tool_url in tools:
-            logger.info(f"Processing {tool_id}: {tool_name}")
-            
-            tool_data, error = await fetch_tool_details(session, tool_id, tool_url)
-            
-            if tool_data:
-                # Save processed data
-                output_file = PROCESSED_DATA_DIR / f"tool_{tool_id}.json"
-                with open(output_file, 'w') as f:
-                    json.dump(tool_data, f, indent=2)
-                
-                processed_count += 1
-                logger.info(f"✓ Processed {tool_id}")
-            else:
-                logger.error(f"✗ Failed {tool_id}: {error}")
-    
-    db.close()
-    
-    # Create completion signal
-    signal_data = {
-        "processor": "SIMPLIFIED_PROCESSOR",
-        "completion_time": datetime.now().isoformat(),
-        "tools_processed": processed_count,
-        "status": "sample_processing_complete"
+        measurement['error'] = str(e)
+        if not measurement['fetch']:
+            measurement['fetch'] = time.perf_counter() - fetch_started  # Failed fetches still cost a slot
+        logger.error(f"✗ Failed {tool_id}: {e}")
+
+    return measurement
+
+async def run_sample(sample: List[Tuple[str, Tuple[str, str, str]]], concurrency: int,
+                     delay: float) -> Tuple[List[Dict[str, Any]], float]:
+    """Measure every sampled tool under IRONWOOD's rate limit; returns (measurements, wall seconds)"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def sample_with_limit(session, stratum, tool_info, work_dir):
+        async with semaphore:
+            await asyncio.sleep(delay)  # Rate limiting
+            return await measure_tool(session, stratum, tool_info, work_dir)
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='capacity-sample-') as scratch:
+        timeout = aiohttp.ClientTimeout(total=45)
+        async with aiohttp.ClientSession(headers=ironwood.REQUEST_HEADERS, timeout=timeout) as session:
+            measurements = await asyncio.gather(*(
+                sample_with_limit(session, stratum, tool_info, Path(scratch))
+                for stratum, tool_info in sample
+            ))
+    return list(measurements), time.perf_counter() - started
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+def per_tool_estimates(measurements: List[Dict[str, Any]], strata_sizes: Dict[str, int]) -> Dict[str, float]:
+    """Stratified mean of every phase and size per tool, plus the failure rate"""
+    by_stratum = defaultdict(list)
+    for measurement in measurements:
+        by_stratum[measurement['stratum']].append(measurement)
+
+    # Strata without a sample are left out and the rest re-weighted
+    population = sum(strata_sizes[name] for name in by_stratum)
+    estimates = {}
+    for key in PHASES + SIZES + ('failed',):
+        total = 0.0
+        for name, members in by_stratum.items():
+            values = [float(not m['ok']) if key == 'failed' else m[key] for m in members]
+            total += strata_sizes[name] * sum(values) / len(values)
+        estimates[key] = total / population
+    return estimates
+
+def project_run(per_tool: Dict[str, float], catalog_size: int, concurrency: int, delay: float) -> Dict[str, Any]:
+    """Project a full run at one concurrency/delay setting for IRONWOOD and the single-node pipeline"""
+    # A tool holds its rate-limit slot from the delay until its record is written
+    slot_seconds = delay + sum(per_tool[phase] for phase in PHASES)
+    rate_limit_bound = concurrency / slot_seconds
+
+    # Work that keeps the event loop (or, in thread pools, the CPU) from the other tools
+    standalone_loop = per_tool['parse'] + per_tool['archive'] + per_tool['image_download'] + \
+        per_tool['transcode'] + per_tool['record_write']
+    pipeline_cpu = per_tool['parse'] + per_tool['archive'] + per_tool['record_write'] + \
+        per_tool['transcode'] / TRANSCODE_THREADS
+
+    projections = {"concurrency": concurrency, "delay_seconds": delay}
+    for mode, blocking_seconds, blocking_label in (('ironwood', standalone_loop, 'event loop'),
+                                                   ('single_node_pipeline', pipeline_cpu, 'CPU')):
+        throughput = min(rate_limit_bound, 1 / blocking_seconds if blocking_seconds else rate_limit_bound)
+        runtime = catalog_size / throughput
+        bytes_in = catalog_size * (per_tool['page_bytes'] + per_tool['image_bytes_in'])
+        projections[mode] = {
+            "runtime_seconds": round(runtime, 1),
+            "runtime_hours": round(runtime / 3600, 2),
+            "tools_per_minute": round(throughput * 60, 1),
+            "page_requests_per_second": round(throughput, 3),
+            "image_requests_per_second": round(throughput * per_tool['images'], 3),
+            "bytes_in": int(bytes_in),
+            "mean_inbound_mbit_per_second": round(bytes_in * 8 / runtime / 1e6, 3),
+            "bottleneck": 'rate limit' if throughput == rate_limit_bound else blocking_label
+        }
+    return projections
+
+def summarise_measurements(measurements: List[Dict[str, Any]], strata_sizes: Dict[str, int]) -> Dict[str, Any]:
+    """Per-phase and per-stratum statistics of the sample itself"""
+    ok = [m for m in measurements if m['ok']]
+    phases = {
+        phase: {
+            "mean_seconds": round(sum(m[phase] for m in ok) / len(ok), 4) if ok else 0.0,
+            "p95_seconds": round(percentile([m[phase] for m in ok], 0.95), 4)
+        }
+        for phase in PHASES
     }
-    
-    with open(SHARED_DIR / "processing_completed.signal", 'w') as f:
-        json.dump(signal_data, f, indent=2)
-    
-    logger.info(f"Processing complete! {processed_count} tools processed")
+
+    strata = {}
+    for name, size in sorted(strata_sizes.items(), key=lambda item: item[1], reverse=True):
+        members = [m for m in measurements if m['stratum'] == name]
+        strata[name] = {
+            "population": size,
+            "sampled": len(members),
+            "failed": sum(1 for m in members if not m['ok']),
+            "mean_images": round(sum(m['images'] for m in members) / len(members), 2) if members else None,
+            "mean_page_kb": round(sum(m['page_bytes'] for m in members) / len(members) / 1024, 1) if members else None
+        }
+
+    return {"phases": phases, "strata": strata}
+
+async def main(args):
+    """Sample the catalog, measure it and write the capacity plan"""
+    logger.info("Starting capacity sampling of discovered tools")
+
+    tools = load_discovered_tools(args.database)
+    if not tools:
+        logger.error(f"No discovered tools in {args.database}; run WALNUT first")
+        return
+    catalog_size = args.catalog_size or len(tools)
+
+    strata = stratify(tools)
+    strata_sizes = {name: len(members) for name, members in strata.items()}
+    sample = stratified_sample(strata, min(args.sample_size, len(tools)), args.seed)
+    logger.info(f"Sampling {len(sample)} of {len(tools)} tools across {len(strata)} strata "
+                f"({args.sample_concurrency} concurrent, {args.sample_delay}s delay)")
+
+    measurements, sample_seconds = await run_sample(sample, args.sample_concurrency, args.sample_delay)
+    if not any(m['ok'] for m in measurements):
+        logger.error("Every sampled tool failed; nothing to project from")
+        return
+
+    per_tool = per_tool_estimates(measurements, strata_sizes)
+    predicted = project_run(per_tool, len(sample), args.sample_concurrency, args.sample_delay)['ironwood']
+    disk_bytes = catalog_size * (per_tool['image_bytes_out'] + per_tool['record_bytes'] + per_tool['archive_bytes'])
+
+    report = {
+        "capacity_plan": {
+            "timestamp": datetime.now().isoformat(),
+            "catalog_size": catalog_size,
+            "sample": {
+                "tools": len(sample),
+                "failed": sum(1 for m in measurements if not m['ok']),
+                "strata": len(strata),
+                "seed": args.seed,
+                "concurrency": args.sample_concurrency,
+                "delay_seconds": args.sample_delay,
+                "wall_seconds": round(sample_seconds, 1),
+                "model_predicted_seconds": predicted['runtime_seconds']
+            },
+            "per_tool": {key: round(value, 4) for key, value in per_tool.items()},
+            "projected_failures": round(per_tool['failed'] * catalog_size),
+            "projected_disk_bytes": {
+                "images": int(catalog_size * per_tool['image_bytes_out']),
+                "processed_records": int(catalog_size * per_tool['record_bytes']),
+                "page_archive": int(catalog_size * per_tool['archive_bytes']),
+                "total": int(disk_bytes)
+            },
+            "projections": [
+                project_run(per_tool, catalog_size, concurrency, delay)
+                for concurrency in args.concurrency for delay in args.delay
+            ],
+            "measurements": summarise_measurements(measurements, strata_sizes),
+            "sample_failures": [{"id": m['tool_id'], "error": m['error']} for m in measurements if not m['ok']]
+        }
+    }
+
+    SHARED_DIR.mkdir(parents=True, exist_ok=True)
+    report_file = SHARED_DIR / f"capacity_plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    logger.info(f"Sample took {sample_seconds:.1f}s (model predicted {predicted['runtime_seconds']:.1f}s); "
+                f"per tool: {per_tool['images']:.1f} images, {per_tool['page_bytes'] / 1024:.0f} KB page, "
+                f"{per_tool['failed']:.0%} failed")
+    logger.info(f"Projected disk use for {catalog_size} tools: {disk_bytes / 1e6:.0f} MB")
+    for projection in report['capacity_plan']['projections']:
+        for mode in ('ironwood', 'single_node_pipeline'):
+            plan = projection[mode]
+            logger.info(f"  {mode:<21} concurrency {projection['concurrency']}, delay {projection['delay_seconds']}s: "
+                        f"{plan['runtime_hours']:.2f} h, {plan['mean_inbound_mbit_per_second']:.2f} Mbit/s "
+                        f"(bottleneck: {plan['bottleneck']})")
+    logger.info(f"Capacity plan saved to {report_file}")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Sample discovered tools and project a full processing run")
+    parser.add_argument('--database', type=Path, default=DATABASE_PATH,
+                        help="Progress database to sample discovered tools from")
+    parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE, help="Tools to fetch and measure")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the stratified sample")
+    parser.add_argument('--sample-concurrency', type=int, default=ironwood.MAX_CONCURRENT_REQUESTS,
+                        help="Concurrent requests while sampling (default: IRONWOOD's)")
+    parser.add_argument('--sample-delay', type=float, default=ironwood.REQUEST_DELAY,
+                        help="Seconds before each sampled page (default: IRONWOOD's)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[ironwood.MAX_CONCURRENT_REQUESTS],
+                        help="Concurrency settings to project")
+    parser.add_argument('--delay', type=float, nargs='+', default=[ironwood.REQUEST_DELAY],
+                        help="Request delay settings to project")
+    parser.add_argument('--catalog-size', type=int, default=None,
+                        help="Tools to project for (default: every discovered tool)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
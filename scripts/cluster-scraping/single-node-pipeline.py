@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Single-node pipeline - WALNUT, IRONWOOD and ROSEWOOD in one process
+Ballarat Tool Library Data Migration - For running a migration or re-sync on one box
+
+The cluster services hand work on through the shared directory: IRONWOOD
+polls for WALNUT's signal file every 10 seconds and ROSEWOOD for
+IRONWOOD's every 15, and neither starts until the stage before it has
+finished. Here the same stage classes run as one asyncio graph:
+
+    WALNUT discovery --(tools)--> IRONWOOD workers --(tool records)--> ROSEWOOD validation
+                                  downloads: thread pool                 then import files and QA report
+                                  transcodes: thread pool
+
+Both queues are bounded, so a stage that falls behind makes the one before
+it wait. IRONWOOD starts on a tool as soon as WALNUT's page lists it, and
+ROSEWOOD validates each record as IRONWOOD finishes it. Workers take the
+highest-priority tool waiting (IRONWOOD's ToolScheduler), and records are
+passed on in the order their tools were taken, so the tools that matter
+most reach ROSEWOOD first. Image downloads
+(requests) and transcodes (Pillow releases the GIL while decoding, resizing
+and encoding) run in thread pools off the event loop. PIL and requests are
+only imported once an image needs them.
+
+Tools an earlier run left unprocessed are fed to IRONWOOD alongside new
+discoveries, and ROSEWOOD completes the catalog for export from the
+processed data already on disk, so a re-sync that finds a handful of new
+tools takes seconds. All three stages share one progress store, synced
+through progress_changesets/ like any other node.
+
+SIGTERM or Ctrl-C drains all three stages together (see stage_drain.py).
+Tools already queued for IRONWOOD stay unclaimed for the next run, records
+IRONWOOD finishes are still validated, and no import files are written.
+
+Usage:
+    python3 single-node-pipeline.py
+    python3 single-node-pipeline.py --bulk-load --api-base http://127.0.0.1:8765/api/v1
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from progress_store import ProgressStore
+from run_ledger import peak_memory_mb
+from stage_loader import load_stage
+from stage_profile import PROFILE_MODES, StageProfiler
+
+walnut = load_stage('walnut-coordinator.py')
+ironwood = load_stage('ironwood-processor.py')
+rosewood = load_stage('rosewood-qa.py')
+
+# Configuration
+DISCOVERED_QUEUE_SIZE = 100  # Tools waiting for an IRONWOOD worker
+PROCESSED_QUEUE_SIZE = 50  # Tool records waiting for ROSEWOOD
+IRONWOOD_WORKERS = ironwood.MAX_CONCURRENT_REQUESTS
+DOWNLOAD_THREADS = ironwood.MAX_CONCURRENT_REQUESTS
+TRANSCODE_THREADS = os.cpu_count() or 2
+LOCAL_DATABASE_PATH = walnut.LOCAL_STATE_DIR / "pipeline_progress.db"
+# Checkpoints go with the pipeline's own progress store, not the cluster stages' on this node
+WALNUT_CHECKPOINT_PATH = walnut.LOCAL_STATE_DIR / "pipeline_walnut_checkpoint.json"
+ROSEWOOD_CHECKPOINT_PATH = walnut.LOCAL_STATE_DIR / "pipeline_rosewood_checkpoint.json"
+
+logger = logging.getLogger(__name__)
+
+class PriorityToolQueue(asyncio.Queue):
+    """Bounded queue of (tool_id, tool_name, tool_url) that hands out the highest-priority tool first"""
+
+    def __init__(self, maxsize: int, processor):
+        self.processor = processor  # Its scheduler is built by get_unprocessed_tools
+        self.sequence = itertools.count()  # Equal priorities keep arrival order
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self._queue = []
+
+    def _put(self, item):
+        if item is None:
+            rank = float('inf')  # The end of discovery sorts after every tool
+        else:
+            rank = -self.processor.scheduler.priority(item[0], item[1])
+        heapq.heappush(self._queue, (rank, next(self.sequence), item))
+
+    def _get(self):
+        return heapq.heappop(self._queue)[2]
+
+class InOrderEmitter:
+    """
+    Passes records on in the order their tools were taken, whatever order they finish in
+
+    At most `window` tools are taken ahead of the oldest unemitted one, so a
+    slow tool holds back new work instead of letting finished records pile up.
+    """
+
+    def __init__(self, queue: asyncio.Queue, window: int = PROCESSED_QUEUE_SIZE):
+        self.queue = queue
+        self.window = window
+        self.taken = 0
+        self.next_to_emit = 0
+        self.finished: Dict[int, Optional[Any]] = {}
+        self.lock = asyncio.Lock()  # One emitter at a time, or a blocked put could be overtaken
+        self.window_open = asyncio.Condition()
+
+    async def ticket(self) -> int:
+        """Number a tool as a worker takes it, waiting while the reorder window is full"""
+        async with self.window_open:
+            await self.window_open.wait_for(lambda: self.taken - self.next_to_emit < self.window)
+            ticket = self.taken
+            self.taken += 1
+            return ticket
+
+    async def emit(self, ticket: int, record):
+        """Hold a finished record (None for a failure) until every earlier ticket has gone"""
+        self.finished[ticket] = record
+        async with self.lock:
+            while self.next_to_emit in self.finished:
+                record = self.finished.pop(self.next_to_emit)
+                self.next_to_emit += 1
+                async with self.window_open:
+                    self.window_open.notify_all()
+                if record is not None:
+                    await self.queue.put(record)
+
+class SingleNodePipeline:
+    """WALNUT, IRONWOOD and ROSEWOOD connected by bounded in-memory queues"""
+
+    def __init__(self, api_base: str = rosewood.ALPHA_1_API_BASE):
+        # One progress store for all three stages, starting from whatever
+        # the cluster services or earlier runs have shipped
+        self.progress_store = ProgressStore('pipeline', LOCAL_DATABASE_PATH, walnut.CHANGESET_DIR)
+        self.progress_store.pull()
+
+        self.coordinator = walnut.WalnutCoordinator(progress_store=self.progress_store)
+        self.processor = ironwood.IronwoodProcessor(progress_store=self.progress_store)
+        self.qa = rosewood.RosewoodQA(api_base=api_base, progress_store=self.progress_store)
+        self.coordinator.drain.checkpoint_path = WALNUT_CHECKPOINT_PATH
+        self.qa.drain.checkpoint_path = ROSEWOOD_CHECKPOINT_PATH
+        for stage in self.stages():
+            stage.ledger.shares_process = True  # Peak memory is the whole pipeline's
+
+        self.discovered = PriorityToolQueue(DISCOVERED_QUEUE_SIZE, self.processor)
+        self.processed = asyncio.Queue(PROCESSED_QUEUE_SIZE)
+        self.emitter = InOrderEmitter(self.processed)
+        self.coordinator.downstream = self.discovered
+
+        self.processor.download_pool = ThreadPoolExecutor(DOWNLOAD_THREADS, thread_name_prefix='image-download')
+        self.processor.transcode_pool = ThreadPoolExecutor(TRANSCODE_THREADS, thread_name_prefix='image-transcode')
+
+    async def discover(self):
+        """WALNUT: tools earlier runs left unprocessed, alongside everything new in the catalog"""
+        leftovers = await self.processor.get_unprocessed_tools()
+        logger.info(f"{len(leftovers)} tools from earlier runs still need processing")
+
+        async def feed_leftovers():
+            for tool_info in leftovers:
+                if self.processor.drain.draining:
+                    break
+                await self.discovered.put(tool_info)
+
+        try:
+            await asyncio.gather(feed_leftovers(), self.coordinator.coordinate_full_scraping())
+        finally:
+            await self.discovered.put(None)  # End of discovery
+
+    async def process(self):
+        """IRONWOOD: workers take tools as they are discovered and pass on each record"""
+        start_time = time.time()
+
+        async def worker():
+            while True:
+                tool_info = await self.discovered.get()
+                if tool_info is None:
+                    await self.discovered.put(None)  # Every worker needs to see the end
+                    return
+                if self.processor.drain.draining:
+                    continue  # Left unclaimed; the queue is still emptied so WALNUT never blocks
+
+                self.processor.metrics.set('queue_depth', self.discovered.qsize(), queue='tools')
+                ticket = await self.emitter.ticket()
+                tool_data = await self.processor.drain.guard(self.processor.process_tool(*tool_info))
+                await self.emitter.emit(ticket, tool_data)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(IRONWOOD_WORKERS)))
+        finally:
+            await self.processed.put(None)  # End of processing
+
+        if self.processor.drain.draining:
+            self.processor.finish_drain()
+
+        handled = self.processor.stats.counter('tools_processed') + self.processor.stats.counter('tools_failed')
+        if handled:
+            await self.processor.generate_processing_report(handled, time.time() - start_time)
+
+    async def validate(self, bulk_load: bool = False, api_token: str = None):
+        """ROSEWOOD: validate records as they arrive, then the rest of the catalog, then export"""
+        self.qa.begin_run()
+        pending_rows = []
+        fresh_ids = set()
+
+        while True:
+            tool_data = await self.processed.get()
+            if tool_data is None:
+                break
+            fresh_ids.add(tool_data.get('id'))
+            await self.qa.validate_tool(tool_data, pending_rows)
+
+        if self.qa.drain.draining:
+            await self.qa.finish_drain(pending_rows)
+            return
+
+        # Tools processed by earlier runs complete the catalog for the import files
+        for tool_data in self.qa.iter_processed_tools():
+            if tool_data.get('id') not in fresh_ids:
+                await self.qa.validate_tool(tool_data, pending_rows)
+
+        if not self.qa.stats.counter('tools_validated'):
+            logger.error("No processed tools found for validation")
+            return
+
+        await self.qa.finish_validation(pending_rows)
+        await self.qa.generate_import_files()
+
+        if bulk_load:
+            self.qa.bulk_load_summary = await self.qa.bulk_load_tools(self.qa.read_ndjson_import(), api_token)
+
+        await self.qa.generate_qa_report()
+
+        # A bulk load cut short by a drain resumes from its progress log next run
+        if self.qa.drain.draining:
+            self.qa.drain.save_checkpoint({"run_started_at": self.qa.run_started_at})
+        else:
+            self.qa.drain.clear_checkpoint()
+
+    async def run(self, bulk_load: bool = False, api_token: str = None):
+        """Run all three stages concurrently until the last record is exported"""
+        start_time = time.time()
+        logger.info("Starting single-node pipeline: WALNUT -> IRONWOOD -> ROSEWOOD")
+        for stage in self.stages():
+            stage.ledger.start()
+
+        await asyncio.gather(self.discover(), self.process(), self.validate(bulk_load, api_token))
+
+        logger.info(
+            f"PIPELINE SUMMARY: {self.coordinator.stats.counter('tools_discovered')} new tools discovered, "
+            f"{self.processor.stats.counter('tools_processed')} processed "
+            f"({self.processor.stats.counter('tools_failed')} failed), "
+            f"{self.qa.stats.counter('valid_tools')}/{self.qa.stats.counter('tools_validated')} valid, "
+            f"in {time.time() - start_time:.1f}s"
+        )
+
+    def stages(self):
+        """The three stage objects, in pipeline order"""
+        return (self.coordinator, self.processor, self.qa)
+
+    def record_runs(self, outcome: str):
+        """One run ledger row per stage, all for the same run; peak memory is logged once for all three"""
+        for stage in self.stages():
+            stage.ledger.record(self.progress_store, stage.metrics, stage.stats, stage.drain, outcome)
+        peak = peak_memory_mb()
+        if peak is not None:
+            logger.info(f"Run ledger: pipeline peak memory {peak:.0f} MB")
+
+    async def cleanup(self):
+        """Clean up every stage, then the pools and the shared progress store"""
+        await self.coordinator.cleanup()
+        await self.processor.cleanup()
+        await self.qa.cleanup()
+        self.processor.download_pool.shutdown()
+        self.processor.transcode_pool.shutdown()
+        self.progress_store.close()
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="WALNUT, IRONWOOD and ROSEWOOD in one process")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="Push import-ready tools to the alpha-1 API after generating import files")
+    parser.add_argument('--api-base', default=rosewood.ALPHA_1_API_BASE,
+                        help="alpha-1 API base URL (point at alpha1-api-stub.py for local testing)")
+    parser.add_argument('--api-token', default=None,
+                        help=f"Bearer token for the API (defaults to ${rosewood.ALPHA_1_API_TOKEN_ENV})")
+    parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES, default=None,
+                        help="Profile the run (sampled stacks by default, or cprofile) and monitor event-loop lag")
+    return parser.parse_args()
+
+async def main(args):
+    """Main execution function"""
+    pipeline = SingleNodePipeline(api_base=args.api_base)
+    profiler = StageProfiler('pipeline', args.profile, walnut.OUTPUT_DIR)
+    outcome = 'completed'
+
+    try:
+        profiler.start()
+        pipeline.coordinator.drain.install(pipeline.processor.drain, pipeline.qa.drain)
+        await pipeline.run(args.bulk_load, args.api_token)
+    except KeyboardInterrupt:
+        outcome = 'interrupted'
+        logger.info("Pipeline interrupted by user")
+    except Exception as e:
+        outcome = 'failed'
+        logger.error(f"Unexpected error: {e}")
+    finally:
+        pipeline.coordinator.drain.uninstall()
+        pipeline.record_runs(outcome)
+        await pipeline.cleanup()
+        profiler.stop()
+
+if __name__ == "__main__":
+    print("Single-Node Pipeline - Ballarat Tool Library WALNUT -> IRONWOOD -> ROSEWOOD")
+    print("=" * 75)
+    asyncio.run(main(parse_args()))
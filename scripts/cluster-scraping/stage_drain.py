@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Graceful drain and checkpoints for the scraping stages
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+On SIGTERM (systemctl stop) or Ctrl-C a stage drains instead of dying:
+
+    1. It stops claiming work. Pages and tools not yet started keep their
+       unclaimed state in the progress database. A stage waiting for
+       another stage's signal file stops waiting.
+    2. In-flight items get DRAIN_DEADLINE seconds to finish. Any still
+       running then are cancelled, and the stage releases their claims so
+       the next run picks them up. A second signal skips the wait.
+    3. Pending database writes are flushed and shipped, and the next stage
+       is not signalled.
+
+The progress database is IRONWOOD's checkpoint: a tool's claim says
+whether it was finished. WALNUT's page rows and ROSEWOOD's QA rows do not
+say which run wrote them, so those stages keep {stage}_checkpoint.json in
+the node-local state directory. It is written when a run starts, updated
+when the run drains, and removed when the run completes. A restart that
+finds a checkpoint resumes that run, even after a crash, and skips work the
+run had already finished.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+# Configuration
+DRAIN_DEADLINE = 30.0  # Seconds in-flight items get to finish; systemd's TimeoutStopSec must be longer
+DRAIN_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+logger = logging.getLogger(__name__)
+
+class StageDrain:
+    """Turns SIGTERM/SIGINT into a drain of one stage, and keeps its resume checkpoint"""
+
+    def __init__(self, stage: str, checkpoint_path: Optional[Path] = None, deadline: float = DRAIN_DEADLINE):
+        self.stage = stage
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.deadline = deadline
+        self.draining = False
+        self.cancelling = False
+        self.reason: Optional[str] = None
+        self.requested = asyncio.Event()
+        self.in_flight: Set[asyncio.Task] = set()
+        self.deadline_handle: Optional[asyncio.TimerHandle] = None
+        self.installed = False
+
+    def install(self, *linked: 'StageDrain'):
+        """
+        Drain on SIGTERM or SIGINT instead of being killed or raising KeyboardInterrupt
+
+        Linked drains start with this one (single-node-pipeline.py drains all
+        three stages on one signal).
+        """
+        loop = asyncio.get_running_loop()
+
+        def handle(name):
+            for drain in (self,) + linked:
+                drain.request(name)
+
+        try:
+            for signum in DRAIN_SIGNALS:
+                loop.add_signal_handler(signum, handle, signal.Signals(signum).name)
+        except (NotImplementedError, RuntimeError):
+            return  # No loop signal handlers here (Windows, or not the main thread)
+        self.installed = True
+
+    def uninstall(self):
+        """Restore the default signal handling"""
+        if not self.installed:
+            return
+        loop = asyncio.get_running_loop()
+        for signum in DRAIN_SIGNALS:
+            loop.remove_signal_handler(signum)
+        if self.deadline_handle is not None:
+            self.deadline_handle.cancel()
+        self.installed = False
+
+    def request(self, reason: str = "drain requested"):
+        """Start draining; a second request cancels in-flight items at once"""
+        if self.draining:
+            logger.warning(f"{reason} again - releasing {len(self.in_flight)} in-flight {self.stage} items now")
+            self.cancel_in_flight()
+            return
+
+        self.draining = True
+        self.reason = reason
+        self.requested.set()
+        logger.warning(f"{reason}: draining {self.stage} - no new work will be claimed; "
+                       f"{len(self.in_flight)} in-flight items have {self.deadline:.0f}s to finish")
+        self.deadline_handle = asyncio.get_running_loop().call_later(self.deadline, self.cancel_in_flight)
+
+    def cancel_in_flight(self):
+        if self.cancelling:
+            return
+        self.cancelling = True
+        if self.in_flight:
+            logger.warning(f"Drain deadline reached - cancelling {len(self.in_flight)} in-flight {self.stage} items")
+        for task in list(self.in_flight):
+            task.cancel()
+
+    async def guard(self, coro):
+        """
+        Run one in-flight item; returns None if the drain cancelled it
+
+        Cancellation from anywhere else still propagates.
+        """
+        task = asyncio.current_task()
+        self.in_flight.add(task)
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            if not self.cancelling:
+                raise
+            task.uncancel()
+            return None
+        finally:
+            self.in_flight.discard(task)
+
+    async def sleep(self, seconds: float) -> bool:
+        """Sleep, waking early if a drain starts; returns False when draining"""
+        try:
+            await asyncio.wait_for(self.requested.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        return not self.draining
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """The unfinished run to resume, if there is one"""
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return None
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return None
+
+        how = f"drained on {checkpoint['drained_by']}" if checkpoint.get('drained_by') else "stopped without draining"
+        logger.info(f"Resuming the {self.stage} run started {checkpoint.get('run_started_at')} ({how})")
+        return checkpoint
+
+    def save_checkpoint(self, state: Dict[str, Any]):
+        """Record the run in progress; replaced whole, so a crash never leaves half a checkpoint"""
+        if self.checkpoint_path is None:
+            return
+        checkpoint = {
+            "stage": self.stage,
+            "saved_at": datetime.now().isoformat(),
+            "drained_by": self.reason,
+            **state
+        }
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.checkpoint_path.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+        if self.draining:
+            logger.info(f"Checkpoint saved to {self.checkpoint_path}; the next run resumes from it")
+
+    def clear_checkpoint(self):
+        """The run completed; the next one starts afresh"""
+        if self.checkpoint_path is not None and self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
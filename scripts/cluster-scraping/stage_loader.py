@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Import stage scripts as modules
+Ballarat Tool Library Data Migration - Shared by the single-node pipeline, simple-processor and parser-benchmark
+
+The stage scripts are named for their hosts (walnut-coordinator.py,
+ironwood-processor.py, rosewood-qa.py), which are not valid module names,
+so scripts that reuse a stage's code load it by path from this directory.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+def load_stage(filename: str):
+    """Import a stage script by path (their file names are not module names)"""
+    name = filename.replace('-', '_')[:-3]
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
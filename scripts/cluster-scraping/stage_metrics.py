@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Live Prometheus metrics for the scraping stages
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+Stages always count into a StageMetrics registry (a few dict updates per
+event). The /metrics endpoint is only served when a stage is started with
+--metrics-port; it runs on the stage's own event loop through aiohttp, so
+there is no extra thread or dependency. Every series carries a
+stage="walnut|ironwood|rosewood" label.
+
+A stalled run shows up as ballarat_scrape_last_progress_timestamp_seconds
+falling behind time(), e.g. alert on
+    time() - ballarat_scrape_last_progress_timestamp_seconds > 300
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+# Configuration
+METRICS_HOST = "0.0.0.0"  # Scraped by the monitoring stack's Prometheus
+METRICS_PREFIX = "ballarat_scrape_"
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# name -> (type, help)
+METRICS = {
+    'pages_total': ('counter', "Listing pages fetched, by result"),
+    'tools_total': ('counter', "Tools handled, by result"),
+    'in_flight_requests': ('gauge', "HTTP requests currently in flight"),
+    'http_responses_total': ('counter', "HTTP responses received, by status code"),
+    'fetch_seconds': ('histogram', "Time to fetch and read one page"),
+    'parse_seconds': ('histogram', "Time to extract data from one page"),
+    'transcode_seconds': ('histogram', "Time to optimize one image"),
+    'validate_seconds': ('histogram', "Time to validate one tool"),
+    'api_request_seconds': ('histogram', "Time for one alpha-1 API request, including retries"),
+    'db_commit_seconds': ('histogram', "Progress store commit latency"),
+    'queue_depth': ('gauge', "Work items waiting, by queue"),
+    'image_bytes_total': ('counter', "Image bytes downloaded (in) and written (out)"),
+    'last_progress_timestamp_seconds': ('gauge', "Unix time of the last page or tool completed"),
+}
+
+# Counting one of these marks progress for stall alerts
+PROGRESS_METRICS = ('pages_total', 'tools_total')
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class StageMetrics:
+    """Counters, gauges and histograms for one stage, rendered in Prometheus text format"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.values: Dict[str, Dict[LabelKey, float]] = {name: {} for name in METRICS}
+        self.histograms: Dict[str, Dict[LabelKey, list]] = {}
+        self.runner: Optional[web.AppRunner] = None
+
+    def inc(self, name: str, n: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.values[name]
+        series[key] = series.get(key, 0) + n
+        if name in PROGRESS_METRICS:
+            self.values['last_progress_timestamp_seconds'][()] = time.time()
+
+    def dec(self, name: str, n: float = 1, **labels):
+        self.inc(name, -n, **labels)
+
+    def set(self, name: str, value: float, **labels):
+        self.values[name][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Add one observation; per series: [bucket counts..., count, sum]"""
+        key = tuple(sorted(labels.items()))
+        series = self.histograms.setdefault(name, {})
+        state = series.get(key)
+        if state is None:
+            state = series[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        """Observe how long the with-block takes"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def in_flight(self):
+        """Count an HTTP request as in flight for the duration of the with-block"""
+        self.inc('in_flight_requests')
+        try:
+            yield
+        finally:
+            self.dec('in_flight_requests')
+
+    def format_labels(self, key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = (('stage', self.stage),) + key + extra
+        return '{' + ','.join(f'{name}="{str(value)}"' for name, value in pairs) + '}'
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format"""
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            full_name = METRICS_PREFIX + name
+            if metric_type == 'histogram':
+                series = self.histograms.get(name, {})
+            else:
+                series = self.values[name]
+            if not series:
+                continue
+
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for key, value in sorted(series.items()):
+                if metric_type != 'histogram':
+                    lines.append(f"{full_name}{self.format_labels(key)} {value}")
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS, value):
+                    lines.append(f"{full_name}_bucket{self.format_labels(key, (('le', str(bound)),))} {count}")
+                lines.append(f"{full_name}_bucket{self.format_labels(key, (('le', '+Inf'),))} {value[-2]}")
+                lines.append(f"{full_name}_count{self.format_labels(key)} {value[-2]}")
+                lines.append(f"{full_name}_sum{self.format_labels(key)} {value[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Prometheus-Text-Version': '0.0.4'})
+
+    async def start(self, port: int, host: str = METRICS_HOST):
+        """Serve /metrics until stop()"""
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        logger.info(f"Serving {self.stage} metrics on http://{host}:{port}/metrics")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
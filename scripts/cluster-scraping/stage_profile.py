@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Built-in CPU profiling for the scraping stages
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+`--profile` on any stage profiles the whole run and writes the results next
+to the stage report:
+
+    --profile / --profile sample   A watchdog thread samples the main thread's
+                                   stack every SAMPLE_INTERVAL and writes
+                                   {stage}_profile_{timestamp}.folded, collapsed
+                                   stacks for flamegraph.pl or speedscope.app.
+                                   Sampling only reads frames, so coroutine
+                                   switches do not skew it.
+    --profile cprofile             Deterministic cProfile of the main thread,
+                                   written as {stage}_profile_{timestamp}.prof
+                                   (snakeviz, flameprof) plus a .txt listing of
+                                   the top functions by cumulative time.
+
+Either mode also runs an event-loop lag monitor. A coroutine wakes every
+LOOP_LAG_CHECK_INTERVAL and measures how late it woke; the watchdog thread
+captures the main thread's stack while the loop is stuck, so each stall over
+LOOP_LAG_THRESHOLD is reported with the code that was blocking it (a
+synchronous requests.get, a PIL transcode). Stalls are logged as they happen
+and summarised in {stage}_loop_lag_{timestamp}.json.
+
+    flamegraph.pl ironwood_profile_20250101_120000.folded > ironwood.svg
+"""
+
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Configuration
+PROFILE_MODES = ('sample', 'cprofile')
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+LOOP_LAG_CHECK_INTERVAL = 0.05
+LOOP_LAG_THRESHOLD = 0.1  # Loop stalls longer than this are reported with their stack
+MAX_STALLS_REPORTED = 50
+CPROFILE_TOP_FUNCTIONS = 40
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+def stack_frames(frame) -> List[Any]:
+    """Frames from the outermost call down to frame"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+def blocking_culprit(frames: List[Any]) -> str:
+    """The innermost frame in the stage scripts - the code that called whatever blocked"""
+    for frame in reversed(frames):
+        filename = frame.f_code.co_filename
+        if not filename.startswith('<') and os.path.dirname(os.path.abspath(filename)) == SCRIPT_DIR:
+            return f"{frame_label(frame)} line {frame.f_lineno}"
+    return frame_label(frames[-1]) if frames else "unknown"
+
+class StageProfiler:
+    """Profiles one stage run; does nothing when mode is None"""
+
+    def __init__(self, stage: str, mode: Optional[str], output_dir: Path):
+        self.stage = stage
+        self.mode = mode
+        self.enabled = mode is not None
+        self.output_dir = Path(output_dir)
+        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        self.samples: Counter = Counter()
+        self.profile: Optional[cProfile.Profile] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.main_thread_id = None
+        self.started = None
+
+        # Loop lag monitor state
+        self.watch_task: Optional[asyncio.Task] = None
+        self.heartbeat: Optional[float] = None
+        self.blocked_stack: Optional[List[Any]] = None
+        self.lags: List[float] = []
+        self.stalls: List[Dict[str, Any]] = []
+
+    def start(self):
+        """Start profiling the calling thread, and its event loop if one is running"""
+        if not self.enabled:
+            return
+        self.main_thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            self.watch_task = loop.create_task(self.watch_loop())
+
+        self.thread = threading.Thread(target=self.watchdog, name=f"{self.stage}-profiler", daemon=True)
+        self.thread.start()
+
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+        logger.info(f"Profiling {self.stage} ({self.mode}); results go to {self.output_dir}")
+
+    def watchdog(self):
+        """Sample the main thread's stack, and capture it whenever the loop misses a heartbeat"""
+        while not self.stopping.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is None:
+                continue
+
+            if self.mode == 'sample':
+                self.samples[';'.join(frame_label(f) for f in stack_frames(frame))] += 1
+
+            heartbeat = self.heartbeat
+            if (heartbeat is not None and self.blocked_stack is None
+                    and time.perf_counter() - heartbeat > LOOP_LAG_CHECK_INTERVAL + LOOP_LAG_THRESHOLD):
+                self.blocked_stack = stack_frames(frame)
+
+    async def watch_loop(self):
+        """Measure how late the loop wakes a sleeping coroutine"""
+        while True:
+            self.heartbeat = time.perf_counter()
+            await asyncio.sleep(LOOP_LAG_CHECK_INTERVAL)
+            lag = time.perf_counter() - self.heartbeat - LOOP_LAG_CHECK_INTERVAL
+            self.lags.append(lag)
+
+            if lag > LOOP_LAG_THRESHOLD:
+                frames = self.blocked_stack or []
+                culprit = blocking_culprit(frames) if frames else "unknown (stall ended before it was sampled)"
+                self.stalls.append({
+                    "at_seconds": round(self.heartbeat - self.started, 3),
+                    "lag_ms": round(lag * 1000, 1),
+                    "culprit": culprit,
+                    "stack": [f"{frame_label(f)} line {f.f_lineno}" for f in frames]
+                })
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms in {culprit}")
+            self.blocked_stack = None
+
+    def loop_lag_summary(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+        by_culprit = defaultdict(lambda: {"stalls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        for stall in self.stalls:
+            row = by_culprit[stall['culprit']]
+            row['stalls'] += 1
+            row['total_ms'] = round(row['total_ms'] + stall['lag_ms'], 1)
+            row['max_ms'] = max(row['max_ms'], stall['lag_ms'])
+
+        return {
+            "stage": self.stage,
+            "check_interval_ms": LOOP_LAG_CHECK_INTERVAL * 1000,
+            "threshold_ms": LOOP_LAG_THRESHOLD * 1000,
+            "checks": len(lags),
+            "mean_lag_ms": round(sum(lags) / len(lags) * 1000, 2) if lags else 0.0,
+            "p95_lag_ms": round(lags[min(int(0.95 * len(lags)), len(lags) - 1)] * 1000, 2) if lags else 0.0,
+            "max_lag_ms": round(lags[-1] * 1000, 2) if lags else 0.0,
+            "stalls_over_threshold": len(self.stalls),
+            "blocking_code": dict(sorted(by_culprit.items(), key=lambda item: item[1]['total_ms'], reverse=True)),
+            "worst_stalls": sorted(self.stalls, key=lambda s: s['lag_ms'], reverse=True)[:MAX_STALLS_REPORTED]
+        }
+
+    def stop(self):
+        """Stop profiling and write the results"""
+        if not self.enabled or self.thread is None:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        if self.watch_task is not None:
+            self.watch_task.cancel()
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        prefix = self.output_dir / f"{self.stage}_profile_{self.timestamp}"
+
+        if self.mode == 'sample':
+            folded_path = prefix.with_suffix('.folded')
+            with open(folded_path, 'w') as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"{sum(self.samples.values())} stack samples written to {folded_path}")
+
+        if self.profile is not None:
+            prof_path = prefix.with_suffix('.prof')
+            self.profile.dump_stats(prof_path)
+            listing = io.StringIO()
+            pstats.Stats(self.profile, stream=listing).sort_stats('cumulative').print_stats(CPROFILE_TOP_FUNCTIONS)
+            prefix.with_suffix('.txt').write_text(listing.getvalue())
+            logger.info(f"cProfile data written to {prof_path}")
+
+        if self.watch_task is not None:
+            summary = self.loop_lag_summary()
+            lag_path = self.output_dir / f"{self.stage}_loop_lag_{self.timestamp}.json"
+            with open(lag_path, 'w') as f:
+                json.dump(summary, f, indent=2)
+            logger.info(f"Event loop lag: max {summary['max_lag_ms']:.0f} ms, "
+                        f"{summary['stalls_over_threshold']} stalls over {LOOP_LAG_THRESHOLD * 1000:.0f} ms "
+                        f"- see {lag_path}")
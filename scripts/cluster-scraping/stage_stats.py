@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Streaming, bounded-memory statistics for stage reports
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+Each stage feeds records in as they are produced instead of keeping every
+record around for its final report. Counts, reservoir samples, fixed-bucket
+histograms and top-k issue counts all use constant memory regardless of how
+many tools pass through.
+"""
+
+import bisect
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+# Defaults
+DEFAULT_SAMPLE_SIZE = 5
+DEFAULT_TOP_K_CAPACITY = 100  # Tracked keys per top-k counter
+SCORE_BUCKETS = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]  # Upper bounds for 0-100 scores
+
+class ReservoirSample:
+    """Uniform random sample of fixed size over a stream (Algorithm R)"""
+
+    def __init__(self, size: int = DEFAULT_SAMPLE_SIZE, rng: Optional[random.Random] = None):
+        self.size = size
+        self.seen = 0
+        self.items: List[Any] = []
+        self.rng = rng or random.Random()
+
+    def add(self, item: Any):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+class Histogram:
+    """
+    Fixed-bucket histogram with running count, sum, min and max
+
+    Bucket i holds values in [bounds[i-1], bounds[i]); the first bucket holds
+    everything below bounds[0] and the last everything from bounds[-1] up.
+    """
+
+    def __init__(self, bounds: Sequence[float] = SCORE_BUCKETS):
+        self.bounds = list(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def add(self, value: float):
+        self.buckets[bisect.bisect_right(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def count_below(self, threshold: float) -> int:
+        """Values below a threshold; exact when the threshold is a bucket bound"""
+        return sum(self.buckets[:bisect.bisect_right(self.bounds, threshold)])
+
+    def count_at_least(self, threshold: float) -> int:
+        return self.count - self.count_below(threshold)
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: upper bound of the bucket holding it"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for i, bucket in enumerate(self.buckets):
+            running += bucket
+            if running >= target:
+                return min(self.bounds[i], self.maximum) if i < len(self.bounds) else self.maximum
+        return self.maximum
+
+    def to_dict(self) -> Dict:
+        labels = [f"<{self.bounds[0]}"]
+        labels += [f"{lower}-{upper}" for lower, upper in zip(self.bounds, self.bounds[1:])]
+        labels.append(f">={self.bounds[-1]}")
+
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 3),
+            "min": self.minimum,
+            "max": self.maximum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {label: n for label, n in zip(labels, self.buckets) if n}
+        }
+
+class TopKCounter:
+    """
+    Approximate heavy-hitter counts in bounded memory (Space-Saving)
+
+    Exact while fewer than `capacity` distinct keys have been seen; beyond
+    that the least frequent key is evicted and its count inherited, which
+    can only overestimate and never drops a genuinely frequent key.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+
+    def add(self, key: str, n: int = 1):
+        if key in self.counts:
+            self.counts[key] += n
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = n
+        else:
+            evicted = min(self.counts, key=self.counts.get)
+            self.counts[key] = self.counts.pop(evicted) + n
+
+    def most_common(self, k: int) -> Dict[str, int]:
+        return dict(sorted(self.counts.items(), key=lambda item: -item[1])[:k])
+
+class StreamingStats:
+    """Named counters, samples, histograms and top-k counters for one stage run"""
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE, seed: Optional[int] = None):
+        self.sample_size = sample_size
+        self.rng = random.Random(seed)
+        self.counters: Dict[str, int] = {}
+        self.samples: Dict[str, ReservoirSample] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.top_k: Dict[str, TopKCounter] = {}
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def counter(self, name: str) -> int:
+        return self.counters.get(name, 0)
+
+    def sample(self, name: str, item: Any, size: Optional[int] = None):
+        if name not in self.samples:
+            self.samples[name] = ReservoirSample(size or self.sample_size, self.rng)
+        self.samples[name].add(item)
+
+    def sampled(self, name: str) -> List[Any]:
+        return list(self.samples[name].items) if name in self.samples else []
+
+    def observe(self, name: str, value: float, bounds: Sequence[float] = SCORE_BUCKETS):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(bounds)
+        self.histograms[name].add(value)
+
+    def histogram(self, name: str) -> Histogram:
+        return self.histograms.get(name) or Histogram()
+
+    def issue(self, name: str, key: str, n: int = 1, capacity: int = DEFAULT_TOP_K_CAPACITY):
+        if name not in self.top_k:
+            self.top_k[name] = TopKCounter(capacity)
+        self.top_k[name].add(key, n)
+
+    def top(self, name: str, k: int = 5) -> Dict[str, int]:
+        return self.top_k[name].most_common(k) if name in self.top_k else {}
+
+    def to_dict(self) -> Dict:
+        return {
+            "counters": dict(self.counters),
+            "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+            "top_issues": {name: counter.most_common(10) for name, counter in self.top_k.items()}
+        }
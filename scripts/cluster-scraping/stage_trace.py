@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Per-tool span tracing for the scraping stages
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+With --trace, a stage records a span around each phase of a tool's (or
+catalog page's) life - queue wait, rate-limit wait, HTTP fetch, parse,
+image download, transcode, JSON write, DB update, QA - into a local trace
+file in the Chrome trace event format. Each tool gets its own lane, so the
+file opens directly in Perfetto (ui.perfetto.dev) or chrome://tracing.
+Without --trace, span() costs one attribute check.
+
+The summary command attributes every traced instant of a tool's life to its
+innermost open span, giving the critical-path breakdown per phase and the
+slowest tools:
+
+    python3 stage_trace.py summary ~/.local/share/ballarat-scraping/traces/ironwood_*.json --top 10
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Configuration
+TRACE_DIR = Path.home() / ".local" / "share" / "ballarat-scraping" / "traces"
+TRACE_FLUSH_EVENTS = 200
+SUMMARY_TOP_TOOLS = 10
+UNTRACED_PHASE = "(untraced)"
+
+def default_trace_path(stage: str) -> Path:
+    return TRACE_DIR / f"{stage}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+class StageTracer:
+    """Writes complete ('X') trace events, one lane per tool or page key"""
+
+    def __init__(self, stage: str, path: Optional[Path] = None):
+        self.stage = stage
+        self.path = path
+        self.enabled = path is not None
+        self.origin = time.perf_counter()
+        self.lanes: Dict[str, int] = {}
+        self.buffer: List[str] = []
+        self.events_written = 0
+
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, 'w')
+            self.file.write('[\n')
+            self.emit({"name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+                       "args": {"name": stage.upper()}})
+
+    def emit(self, event: Dict[str, Any]):
+        self.buffer.append(json.dumps(event, separators=(',', ':')))
+        if len(self.buffer) >= TRACE_FLUSH_EVENTS:
+            self.flush()
+
+    def lane(self, key: Optional[str]) -> int:
+        """Lane (trace tid) for a key; lane 0 holds stage-wide spans"""
+        if key is None:
+            return 0
+        tid = self.lanes.get(key)
+        if tid is None:
+            tid = self.lanes[key] = len(self.lanes) + 1
+            self.emit({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": key}})
+        return tid
+
+    def record(self, name: str, started: float, ended: float, key: Optional[str] = None, **args):
+        """Record a span from perf_counter() readings taken by the caller"""
+        if not self.enabled:
+            return
+        args['key'] = key
+        self.emit({
+            "name": name,
+            "cat": self.stage,
+            "ph": "X",
+            "ts": round((started - self.origin) * 1e6, 1),
+            "dur": round((ended - started) * 1e6, 1),
+            "pid": 1,
+            "tid": self.lane(key),
+            "args": args
+        })
+
+    @contextmanager
+    def span(self, name: str, key: Optional[str] = None, **args):
+        """Record the with-block as a span"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter(), key, **args)
+
+    def flush(self):
+        if not self.enabled or not self.buffer:
+            return
+        prefix = ',\n' if self.events_written else ''
+        self.file.write(prefix + ',\n'.join(self.buffer))
+        self.file.flush()
+        self.events_written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        if not self.enabled or self.file.closed:
+            return
+        self.flush()
+        self.file.write('\n]\n')
+        self.file.close()
+
+def load_trace(path: Path) -> List[Dict[str, Any]]:
+    """Events from a trace file, including one cut off before its closing bracket"""
+    text = Path(path).read_text().rstrip().rstrip(',')
+    if not text.endswith(']'):
+        text += ']'
+    return json.loads(text)
+
+def exclusive_times(spans: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Microseconds of a key's lifetime spent in each phase
+
+    Every instant between the first span's start and the last span's end
+    goes to the innermost (latest-started) span open at that time, or to
+    UNTRACED_PHASE when none is.
+    """
+    boundaries = sorted({s['ts'] for s in spans} | {s['ts'] + s['dur'] for s in spans})
+    times = defaultdict(float)
+    for start, end in zip(boundaries, boundaries[1:]):
+        innermost = None
+        for s in spans:
+            if s['ts'] <= start and s['ts'] + s['dur'] >= end:
+                if innermost is None or s['ts'] >= innermost['ts']:
+                    innermost = s
+        times[innermost['name'] if innermost else UNTRACED_PHASE] += end - start
+    return times
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+def summarise(events: List[Dict[str, Any]], top: int = SUMMARY_TOP_TOOLS) -> Dict[str, Any]:
+    """Critical-path breakdown by phase, per-phase span statistics and the slowest keys"""
+    spans = [e for e in events if e.get('ph') == 'X']
+    by_key = defaultdict(list)
+    durations = defaultdict(list)
+    for span in spans:
+        by_key[span['args'].get('key')].append(span)
+        durations[span['name']].append(span['dur'])
+
+    stage_spans = by_key.pop(None, [])
+    breakdown = defaultdict(float)
+    lifetimes = []
+    for key, key_spans in by_key.items():
+        phases = exclusive_times(key_spans)
+        for phase, us in phases.items():
+            breakdown[phase] += us
+        lifetime = max(s['ts'] + s['dur'] for s in key_spans) - min(s['ts'] for s in key_spans)
+        lifetimes.append((lifetime, key, phases))
+
+    total = sum(breakdown.values()) or 1.0
+    lifetimes.sort(key=lambda item: item[0], reverse=True)
+    wall = (max(s['ts'] + s['dur'] for s in spans) - min(s['ts'] for s in spans)) if spans else 0.0
+
+    return {
+        "wall_seconds": wall / 1e6,
+        "keys_traced": len(by_key),
+        "stage_wide_spans": len(stage_spans),
+        "critical_path": {
+            phase: {"seconds": us / 1e6, "share": us / total}
+            for phase, us in sorted(breakdown.items(), key=lambda item: item[1], reverse=True)
+        },
+        "phases": {
+            name: {
+                "count": len(values),
+                "mean_ms": sum(values) / len(values) / 1e3,
+                "p95_ms": percentile(values, 0.95) / 1e3,
+                "max_ms": max(values) / 1e3
+            }
+            for name, values in sorted(durations.items())
+        },
+        "slowest": [
+            {
+                "key": key,
+                "seconds": lifetime / 1e6,
+                "phases": {phase: us / 1e6 for phase, us in sorted(phases.items(), key=lambda item: item[1], reverse=True)}
+            }
+            for lifetime, key, phases in lifetimes[:top]
+        ]
+    }
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"Traced {summary['keys_traced']} tools/pages over {summary['wall_seconds']:.1f}s wall time")
+    print("\nCritical path (time in each phase, summed over tools):")
+    for phase, row in summary['critical_path'].items():
+        print(f"  {phase:<20} {row['seconds']:>10.2f}s  {row['share']:>6.1%}")
+    print("\nSpans:")
+    print(f"  {'phase':<20} {'count':>7} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for phase, row in summary['phases'].items():
+        print(f"  {phase:<20} {row['count']:>7} {row['mean_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    print("\nSlowest:")
+    for row in summary['slowest']:
+        phases = ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in list(row['phases'].items())[:4])
+        print(f"  {row['key']:<20} {row['seconds']:>8.2f}s  {phases}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage span traces")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summary_parser = subparsers.add_parser('summary', help="Critical-path breakdown and slowest tools")
+    summary_parser.add_argument('traces', type=Path, nargs='+', help="Trace files written with --trace")
+    summary_parser.add_argument('--top', type=int, default=SUMMARY_TOP_TOOLS, help="Slowest tools to list")
+    summary_parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        for trace_path in args.traces:
+            summary = summarise(load_trace(trace_path), args.top)
+            if args.json:
+                print(json.dumps({str(trace_path): summary}, indent=2))
+            else:
+                print(f"== {trace_path}")
+                print_summary(summary)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Compact record types for tools moving through the pipeline
+Ballarat Tool Library Data Migration - Shared by WALNUT, IRONWOOD and ROSEWOOD
+
+Discovered tools, processed tools, image variants and validation results are
+fixed-field `__slots__` records rather than free-form dicts. They keep the
+dict-style `get`/`[]`/`in` access the stages already use, serialise to the
+JSON the stages used to exchange, and pack to a compact positional form
+(msgpack when installed, a JSON array otherwise).
+
+IRONWOOD hands processed tools to ROSEWOOD as packed `tool_{id}.rec`
+files. Files from before the packed handoff (`tool_{id}.json`) are still
+read wherever no packed file for the same tool exists.
+
+    python3 tool_records.py --benchmark --count 5000
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+try:
+    import msgpack
+except ImportError:  # packed batches fall back to compact JSON arrays
+    msgpack = None
+
+# Packed batch format tags
+MSGPACK_TAG = b'M'
+JSON_TAG = b'J'
+
+# Per-tool record files exchanged through the shared directory
+RECORD_FILE_SUFFIX = '.rec'
+LEGACY_RECORD_FILE_SUFFIX = '.json'
+
+# Benchmark defaults
+BENCHMARK_COUNT = 2000
+BENCHMARK_SEED = 42
+
+class Record:
+    """
+    Base for fixed-field records with dict-style access
+
+    A field holding None counts as absent, matching a key missing from the
+    dicts the stages used before. Keys outside FIELDS are kept in `extra` so
+    nothing read from disk is lost on the way back out. Dicts assigned to a
+    NESTED field become records of its type, however the field is set.
+    """
+
+    __slots__ = ('extra',)
+    FIELDS: Tuple[str, ...] = ()
+    NESTED: Dict[str, Type['Record']] = {}
+    FIELD_SET: frozenset = frozenset()
+    NESTED_POSITIONS: Tuple[Tuple[int, Type['Record']], ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELD_SET = frozenset(cls.FIELDS)
+        cls.NESTED_POSITIONS = tuple((cls.FIELDS.index(field), nested) for field, nested in cls.NESTED.items())
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self.FIELDS):
+            raise TypeError(f"{type(self).__name__} takes at most {len(self.FIELDS)} positional fields")
+
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        self.extra: Optional[Dict[str, Any]] = None
+
+        for field, value in zip(self.FIELDS, args):
+            self[field] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    # Dict-style access
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.FIELDS:
+            value = getattr(self, key)
+        elif self.extra:
+            value = self.extra.get(key)
+        else:
+            value = None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self.NESTED:
+            setattr(self, key, self.nested_records(key, value))
+        elif key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def keys(self) -> List[str]:
+        present = [field for field in self.FIELDS if getattr(self, field) is not None]
+        if self.extra:
+            present.extend(key for key, value in self.extra.items() if value is not None)
+        return present
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self.get(key)) for key in self.keys()]
+
+    def missing_fields(self, names: Iterable[str]) -> set:
+        """Names from `names` with no value, without building the full key set"""
+        return {name for name in names if self.get(name) is None}
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and other.to_tuple() == self.to_tuple()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{key}={value!r}" for key, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+    # Conversion
+
+    @classmethod
+    def nested_records(cls, field: str, value: Optional[Iterable[Any]]) -> Optional[List['Record']]:
+        """A NESTED field's items as records of its type, converting dicts"""
+        if value is None:
+            return None
+        nested = cls.NESTED[field]
+        return [item if isinstance(item, nested) else nested.from_dict(item) for item in value]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the on-disk JSON layout, absent fields omitted"""
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is None:
+                continue
+            if field in self.NESTED:
+                value = [item.to_dict() for item in value]
+            data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def build(cls, *values) -> 'Record':
+        """Record from field values in FIELDS order, then extra, stored as given"""
+        record = object.__new__(cls)
+        for field, value in zip(cls.FIELDS, values):
+            setattr(record, field, value)
+        record.extra = values[len(cls.FIELDS)] if len(values) > len(cls.FIELDS) else None
+        return record
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Record':
+        record = object.__new__(cls)
+        for field in cls.FIELDS:
+            setattr(record, field, data.get(field))
+        unknown = data.keys() - cls.FIELD_SET
+        record.extra = {key: data[key] for key in unknown} if unknown else None
+        for field in cls.NESTED:
+            setattr(record, field, cls.nested_records(field, getattr(record, field)))
+        return record
+
+    def to_tuple(self) -> Tuple:
+        """Positional form: field values in FIELDS order, then extra"""
+        row = []
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None and field in self.NESTED:
+                value = [item.to_tuple() for item in value]
+            row.append(value)
+        row.append(self.extra)
+        return tuple(row)
+
+    @classmethod
+    def from_tuple(cls, row) -> 'Record':
+        if cls.NESTED_POSITIONS or len(row) != len(cls.FIELDS) + 1:
+            row = list(row[:len(cls.FIELDS) + 1])
+            row.extend([None] * (len(cls.FIELDS) + 1 - len(row)))  # Rows packed before extra was stored
+            for position, nested in cls.NESTED_POSITIONS:
+                if row[position] is not None:
+                    row[position] = [nested.from_tuple(item) for item in row[position]]
+        return cls.build(*row)
+
+    def to_json(self) -> str:
+        """Compact JSON, readable by anything that reads the old dict files"""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text) -> 'Record':
+        return cls.from_dict(json.loads(text))
+
+    def pack(self) -> bytes:
+        return pack_records([self])
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'Record':
+        return unpack_records(cls, data)[0]
+
+class DiscoveredTool(Record):
+    """Tool link found by WALNUT on a catalog page"""
+
+    FIELDS = ('id', 'name', 'url', 'page_discovered', 'discovered_at')
+    __slots__ = FIELDS
+
+class ImageVariant(Record):
+    """Optimised image written by IRONWOOD for one source image URL"""
+
+    FIELDS = ('original_url', 'local_path', 'filename', 'size_bytes', 'processed_at')
+    __slots__ = FIELDS
+
+class ProcessedTool(Record):
+    """Tool detail record produced by IRONWOOD and validated by ROSEWOOD"""
+
+    FIELDS = ('id', 'url', 'name', 'brand', 'model', 'description', 'category',
+              'image_urls', 'specifications', 'processed_images', 'scraped_at')
+    NESTED = {'processed_images': ImageVariant}
+    __slots__ = FIELDS
+
+class ValidationResult(Record):
+    """Result of tool data validation"""
+
+    FIELDS = ('tool_id', 'is_valid', 'errors', 'warnings', 'completeness_score', 'quality_score')
+    __slots__ = FIELDS
+
+def pack_records(records: Iterable[Record]) -> bytes:
+    """Pack records of one type into a tagged positional batch"""
+    rows = [record.to_tuple() for record in records]
+    if msgpack is not None:
+        return MSGPACK_TAG + msgpack.packb(rows, use_bin_type=True)
+    return JSON_TAG + json.dumps(rows, separators=(',', ':')).encode('utf-8')
+
+def unpack_records(cls: Type[Record], data: bytes) -> List[Record]:
+    """Unpack a batch written by pack_records"""
+    tag, body = data[:1], data[1:]
+    if tag == MSGPACK_TAG:
+        if msgpack is None:
+            raise RuntimeError("Batch was packed with msgpack, which is not installed here")
+        rows = msgpack.unpackb(body, raw=False)
+    elif tag == JSON_TAG:
+        rows = json.loads(body)
+    else:
+        raise ValueError(f"Unknown record batch format: {tag!r}")
+    return [cls.from_tuple(row) for row in rows]
+
+def record_file(directory: Path, tool_id: str) -> Path:
+    """Packed record file for one tool"""
+    return Path(directory) / f"tool_{tool_id}{RECORD_FILE_SUFFIX}"
+
+def write_record_file(directory: Path, tool_id: str, record: Record) -> Path:
+    """Write a tool's packed record, replacing any JSON file from before the packed handoff"""
+    path = record_file(directory, tool_id)
+    path.write_bytes(record.pack())
+    path.with_suffix(LEGACY_RECORD_FILE_SUFFIX).unlink(missing_ok=True)
+    return path
+
+def read_record_file(cls: Type[Record], path: Path) -> Record:
+    """Read a packed record file, or a JSON one from before the packed handoff"""
+    if path.suffix == LEGACY_RECORD_FILE_SUFFIX:
+        return cls.from_json(path.read_text())
+    return cls.unpack(path.read_bytes())
+
+def record_files(directory: Path) -> Iterator[Path]:
+    """Every tool's record file, preferring the packed file where both exist"""
+    directory = Path(directory)
+    packed = set()
+    for path in directory.glob(f"tool_*{RECORD_FILE_SUFFIX}"):
+        packed.add(path.stem)
+        yield path
+    for path in directory.glob(f"tool_*{LEGACY_RECORD_FILE_SUFFIX}"):
+        if path.stem not in packed:
+            yield path
+
+def synthetic_processed_tool(rng: random.Random, index: int) -> Dict[str, Any]:
+    """Processed tool dict shaped like IRONWOOD output"""
+    tool_id = str(10000 + index)
+    images = [{
+        'original_url': f"https://myturn-images.s3.amazonaws.com/items/{tool_id}_{i}.jpg",
+        'local_path': f"/rust/containers/ballarat-scraping/tool_images/tool_{tool_id}_{i + 1}_{rng.getrandbits(32):08x}.jpg",
+        'filename': f"tool_{tool_id}_{i + 1}_{rng.getrandbits(32):08x}.jpg",
+        'size_bytes': rng.randint(20_000, 400_000),
+        'processed_at': datetime.now().isoformat()
+    } for i in range(rng.randint(0, 3))]
+
+    return {
+        'id': tool_id,
+        'url': f"https://ballarattoollibrary.myturn.com/library/inventory/show/{tool_id}",
+        'name': f"{rng.choice(['Cordless', 'Electric', 'Heavy Duty', 'Compact'])} "
+                f"{rng.choice(['Drill', 'Circular Saw', 'Hedge Trimmer', 'Sander', 'Pressure Washer'])}",
+        'brand': rng.choice(['Makita', 'Ryobi', 'Bosch', 'DeWalt', 'Ozito']),
+        'model': f"{rng.choice('ABCDEFGH')}{rng.randint(100, 9999)}",
+        'description': ' '.join(rng.choice(['reliable', 'lightweight', 'battery', 'included', 'suitable',
+                                            'for', 'garden', 'timber', 'metal', 'projects'])
+                                for _ in range(rng.randint(8, 40))),
+        'category': rng.choice(['Power Tools', 'Garden Tools', 'Hand Tools']),
+        'image_urls': [image['original_url'] for image in images],
+        'specifications': {'Weight': f"{rng.randint(1, 20)} kg", 'Power': f"{rng.randint(200, 2000)} W"},
+        'processed_images': images,
+        'scraped_at': datetime.now().isoformat()
+    }
+
+def measure_memory(build) -> Tuple[Any, int]:
+    """Bytes still allocated after build() returns, plus its result"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+def measure_time(func, items) -> float:
+    """Mean microseconds per item"""
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+def run_benchmark(count: int, seed: int) -> Dict[str, Any]:
+    """Compare dict + json.dump(indent=2) with the record encodings"""
+    rng = random.Random(seed)
+    texts = [json.dumps(synthetic_processed_tool(rng, i), indent=2) for i in range(count)]
+
+    dicts, dict_bytes = measure_memory(lambda: [json.loads(text) for text in texts])
+    records, record_bytes = measure_memory(lambda: [ProcessedTool.from_json(text) for text in texts])
+
+    packed = [record.pack() for record in records]
+    compact = [record.to_json() for record in records]
+
+    return {
+        "records": count,
+        "msgpack_available": msgpack is not None,
+        "memory_bytes_per_record": {
+            "dict": dict_bytes // count,
+            "slotted_record": record_bytes // count
+        },
+        "serialise_us_per_record": {
+            "dict_json_indent2": measure_time(lambda d: json.dumps(d, indent=2), dicts),
+            "record_json_compact": measure_time(lambda r: r.to_json(), records),
+            "record_packed": measure_time(lambda r: r.pack(), records)
+        },
+        "deserialise_us_per_record": {
+            "dict_json_indent2": measure_time(json.loads, texts),
+            "record_json_compact": measure_time(ProcessedTool.from_json, compact),
+            "record_packed": measure_time(ProcessedTool.unpack, packed)
+        },
+        "encoded_bytes_per_record": {
+            "dict_json_indent2": sum(len(text.encode('utf-8')) for text in texts) // count,
+            "record_json_compact": sum(len(text.encode('utf-8')) for text in compact) // count,
+            "record_packed": sum(len(data) for data in packed) // count,
+            "record_packed_batch": len(pack_records(records)) // count
+        }
+    }
+
+def print_benchmark(results: Dict[str, Any]):
+    print(f"ProcessedTool benchmark: {results['records']} records, "
+          f"packed codec: {'msgpack' if results['msgpack_available'] else 'json-array'}")
+    for section in ("memory_bytes_per_record", "serialise_us_per_record",
+                    "deserialise_us_per_record", "encoded_bytes_per_record"):
+        print(f"\n{section}")
+        for name, value in results[section].items():
+            print(f"  {name:<24} {value:>12.1f}" if isinstance(value, float) else f"  {name:<24} {value:>12}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared pipeline record types")
+    parser.add_argument('--benchmark', action='store_true', help="Benchmark records against dict + JSON")
+    parser.add_argument('--count', type=int, default=BENCHMARK_COUNT)
+    parser.add_argument('--seed', type=int, default=BENCHMARK_SEED)
+    parser.add_argument('--json', action='store_true', help="Print benchmark results as JSON")
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+    else:
+        results = run_benchmark(args.count, args.seed)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            print_benchmark(results)
@@ -7,78 +7,211 @@ Coordinates the distributed scraping of 1,209 tools from MyTurn catalog.
 Uses qwen2.5-coder for content parsing and data normalization.
 """
 
+import argparse
 import asyncio
 import aiohttp
 import json
+import re
 import time
-import sqlite3
+from dataclasses import dataclass, field
 from datetime import datetime
+from html import unescape
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from page_archive import PageArchive
+from page_stream import read_page, record_streamed_page, streamed_pages_summary
+from progress_store import (COMPLETE_PAGE_SQL, COMPLETED_PAGES_SINCE_SQL, FAIL_PAGE_SQL,
+                            INSERT_DISCOVERED_TOOL_SQL, RELEASE_UNFINISHED_PAGES_SQL, START_PAGE_SQL,
+                            ProgressStore)
+from run_ledger import RunLedger
+from stage_drain import StageDrain
+from stage_metrics import StageMetrics
+from stage_profile import PROFILE_MODES, StageProfiler
+from stage_stats import StreamingStats
+from stage_trace import StageTracer, default_trace_path
+from tool_records import DiscoveredTool
 
 # Configuration
 BASE_URL = "https://ballarattoollibrary.myturn.com"
 CATALOG_URL = f"{BASE_URL}/library/inventory/browse"
-ITEMS_PER_PAGE = 15
+ITEMS_PER_PAGE = 15  # The HTML pager's default page size
+EXPECTED_TOTAL_TOOLS = 1209  # From DATA_MIGRATION_PLAN.md, used when the pager shows no total
 MAX_CONCURRENT_REQUESTS = 5
 REQUEST_DELAY = 1.0  # Rate limiting - 1 second between requests
 OUTPUT_DIR = Path("/rust/containers/ballarat-scraping")
-DATABASE_PATH = OUTPUT_DIR / "scraping_progress.db"
+DATABASE_PATH = OUTPUT_DIR / "scraping_progress.db"  # Merged view, published at the end of a run
+CHANGESET_DIR = OUTPUT_DIR / "progress_changesets"
+LOCAL_STATE_DIR = Path.home() / ".local" / "share" / "ballarat-scraping"
+LOCAL_DATABASE_PATH = LOCAL_STATE_DIR / "walnut_progress.db"
+CHECKPOINT_PATH = LOCAL_STATE_DIR / "walnut_checkpoint.json"  # The listing and start of an unfinished run
+PAGE_ARCHIVE_DIR = OUTPUT_DIR / "page_archive"
+
+# Catalog listings end before the footer; the rest of the page is never read
+CATALOG_STOP_PATTERN = re.compile(r'<footer\b', re.IGNORECASE)
+
+# Listing probes - run once at startup to pick the cheapest way to walk the catalog.
+# Single-document listings are tried first, then larger pages, largest first.
+# The sitemap names no tools, so it only cross-checks the pager's tool count.
+SITEMAP_URL = f"{BASE_URL}/sitemap.xml"
+ALTERNATE_LISTINGS = [
+    ("inventory_feed", "feed", f"{BASE_URL}/library/inventory/rss"),
+    ("inventory_json", "json", f"{CATALOG_URL}.json"),
+]
+PAGE_SIZE_PARAM = "limit"
+PROBE_PAGE_SIZES = [250, 100, 50, 30]
+PAGER_TOTAL_PATTERN = re.compile(r'of\s+([\d,]+)\s+(?:items|results|tools)', re.IGNORECASE)
+TOOL_ID_PATTERN = re.compile(r'/library/inventory/show/(\d+)')
+TOOL_ANCHOR_PATTERN = re.compile(r'<a[^>]*href="[^"]*inventory/show/(\d+)"[^>]*>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+FEED_ITEM_PATTERN = re.compile(r'<(item|entry)\b.*?</\1>', re.IGNORECASE | re.DOTALL)
+FEED_TITLE_PATTERN = re.compile(r'<title[^>]*>(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?</title>', re.IGNORECASE | re.DOTALL)
+
+# Discovery index - one bit per numeric tool ID; larger or non-numeric IDs go in a set
+BITMAP_MAX_TOOL_ID = 1 << 27  # 16 MB of bitmap at most
+
+# Report settings
+REPORT_SAMPLE_SIZE = 5
+TOOLS_PER_PAGE_BUCKETS = [1, 5, 10, 15, 20, 30, 50, 100]
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+@dataclass
+class ListingMethod:
+    """One way of listing the catalog, and how many requests a full walk takes"""
+    name: str
+    kind: str  # 'html', 'feed' or 'json'
+    url: str
+    page_size: Optional[int] = None  # None for single-document listings
+    total_tools: int = EXPECTED_TOTAL_TOOLS
+    probes: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def requests_needed(self) -> int:
+        if self.page_size is None:
+            return 1
+        return (self.total_tools + self.page_size - 1) // self.page_size  # Ceiling division
+
+    def page_url(self, page: int) -> str:
+        if self.page_size is None:
+            return self.url
+        # Pages are 1-indexed here, offsets are 0-indexed in the URL
+        return self.url.format(offset=(page - 1) * self.page_size, limit=self.page_size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "url": self.url,
+            "page_size": self.page_size,
+            "expected_tools": self.total_tools,
+            "requests_needed": self.requests_needed,
+            "probes": self.probes
+        }
+
+def html_listing(page_size: int = ITEMS_PER_PAGE, total_tools: int = EXPECTED_TOTAL_TOOLS) -> ListingMethod:
+    """The HTML pager, at its default or a larger page size"""
+    if page_size == ITEMS_PER_PAGE:
+        return ListingMethod("html_pager", "html", f"{CATALOG_URL}?offset={{offset}}",
+                             ITEMS_PER_PAGE, total_tools)
+    return ListingMethod(f"html_pager_{page_size}", "html",
+                         f"{CATALOG_URL}?offset={{offset}}&{PAGE_SIZE_PARAM}={{limit}}",
+                         page_size, total_tools)
+
+def first_per_tool(links: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Drop repeat (tool_id, tool_name) entries, keeping each tool's first in listing order"""
+    first = {}
+    for tool_id, tool_name in links:
+        first.setdefault(tool_id, tool_name)
+    return list(first.items())
+
+class ToolIdIndex:
+    """
+    Tool IDs already discovered, held as a bitmap over numeric IDs
+    
+    MyTurn item IDs are dense integers, so 100k+ IDs fit in a few hundred KB
+    where a set of ID strings would take several MB.
+    """
+    
+    def __init__(self, tool_ids: Iterable[str] = ()):
+        self.bits = bytearray()
+        self.other = set()
+        self.size = 0
+        for tool_id in tool_ids:
+            self.add(tool_id)
+    
+    def add(self, tool_id: str) -> bool:
+        """Record a tool ID, returning False if it was already known"""
+        if not (tool_id.isdigit() and int(tool_id) < BITMAP_MAX_TOOL_ID):
+            if tool_id in self.other:
+                return False
+            self.other.add(tool_id)
+            self.size += 1
+            return True
+        
+        n = int(tool_id)
+        byte, bit = n >> 3, 1 << (n & 7)
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(max(byte + 1, 2 * len(self.bits)) - len(self.bits)))
+        elif self.bits[byte] & bit:
+            return False
+        self.bits[byte] |= bit
+        self.size += 1
+        return True
+    
+    def __contains__(self, tool_id: str) -> bool:
+        if not (tool_id.isdigit() and int(tool_id) < BITMAP_MAX_TOOL_ID):
+            return tool_id in self.other
+        n = int(tool_id)
+        return (n >> 3) < len(self.bits) and bool(self.bits[n >> 3] & (1 << (n & 7)))
+    
+    def __len__(self) -> int:
+        return self.size
+
 class WalnutCoordinator:
     """Main coordinator for scraping operations on WALNUT"""
     
-    def __init__(self):
+    def __init__(self, trace_path: Optional[Path] = None, progress_store: Optional[ProgressStore] = None):
         self.session: Optional[aiohttp.ClientSession] = None
-        self.discovered_tools = []
+        self.stats = StreamingStats(sample_size=REPORT_SAMPLE_SIZE)
         self.failed_requests = []
+        self.progress_store: Optional[ProgressStore] = None
         self.progress_db = None
+        self.listing = html_listing()
+        self.seen_tools = ToolIdIndex()
+        self.metrics = StageMetrics('walnut')
+        self.tracer = StageTracer('walnut', trace_path)
+        self.drain = StageDrain('walnut', CHECKPOINT_PATH)
+        self.ledger = RunLedger('walnut')
+        
+        # In single-node-pipeline.py, new tools go straight to IRONWOOD through
+        # this queue instead of waiting for the signal file
+        self.downstream: Optional[asyncio.Queue] = None
         
         # Ensure output directory exists
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         
+        # Every catalog page parsed is archived for offline re-extraction
+        self.page_archive = PageArchive(PAGE_ARCHIVE_DIR, 'walnut')
+        
         # Initialize database
-        self.init_database()
+        self.init_database(progress_store)
     
-    def init_database(self):
-        """Initialize SQLite database for tracking progress"""
-        self.progress_db = sqlite3.connect(DATABASE_PATH)
-        cursor = self.progress_db.cursor()
-        
-        # Create tables for tracking progress
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scraping_progress (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                page_number INTEGER UNIQUE,
-                items_found INTEGER,
-                status TEXT,
-                started_at TIMESTAMP,
-                completed_at TIMESTAMP,
-                error_message TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS discovered_tools (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tool_id TEXT UNIQUE,
-                tool_name TEXT,
-                tool_url TEXT,
-                category TEXT,
-                discovered_at TIMESTAMP,
-                processed_by_ironwood BOOLEAN DEFAULT FALSE,
-                qa_by_rosewood BOOLEAN DEFAULT FALSE
-            )
-        ''')
-        
-        self.progress_db.commit()
-        logger.info("Database initialized successfully")
+    def init_database(self, progress_store: Optional[ProgressStore] = None):
+        """Open the node-local progress store, or use a pipeline's (schema migrations run on open)"""
+        self.progress_store = progress_store or ProgressStore('walnut', LOCAL_DATABASE_PATH, CHANGESET_DIR)
+        self.progress_db = self.progress_store.conn
+        self.progress_db.on_commit = lambda seconds: self.metrics.observe('db_commit_seconds', seconds)
+        logger.info(f"Local progress store ready at {self.progress_store.local_path}")
+        
+        # Tools from earlier runs are never re-inserted or re-emitted
+        rows = self.progress_db.execute("SELECT tool_id FROM discovered_tools")
+        self.seen_tools = ToolIdIndex(tool_id for (tool_id,) in rows)
+        logger.info(f"Discovery index preloaded with {len(self.seen_tools)} known tools")
     
     async def create_session(self):
         """Create aiohttp session with proper headers"""
@@ -95,7 +228,7 @@ class WalnutCoordinator:
         self.session = aiohttp.ClientSession(headers=headers, timeout=timeout)
         logger.info("HTTP session created")
     
-    async def fetch_catalog_page(self, page: int) -> Tuple[bool, List[Dict], str]:
+    async def fetch_catalog_page(self, page: int) -> Tuple[bool, List[DiscoveredTool], str]:
         """
         Fetch a single catalog page and extract tool information
         
@@ -106,121 +239,300 @@ class WalnutCoordinator:
             await self.create_session()
         
         # Record start of page processing
-        cursor = self.progress_db.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO scraping_progress 
-            (page_number, status, started_at) 
-            VALUES (?, 'in_progress', ?)
-        ''', (page, datetime.now()))
-        self.progress_db.commit()
+        trace_key = f"page {page}"
+        with self.tracer.span('db_update', trace_key):
+            cursor = self.progress_db.cursor()
+            cursor.execute(START_PAGE_SQL, (page, datetime.now()))
+            self.progress_db.commit()
         
         try:
-            # Calculate page offset (pages are 0-indexed in URL)
-            offset = (page - 1) * ITEMS_PER_PAGE
-            url = f"{CATALOG_URL}?offset={offset}"
+            url = self.listing.page_url(page)
             
-            logger.info(f"Fetching catalog page {page} (offset {offset})")
+            logger.info(f"Fetching catalog page {page} ({url})")
             
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    error_msg = f"HTTP {response.status} for page {page}"
-                    logger.error(error_msg)
+            fetch_started = time.perf_counter()
+            with self.metrics.in_flight(), self.tracer.span('http_fetch', trace_key):
+                async with self.session.get(url) as response:
+                    self.metrics.inc('http_responses_total', code=response.status)
+                    if response.status != 200:
+                        error_msg = f"HTTP {response.status} for page {page}"
+                        logger.error(error_msg)
+                        
+                        # Record failure
+                        cursor.execute(FAIL_PAGE_SQL, (error_msg, datetime.now(), page))
+                        self.progress_db.commit()
+                        self.metrics.inc('pages_total', result='failed')
+                        
+                        return False, [], error_msg
                     
-                    # Record failure
-                    cursor.execute('''
-                        UPDATE scraping_progress 
-                        SET status='failed', error_message=?, completed_at=?
-                        WHERE page_number=?
-                    ''', (error_msg, datetime.now(), page))
-                    self.progress_db.commit()
-                    
-                    return False, [], error_msg
-                
-                html_content = await response.text()
-                
-                # Parse tools from this page
-                tools = await self.parse_tools_from_page(html_content, page)
-                
-                # Record success
-                cursor.execute('''
-                    UPDATE scraping_progress 
-                    SET status='completed', items_found=?, completed_at=?
-                    WHERE page_number=?
-                ''', (len(tools), datetime.now(), page))
+                    stop_pattern = CATALOG_STOP_PATTERN if self.listing.kind == 'html' else None
+                    streamed = await read_page(response, stop_pattern)
+            self.metrics.observe('fetch_seconds', time.perf_counter() - fetch_started)
+            
+            record_streamed_page(self.stats, streamed)
+            with self.tracer.span('archive_write', trace_key):
+                self.page_archive.store(url, streamed.text, 'catalog', url)
+            
+            # Parse tools from this page
+            with self.metrics.time('parse_seconds'), self.tracer.span('parse', trace_key):
+                listed, tools = await self.parse_tools_from_page(streamed.text, page, self.listing.kind)
+            
+            # Record success; items_found counts every tool the page lists, new or not
+            with self.tracer.span('db_update', trace_key):
+                cursor.execute(COMPLETE_PAGE_SQL, (listed, datetime.now(), page))
                 self.progress_db.commit()
-                
-                logger.info(f"Page {page}: Found {len(tools)} tools")
-                return True, tools, ""
+            self.metrics.inc('pages_total', result='ok')
+            self.stats.count('tools_listed', listed)
+            self.stats.observe('tools_per_page', listed, TOOLS_PER_PAGE_BUCKETS)
+            
+            logger.info(f"Page {page}: Found {listed} tools ({len(tools)} new)")
+            return True, tools, ""
         
         except Exception as e:
             error_msg = f"Exception on page {page}: {str(e)}"
             logger.error(error_msg)
             
             # Record failure
-            cursor.execute('''
-                UPDATE scraping_progress 
-                SET status='failed', error_message=?, completed_at=?
-                WHERE page_number=?
-            ''', (error_msg, datetime.now(), page))
+            cursor.execute(FAIL_PAGE_SQL, (error_msg, datetime.now(), page))
             self.progress_db.commit()
+            self.metrics.inc('pages_total', result='failed')
             
             return False, [], error_msg
     
-    async def parse_tools_from_page(self, html_content: str, page: int) -> List[Dict]:
+    def extract_tool_links(self, content: str, kind: str = 'html') -> List[Tuple[str, str]]:
         """
-        Parse tool information from HTML content using basic string parsing
+        (tool_id, tool_name) pairs in listing order, from any listing kind
+        
+        A sitemap has no names, so its pairs carry an empty name; it is only
+        ever read for its IDs.
         
         TODO: Integrate with qwen2.5-coder for advanced content extraction
         """
-        tools = []
-        
-        # Basic HTML parsing - look for tool links and information
+        if kind == 'json':
+            return self.extract_json_tool_links(content)
+        
+        if kind == 'feed':
+            links = []
+            for item in FEED_ITEM_PATTERN.finditer(content):
+                tool_id = TOOL_ID_PATTERN.search(item.group(0))
+                if tool_id:
+                    title = FEED_TITLE_PATTERN.search(item.group(0))
+                    links.append((tool_id.group(1), title.group(1).strip() if title else f"Tool {tool_id.group(1)}"))
+            return first_per_tool(links)
+        
+        # Find all tool detail page links, once per tool in first-seen order
         # MyTurn typically uses patterns like /library/inventory/show/{id}
+        tool_links = dict.fromkeys(TOOL_ID_PATTERN.findall(content))
+        if kind == 'sitemap':
+            return [(tool_id, '') for tool_id in tool_links]
         
-        import re
-        
-        # Find all tool detail page links
-        tool_links = re.findall(r'/library/inventory/show/(\d+)', html_content)
-        
-        # Extract tool names from the HTML (simplified approach)
+        # Each tool is linked several times (image and title); name it from the
+        # first link with text, keyed by its own ID rather than by position
         # This would be enhanced with qwen2.5-coder for better extraction
-        tool_name_pattern = r'<a[^>]*href="[^"]*inventory/show/\d+"[^>]*>([^<]+)</a>'
-        tool_names = re.findall(tool_name_pattern, html_content)
+        tool_names = {}
+        for tool_id, link_text in TOOL_ANCHOR_PATTERN.findall(content):
+            link_text = ' '.join(unescape(TAG_PATTERN.sub('', link_text)).split())
+            if link_text and tool_id not in tool_names:
+                tool_names[tool_id] = link_text
         
-        # Combine IDs and names
-        for i, tool_id in enumerate(tool_links):
-            tool_name = tool_names[i] if i < len(tool_names) else f"Tool {tool_id}"
-            tool_url = f"{BASE_URL}/library/inventory/show/{tool_id}"
-            
-            tool_data = {
-                'id': tool_id,
-                'name': tool_name.strip(),
-                'url': tool_url,
-                'page_discovered': page,
-                'discovered_at': datetime.now().isoformat()
-            }
-            
-            tools.append(tool_data)
+        return [(tool_id, tool_names.get(tool_id, f"Tool {tool_id}")) for tool_id in tool_links]
+    
+    def extract_json_tool_links(self, content: str) -> List[Tuple[str, str]]:
+        """Objects carrying an id and a name or title, anywhere in a JSON listing"""
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return []
+        
+        links = []
+        pending = [data]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, dict):
+                tool_id = node.get('id', node.get('itemId'))
+                tool_name = node.get('name', node.get('title'))
+                if isinstance(tool_id, (int, str)) and str(tool_id).isdigit() and isinstance(tool_name, str):
+                    links.append((str(tool_id), tool_name))
+                else:
+                    pending.extend(reversed(list(node.values())))
+            elif isinstance(node, list):
+                pending.extend(reversed(node))
+        return first_per_tool(links)
+    
+    async def parse_tools_from_page(self, content: str, page: int,
+                                    kind: str = 'html') -> Tuple[int, List[DiscoveredTool]]:
+        """
+        Parse newly discovered tools from one listing page and record them in the progress store
+        
+        Returns how many tools the page lists and the ones that are new.
+        Tools already in the discovery index - from this run or an earlier
+        one - are skipped without touching the database.
+        """
+        tools = []
+        rows = []
+        discovered_at = datetime.now()
+        links = self.extract_tool_links(content, kind)
+        
+        for tool_id, tool_name in links:
+            if not self.seen_tools.add(tool_id):
+                self.stats.count('tools_already_known')
+                self.metrics.inc('tools_total', result='already_known')
+                continue
             
-            # Store in database
-            cursor = self.progress_db.cursor()
-            cursor.execute('''
-                INSERT OR IGNORE INTO discovered_tools 
-                (tool_id, tool_name, tool_url, discovered_at) 
-                VALUES (?, ?, ?, ?)
-            ''', (tool_id, tool_name.strip(), tool_url, datetime.now()))
-            self.progress_db.commit()
+            tool_url = f"{BASE_URL}/library/inventory/show/{tool_id}"
+            tools.append(DiscoveredTool(
+                id=tool_id,
+                name=tool_name,
+                url=tool_url,
+                page_discovered=page,
+                discovered_at=discovered_at.isoformat()
+            ))
+            rows.append((tool_id, tool_name, tool_url, discovered_at))
+            self.metrics.inc('tools_total', result='discovered')
+        
+        # Store in database, one commit per page
+        if rows:
+            with self.tracer.span('db_update', f"page {page}", tools=len(rows)):
+                self.progress_db.executemany(INSERT_DISCOVERED_TOOL_SQL, rows)
+                self.progress_db.commit()
+        
+        return len(links), tools
+    
+    async def fetch_probe(self, url: str, kind: str) -> Tuple[Optional[str], List[str]]:
+        """Fetch one listing candidate, returning its text and tool IDs in order (None on failure)"""
+        await asyncio.sleep(REQUEST_DELAY)  # Probes are rate limited like the pages
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    return None, []
+                stop_pattern = CATALOG_STOP_PATTERN if kind == 'html' else None
+                streamed = await read_page(response, stop_pattern)
+        except Exception as e:
+            logger.info(f"Listing probe {url} failed: {e}")
+            return None, []
         
-        return tools
+        tool_ids = list(dict.fromkeys(tool_id for tool_id, _ in self.extract_tool_links(streamed.text, kind)))
+        return streamed.text, tool_ids
+    
+    async def probe_listing_methods(self) -> ListingMethod:
+        """
+        Pick the cheapest listing that returns the full catalog
+        
+        The first and last pages of the default HTML pager are the reference:
+        a candidate is only used if it contains both, and paged candidates
+        must return them in pager order at the same offsets. Without a last
+        page to compare, no larger page size is trusted. The sitemap is
+        fetched only to cross-check the pager's tool count.
+        """
+        if not self.session:
+            await self.create_session()
+        
+        pager = html_listing()
+        first_text, first_ids = await self.fetch_probe(pager.page_url(1), 'html')
+        if not first_ids:
+            logger.warning("HTML pager did not answer the listing probe; using it unprobed")
+            pager.probes.append({"method": pager.name, "accepted": False, "reason": "no tools on first page"})
+            return pager
+        
+        total_match = PAGER_TOTAL_PATTERN.search(first_text)
+        if total_match:
+            pager.total_tools = int(total_match.group(1).replace(',', ''))
+        total = pager.total_tools
+        
+        last_page = pager.requests_needed
+        last_offset = (last_page - 1) * ITEMS_PER_PAGE
+        _, last_ids = await self.fetch_probe(pager.page_url(last_page), 'html')
+        reference_ids = set(first_ids) | set(last_ids)
+        
+        def probed(method: ListingMethod, accepted: bool, reason: str, found: int):
+            pager.probes.append({
+                "method": method.name,
+                "url": method.url,
+                "tools_returned": found,
+                "requests_needed": method.requests_needed,
+                "accepted": accepted,
+                "reason": reason
+            })
+            logger.info(f"Listing probe {method.name}: {'accepted' if accepted else 'rejected'} ({reason})")
+        
+        best = pager
+        
+        # The sitemap lists IDs without names; names drive IRONWOOD's ordering,
+        # so it is never the listing - only a check on the pager's total
+        sitemap_method = ListingMethod("sitemap", "sitemap", SITEMAP_URL, None, total)
+        _, sitemap_ids = await self.fetch_probe(SITEMAP_URL, 'sitemap')
+        if not sitemap_ids:
+            probed(sitemap_method, False, "ID cross-check: unavailable or no tools", 0)
+        elif len(sitemap_ids) != total:
+            probed(sitemap_method, False, f"ID cross-check: lists {len(sitemap_ids)} tools, pager reports {total}",
+                   len(sitemap_ids))
+            logger.warning(f"Sitemap lists {len(sitemap_ids)} tools but the pager reports {total}")
+        else:
+            probed(sitemap_method, False, "ID cross-check: tool count agrees with the pager", len(sitemap_ids))
+        
+        # A complete single-document listing costs one request - nothing beats it
+        for name, kind, url in ALTERNATE_LISTINGS:
+            candidate = ListingMethod(name, kind, url, None, total)
+            _, tool_ids = await self.fetch_probe(url, kind)
+            if not tool_ids:
+                probed(candidate, False, "unavailable or no tools", 0)
+            elif len(tool_ids) < total:
+                probed(candidate, False, f"returned {len(tool_ids)} of {total} tools", len(tool_ids))
+            elif not reference_ids.issubset(tool_ids):
+                probed(candidate, False, "missing tools listed by the HTML pager", len(tool_ids))
+            else:
+                probed(candidate, True, "complete listing", len(tool_ids))
+                best = candidate
+                break
+        
+        # Larger HTML pages, largest first; the first honoured size is the cheapest
+        if best is pager and not last_ids:
+            logger.warning("Last HTML pager page did not answer; keeping the default page size")
+        if best is pager and last_ids:
+            for size in PROBE_PAGE_SIZES:
+                candidate = html_listing(size, total)
+                if candidate.requests_needed >= best.requests_needed:
+                    continue
+                
+                _, tool_ids = await self.fetch_probe(candidate.page_url(1), 'html')
+                if len(tool_ids) <= ITEMS_PER_PAGE:
+                    probed(candidate, False, f"page size ignored ({len(tool_ids)} tools)", len(tool_ids))
+                    break  # The pager does not take the parameter at all
+                if tool_ids[:len(first_ids)] != first_ids:
+                    probed(candidate, False, "first page disagrees with the HTML pager", len(tool_ids))
+                    continue
+                if len(tool_ids) < min(size, total):
+                    candidate = html_listing(len(tool_ids), total)  # Server caps the page size
+                    if candidate.requests_needed >= best.requests_needed:
+                        probed(candidate, False, f"page size capped at {len(tool_ids)}", len(tool_ids))
+                        continue
+                
+                # Same offsets must land on the same tools at the end of the catalog
+                tail_url = candidate.url.format(offset=last_offset, limit=candidate.page_size)
+                _, tail_ids = await self.fetch_probe(tail_url, 'html')
+                if not tail_ids:
+                    probed(candidate, False, "last page did not answer", len(tool_ids))
+                    continue
+                if tail_ids[:len(last_ids)] != last_ids:
+                    probed(candidate, False, "last page disagrees with the HTML pager", len(tool_ids))
+                    continue
+                
+                probed(candidate, True, f"{candidate.page_size} tools per page", len(tool_ids))
+                best = candidate
+                break
+        
+        best.probes = pager.probes
+        logger.info(f"Listing catalog via {best.name}: {best.requests_needed} requests "
+                    f"instead of {pager.requests_needed} for {total} tools")
+        return best
     
     async def estimate_total_pages(self) -> int:
         """
-        Estimate total number of pages by checking the catalog
-        Based on the known 1,209 tools and 15 items per page
+        Number of listing requests for the chosen method
+        Based on the pager's total (or the known 1,209 tools) and the page size
         """
-        # From DATA_MIGRATION_PLAN.md: 1,209 tools total
-        estimated_pages = (1209 + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE  # Ceiling division
-        logger.info(f"Estimated {estimated_pages} pages for 1,209 tools")
+        estimated_pages = self.listing.requests_needed
+        logger.info(f"Estimated {estimated_pages} pages for {self.listing.total_tools} tools via {self.listing.name}")
         return estimated_pages
     
     async def coordinate_full_scraping(self):
@@ -229,46 +541,133 @@ class WalnutCoordinator:
         """
         logger.info("Starting WALNUT coordination of MyTurn catalog scraping")
         
+        self.ledger.start()
         start_time = time.time()
+        run_started_at, done_pages = await self.begin_run()
         total_pages = await self.estimate_total_pages()
+        pages = [page for page in range(1, total_pages + 1) if page not in done_pages]
+        if done_pages:
+            logger.info(f"{total_pages - len(pages)} of {total_pages} pages already scraped by the interrupted run")
         
         # Create semaphore for concurrent request limiting
         semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
         
-        async def scrape_page_with_limit(page_num):
-            async with semaphore:
+        async def scrape_page(page_num):
+            with self.tracer.span('rate_limit_wait', f"page {page_num}"):
                 await asyncio.sleep(REQUEST_DELAY)  # Rate limiting
+            if self.drain.draining:
+                return None
+            try:
                 return await self.fetch_catalog_page(page_num)
+            except Exception as e:
+                return e
         
-        # Process all pages concurrently (with limits)
-        tasks = [scrape_page_with_limit(page) for page in range(1, total_pages + 1)]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async def scrape_page_with_limit(page_num):
+            async with semaphore:
+                if self.drain.draining:
+                    return page_num, None  # Left for the resumed run
+                self.tracer.record('queue_wait', queued_at, time.perf_counter(), f"page {page_num}")
+                return page_num, await self.drain.guard(scrape_page(page_num))
         
-        # Collect results
+        # Process all pages concurrently (with limits), folding each page into
+        # the report statistics as it completes rather than holding every result
         successful_pages = 0
         total_tools_found = 0
         
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Page {i+1} failed with exception: {result}")
-                self.failed_requests.append(i+1)
+        queued_at = time.perf_counter()
+        tasks = [scrape_page_with_limit(page) for page in pages]
+        self.metrics.set('queue_depth', len(pages), queue='catalog_pages')
+        for pages_left, completed in enumerate(asyncio.as_completed(tasks), 1):
+            page_num, result = await completed
+            self.metrics.set('queue_depth', len(pages) - pages_left, queue='catalog_pages')
+            if result is None:
+                continue  # Not scraped before the drain
+            elif isinstance(result, Exception):
+                logger.error(f"Page {page_num} failed with exception: {result}")
+                self.failed_requests.append(page_num)
             else:
                 success, tools, error = result
                 if success:
                     successful_pages += 1
                     total_tools_found += len(tools)
-                    self.discovered_tools.extend(tools)
+                    self.record_page_stats(tools)
+                    if self.downstream is not None:
+                        for tool in tools:
+                            await self.downstream.put((tool.id, tool.name, tool.url))
                 else:
-                    self.failed_requests.append(i+1)
+                    self.failed_requests.append(page_num)
+                    self.stats.issue('page_errors', error)
+            
+            self.progress_store.maybe_ship()
+        
+        self.failed_requests.sort()
+        if self.drain.draining:
+            await self.finish_drain(run_started_at, total_pages)
+        elif not self.failed_requests and len(self.seen_tools) < self.listing.total_tools:
+            logger.warning(f"{self.listing.name} listed {len(self.seen_tools)} of "
+                           f"{self.listing.total_tools} expected tools")
         
         # Generate summary report
         elapsed_time = time.time() - start_time
         await self.generate_coordination_report(
-            total_pages, successful_pages, total_tools_found, elapsed_time
+            len(pages), successful_pages, total_tools_found, elapsed_time
         )
+        if self.drain.draining:
+            return
+        self.drain.clear_checkpoint()
+        
+        # Signal IRONWOOD to begin processing; in a pipeline it has had every tool already
+        if self.downstream is None:
+            await self.signal_ironwood_processing()
+    
+    async def begin_run(self) -> Tuple[str, Set[int]]:
+        """
+        Resume the run in the checkpoint, or probe the listing for a new one
         
-        # Signal IRONWOOD to begin processing
-        await self.signal_ironwood_processing()
+        Returns the run's start time and the pages it has already scraped.
+        The checkpoint keeps the listing, because page numbers only mean
+        anything for the page size they were scraped at.
+        """
+        checkpoint = self.drain.load_checkpoint()
+        if checkpoint is not None:
+            self.listing = ListingMethod(**checkpoint['listing'])
+            run_started_at = checkpoint['run_started_at']
+            cursor = self.progress_db.execute(COMPLETED_PAGES_SINCE_SQL, (datetime.fromisoformat(run_started_at),))
+            return run_started_at, {page for (page,) in cursor}
+        
+        run_started_at = datetime.now().isoformat()
+        self.listing = await self.probe_listing_methods()
+        self.save_checkpoint(run_started_at)
+        return run_started_at, set()
+    
+    def save_checkpoint(self, run_started_at: str):
+        self.drain.save_checkpoint({
+            "run_started_at": run_started_at,
+            "listing": {
+                "name": self.listing.name,
+                "kind": self.listing.kind,
+                "url": self.listing.url,
+                "page_size": self.listing.page_size,
+                "total_tools": self.listing.total_tools
+            }
+        })
+    
+    async def finish_drain(self, run_started_at: str, total_pages: int):
+        """Release pages cut off mid-fetch, ship progress and checkpoint the run"""
+        self.progress_db.execute(RELEASE_UNFINISHED_PAGES_SQL)
+        self.progress_db.commit()
+        self.progress_store.ship()
+        self.save_checkpoint(run_started_at)
+        
+        done = self.progress_db.execute(COMPLETED_PAGES_SINCE_SQL, (datetime.fromisoformat(run_started_at),))
+        logger.warning(f"WALNUT drained: {len(done.fetchall())}/{total_pages} pages scraped in this run; "
+                       f"the rest are left for the next one and IRONWOOD is not signalled")
+    
+    def record_page_stats(self, tools: List[DiscoveredTool]):
+        """Fold one page's newly discovered tools into the streaming report statistics"""
+        self.stats.count('tools_discovered', len(tools))
+        for tool in tools:
+            self.stats.sample('discovered_tools', tool.to_dict())
     
     async def generate_coordination_report(self, total_pages: int, successful_pages: int, 
                                          total_tools: int, elapsed_time: float):
@@ -281,7 +680,10 @@ class WalnutCoordinator:
                     "total_pages_attempted": total_pages,
                     "successful_pages": successful_pages,
                     "failed_pages": len(self.failed_requests),
+                    "total_tools_listed": self.stats.counter('tools_listed'),
                     "total_tools_discovered": total_tools,
+                    "tools_already_known": self.stats.counter('tools_already_known'),
+                    "tools_in_discovery_index": len(self.seen_tools),
                     "elapsed_time_seconds": elapsed_time
                 },
                 "failed_pages": self.failed_requests,
@@ -290,7 +692,11 @@ class WalnutCoordinator:
                     "rosewood_qa": "Pending IRONWOOD completion"
                 },
                 "database_location": str(DATABASE_PATH),
-                "discovered_tools_sample": self.discovered_tools[:5]  # First 5 tools
+                "listing_method": self.listing.to_dict(),
+                "tools_per_page": self.stats.histogram('tools_per_page').to_dict(),
+                "most_common_page_errors": self.stats.top('page_errors'),
+                "page_streaming": streamed_pages_summary(self.stats),
+                "discovered_tools_sample": self.stats.sampled('discovered_tools')  # Random sample
             }
         }
         
@@ -306,11 +712,16 @@ class WalnutCoordinator:
         """Create signal file for IRONWOOD to begin processing"""
         signal_file = OUTPUT_DIR / "walnut_completed.signal"
         
+        # Discoveries must be shipped before IRONWOOD is told to pull them
+        self.progress_store.ship()
+        self.progress_store.publish(DATABASE_PATH)
+        
         signal_data = {
             "coordinator": "WALNUT",
             "completion_time": datetime.now().isoformat(),
-            "tools_discovered": len(self.discovered_tools),
+            "tools_discovered": self.stats.counter('tools_discovered'),
             "database_path": str(DATABASE_PATH),
+            "changeset_dir": str(CHANGESET_DIR),
             "next_processor": "IRONWOOD",
             "status": "ready_for_processing"
         }
@@ -325,25 +736,55 @@ class WalnutCoordinator:
         if self.session:
             await self.session.close()
         
-        if self.progress_db:
-            self.progress_db.close()
+        if self.progress_store:
+            self.progress_store.close()
+        
+        await self.metrics.stop()
+        
+        self.tracer.close()
+        if self.tracer.enabled:
+            logger.info(f"Span trace written to {self.tracer.path}")
         
         logger.info("WALNUT coordinator cleanup completed")
 
-async def main():
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="WALNUT catalog scraping coordinator")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve Prometheus metrics on this port at /metrics (off by default)")
+    parser.add_argument('--trace', nargs='?', const=default_trace_path('walnut'), type=Path, default=None,
+                        help="Write per-page spans to a Chrome trace file (default under ~/.local/share/ballarat-scraping/traces)")
+    parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES, default=None,
+                        help="Profile the run (sampled stacks by default, or cprofile) and monitor event-loop lag; results go next to the stage report")
+    return parser.parse_args()
+
+async def main(args):
     """Main execution function"""
-    coordinator = WalnutCoordinator()
+    coordinator = WalnutCoordinator(trace_path=args.trace)
+    profiler = StageProfiler('walnut', args.profile, OUTPUT_DIR)
+    outcome = 'completed'
     
     try:
+        profiler.start()
+        coordinator.drain.install()
+        if args.metrics_port:
+            await coordinator.metrics.start(args.metrics_port)
+        
         await coordinator.coordinate_full_scraping()
     except KeyboardInterrupt:
+        outcome = 'interrupted'
         logger.info("Scraping interrupted by user")
     except Exception as e:
+        outcome = 'failed'
         logger.error(f"Unexpected error: {e}")
     finally:
+        coordinator.drain.uninstall()
+        coordinator.ledger.record(coordinator.progress_store, coordinator.metrics, coordinator.stats,
+                                  coordinator.drain, outcome)
         await coordinator.cleanup()
+        profiler.stop()
 
 if __name__ == "__main__":
     print("WALNUT Coordinator - Ballarat Tool Library MyTurn Scraping")
     print("=" * 60)
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file